@@ -22,6 +22,7 @@ from src.infrastructure.models.base import Base
 from src.infrastructure.models.users import User
 from src.infrastructure.models.offers import Offer
 from src.infrastructure.models.chats import Chat
+from src.infrastructure.models.bookings import Booking
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,28 @@
+"""keyset pagination indexes
+
+Revision ID: 3f1a9c7d2b64
+Revises: 6114cab382aa
+Create Date: 2026-10-18 09:00:12.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c7d2b64'
+down_revision: Union[str, None] = '6114cab382aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_offer_created_at_id', 'offer', ['created_at', 'id'], unique=False)
+    op.create_index('ix_message_chat_id_timestamp_id', 'message', ['chat_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_message_chat_id_timestamp_id', table_name='message')
+    op.drop_index('ix_offer_created_at_id', table_name='offer')
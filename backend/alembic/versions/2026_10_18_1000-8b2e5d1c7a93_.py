@@ -0,0 +1,88 @@
+"""offer rating aggregates
+
+Revision ID: 8b2e5d1c7a93
+Revises: 3f1a9c7d2b64
+Create Date: 2026-10-18 10:00:41.902157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e5d1c7a93'
+down_revision: Union[str, None] = '3f1a9c7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('offer', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('offer', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('offer', sa.Column('rating_histogram', postgresql.ARRAY(sa.Integer()), server_default='{0,0,0,0,0}', nullable=False))
+    op.add_column('offer', sa.Column('rating_avg', sa.Numeric(precision=2, scale=1), sa.Computed('CASE WHEN rating_count > 0 THEN round(rating_sum::numeric / rating_count, 1) END', persisted=True), nullable=True))
+    op.create_index('ix_offer_rating_avg_count_id', 'offer', [sa.text('rating_avg DESC NULLS LAST'), sa.text('rating_count DESC'), 'id'], unique=False)
+
+    op.execute("""
+    CREATE OR REPLACE FUNCTION offer_rating_aggregate() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE offer SET
+                rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                rating_histogram[OLD.rating] = rating_histogram[OLD.rating] - 1
+            WHERE id = OLD.offer_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE offer SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                rating_histogram[NEW.rating] = rating_histogram[NEW.rating] + 1
+            WHERE id = NEW.offer_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+    CREATE TRIGGER feedback_rating_aggregate
+    AFTER INSERT OR DELETE OR UPDATE OF rating, offer_id ON feedback
+    FOR EACH ROW EXECUTE FUNCTION offer_rating_aggregate()
+    """)
+
+    # backfill existing feedbacks
+    op.execute("""
+    UPDATE offer SET
+        rating_count = f.rating_count,
+        rating_sum = f.rating_sum,
+        rating_histogram = f.rating_histogram
+    FROM (
+        SELECT
+            offer_id,
+            count(*) AS rating_count,
+            sum(rating) AS rating_sum,
+            ARRAY[
+                count(*) FILTER (WHERE rating = 1),
+                count(*) FILTER (WHERE rating = 2),
+                count(*) FILTER (WHERE rating = 3),
+                count(*) FILTER (WHERE rating = 4),
+                count(*) FILTER (WHERE rating = 5)
+            ]::integer[] AS rating_histogram
+        FROM feedback
+        GROUP BY offer_id
+    ) AS f
+    WHERE offer.id = f.offer_id
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS feedback_rating_aggregate ON feedback')
+    op.execute('DROP FUNCTION IF EXISTS offer_rating_aggregate()')
+    op.drop_index('ix_offer_rating_avg_count_id', table_name='offer')
+    op.drop_column('offer', 'rating_avg')
+    op.drop_column('offer', 'rating_histogram')
+    op.drop_column('offer', 'rating_sum')
+    op.drop_column('offer', 'rating_count')
@@ -0,0 +1,26 @@
+"""feedback pagination index
+
+Revision ID: 5c7d1e9a4f20
+Revises: 8b2e5d1c7a93
+Create Date: 2026-10-18 11:00:41.208533
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d1e9a4f20'
+down_revision: Union[str, None] = '8b2e5d1c7a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_feedback_offer_id_created_at_id', 'feedback', ['offer_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_offer_id_created_at_id', table_name='feedback')
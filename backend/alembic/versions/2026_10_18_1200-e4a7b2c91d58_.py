@@ -0,0 +1,47 @@
+"""offer catalogue filter indexes
+
+Revision ID: e4a7b2c91d58
+Revises: 5c7d1e9a4f20
+Create Date: 2026-10-18 12:00:07.631904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b2c91d58'
+down_revision: Union[str, None] = '5c7d1e9a4f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+price_columns = ('per_hour', 'per_day', 'per_month', 'per_year')
+
+
+def upgrade() -> None:
+    op.create_index('ix_offer_city_offer_type_created_at', 'offer', ['city', 'offer_type', 'created_at'], unique=False)
+    op.create_index('ix_offer_offer_type_created_at', 'offer', ['offer_type', 'created_at'], unique=False)
+    op.create_index('ix_offer_owner_id_created_at', 'offer', ['owner_id', 'created_at'], unique=False)
+    op.create_index('ix_price_offer_id', 'price', ['offer_id'], unique=False)
+    for column in price_columns:
+        op.create_index(
+            f'ix_price_{column}',
+            'price',
+            [column, 'offer_id'],
+            unique=False,
+            postgresql_where=sa.text(f'{column} > 0'),
+        )
+    op.create_index('ix_price_per_day_sort', 'price', [sa.text('nullif(per_day, 0)'), 'offer_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_price_per_day_sort', table_name='price')
+    for column in reversed(price_columns):
+        op.drop_index(f'ix_price_{column}', table_name='price')
+    op.drop_index('ix_price_offer_id', table_name='price')
+    op.drop_index('ix_offer_owner_id_created_at', table_name='offer')
+    op.drop_index('ix_offer_offer_type_created_at', table_name='offer')
+    op.drop_index('ix_offer_city_offer_type_created_at', table_name='offer')
@@ -0,0 +1,29 @@
+"""offer full-text search
+
+Revision ID: a61f3d8e0b47
+Revises: e4a7b2c91d58
+Create Date: 2026-10-18 13:00:52.114870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a61f3d8e0b47'
+down_revision: Union[str, None] = 'e4a7b2c91d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('offer', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("setweight(to_tsvector('english', coalesce(name, '')), 'A') || setweight(to_tsvector('english', coalesce(city, '')), 'B') || setweight(to_tsvector('english', coalesce(description, '')), 'C')", persisted=True), nullable=True))
+    op.create_index('ix_offer_search_vector', 'offer', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offer_search_vector', table_name='offer', postgresql_using='gin')
+    op.drop_column('offer', 'search_vector')
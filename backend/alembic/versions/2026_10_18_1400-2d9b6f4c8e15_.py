@@ -0,0 +1,32 @@
+"""offer coordinates and geohash
+
+Revision ID: 2d9b6f4c8e15
+Revises: a61f3d8e0b47
+Create Date: 2026-10-18 14:00:19.550326
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d9b6f4c8e15'
+down_revision: Union[str, None] = 'a61f3d8e0b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('offer', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('offer', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('offer', sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_offer_geohash', 'offer', ['geohash'], unique=False, postgresql_ops={'geohash': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_offer_geohash', table_name='offer', postgresql_ops={'geohash': 'text_pattern_ops'})
+    op.drop_column('offer', 'geohash')
+    op.drop_column('offer', 'longitude')
+    op.drop_column('offer', 'latitude')
@@ -0,0 +1,40 @@
+"""bookings
+
+Revision ID: 7f3c0a5b9e62
+Revises: 2d9b6f4c8e15
+Create Date: 2026-10-18 15:00:33.845127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3c0a5b9e62'
+down_revision: Union[str, None] = '2d9b6f4c8e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('booking',
+    sa.Column('period', postgresql.TSTZRANGE(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+    sa.Column('offer_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.CheckConstraint('NOT isempty(period)', name='check_period_not_empty'),
+    sa.ForeignKeyConstraint(['offer_id'], ['offer.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    postgresql.ExcludeConstraint((sa.text("int4range(offer_id, offer_id, '[]')"), '&&'), (sa.column('period'), '&&'), using='gist', name='exclude_overlapping_bookings')
+    )
+    op.create_index(op.f('ix_booking_user_id'), 'booking', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_booking_user_id'), table_name='booking')
+    op.drop_table('booking')
@@ -0,0 +1,36 @@
+"""foreign key indexes
+
+Revision ID: c08e4b2f7a31
+Revises: 7f3c0a5b9e62
+Create Date: 2026-10-18 16:00:26.731590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c08e4b2f7a31'
+down_revision: Union[str, None] = '7f3c0a5b9e62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # * offer.owner_id, price.offer_id, feedback.offer_id, message.chat_id
+    # * and chat.first_user_id are covered by earlier composite indexes
+    op.create_index(op.f('ix_image_offer_id'), 'image', ['offer_id'], unique=False)
+    op.create_index(op.f('ix_chat_second_user_id'), 'chat', ['second_user_id'], unique=False)
+    op.create_index(op.f('ix_message_sender_id'), 'message', ['sender_id'], unique=False)
+    op.create_index(op.f('ix_company_user_id'), 'company', ['user_id'], unique=False)
+    op.create_index('ix_price_per_day_desc', 'price', [sa.text('per_day DESC'), 'offer_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_price_per_day_desc', table_name='price')
+    op.drop_index(op.f('ix_company_user_id'), table_name='company')
+    op.drop_index(op.f('ix_message_sender_id'), table_name='message')
+    op.drop_index(op.f('ix_chat_second_user_id'), table_name='chat')
+    op.drop_index(op.f('ix_image_offer_id'), table_name='image')
@@ -0,0 +1,30 @@
+"""chat read watermarks
+
+Revision ID: 9a4d2c6e1f83
+Revises: c08e4b2f7a31
+Create Date: 2026-10-18 17:00:12.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d2c6e1f83'
+down_revision: Union[str, None] = 'c08e4b2f7a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chat', sa.Column('first_user_read_id', sa.Integer(), nullable=True))
+    op.add_column('chat', sa.Column('second_user_read_id', sa.Integer(), nullable=True))
+    op.create_index('ix_message_chat_id_id', 'message', ['chat_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_message_chat_id_id', table_name='message')
+    op.drop_column('chat', 'second_user_read_id')
+    op.drop_column('chat', 'first_user_read_id')
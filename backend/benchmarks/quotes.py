@@ -0,0 +1,75 @@
+"""
+Price quote engine benchmark, no database involved.
+
+    python -m benchmarks.quotes [offers]
+"""
+
+import sys
+import time
+import numpy as np
+
+from datetime import datetime, timedelta
+
+from src.application.utils.quotes import quote, stay_hours, unit_combinations
+
+
+STAYS = {
+    '5 hours': timedelta(hours=5),
+    '3 days': timedelta(days=3, hours=2),
+    '7 weeks': timedelta(weeks=7),
+    '400 days': timedelta(days=400),
+}
+
+
+def random_prices(offers: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(5, 50, offers)
+    # per year, month, day and hour with volume discounts
+    prices = base[:, np.newaxis] * np.array([24 * 300, 24 * 25, 20, 1])
+    prices *= rng.uniform(0.8, 1.2, prices.shape)
+    # ! some units are not offered
+    prices[rng.random(prices.shape) < 0.2] = 0
+    return prices.round(2)
+
+
+def python_quote(prices: np.ndarray, hours: int) -> list[float]:
+    combinations = unit_combinations(hours).tolist()
+    totals = []
+    for row in prices.tolist():
+        best = float('inf')
+        for counts in combinations:
+            total = 0.0
+            for price, count in zip(row, counts):
+                if count:
+                    total += price * count if price > 0 else float('inf')
+            best = min(best, total)
+        totals.append(best)
+    return totals
+
+
+def measure(func, *args, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(offers: int = 100_000):
+    prices = random_prices(offers)
+    start = datetime(2030, 1, 1)
+    print(f'{offers} offers')
+    for name, duration in STAYS.items():
+        hours = stay_hours(start, start + duration)
+        numpy_time = measure(quote, prices, hours)
+        python_time = measure(python_quote, prices, hours, repeat=1)
+        print(
+            f'{name:>10}: numpy {numpy_time * 1000:8.1f} ms, '
+            f'python {python_time * 1000:8.1f} ms, '
+            f'{len(unit_combinations(hours))} candidates'
+        )
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+from datetime import date, datetime
+from enum import Enum
+from pydantic import AwareDatetime, BaseModel, model_validator
+
+
+class BookingPeriod(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class BookingCreate(BookingPeriod):
+    start: AwareDatetime
+    end: AwareDatetime
+
+    @model_validator(mode='after')
+    def check_period(self):
+        if self.end <= self.start:
+            raise ValueError('Booking must end after it starts')
+        return self
+
+
+class BookingSchema(BookingPeriod):
+    id: int
+    offer_id: int
+    user_id: int
+    created_at: datetime
+
+
+class DayStatus(str, Enum):
+    free = 'free'
+    partial = 'partial'
+    booked = 'booked'
+
+
+class DayAvailability(BaseModel):
+    day: date
+    status: DayStatus
+
+
+class AvailabilitySchema(BaseModel):
+    year: int
+    month: int
+    booked: list[BookingPeriod]
+    days: list[DayAvailability]
@@ -16,3 +16,26 @@ class MessageSchema(BaseModel):
     sender: UserSchema
     content: str
     timestamp: datetime
+
+
+class LastMessageSchema(BaseModel):
+    id: int
+    sender_id: int | None
+    content: str
+    timestamp: datetime
+
+
+class InboxChatSchema(BaseModel):
+    id: int
+    partner: UserSchema | None
+    last_message: LastMessageSchema | None
+    unread: int
+
+
+class ChatReadSchema(BaseModel):
+    # * defaults to the latest message of the chat
+    message_id: int | None = None
+
+
+class ChatReadOutput(BaseModel):
+    last_read_id: int | None
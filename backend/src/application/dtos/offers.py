@@ -1,6 +1,7 @@
 import json
 
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel, Field, field_validator, model_validator
 from pydantic_extra_types import phone_numbers
 from fastapi import UploadFile
@@ -30,6 +31,7 @@ class OfferPrices(BaseModel):
 
 class ImageSchema(BaseModel):
     data: str
+    original: str | None = None
 
 
 class FeedbackCreate(BaseModel):
@@ -39,11 +41,12 @@ class FeedbackCreate(BaseModel):
 
 class FeedbackSchema(FeedbackCreate):
     id: int
+    user_id: int
     user: str
     created_at: datetime
 
 
-class OfferCreate(BaseModel):
+class OfferBase(BaseModel):
     name: str = Field(..., min_length=4, max_length=50)
     description: str
     offer_type: OfferType
@@ -51,6 +54,17 @@ class OfferCreate(BaseModel):
     phone: phone_numbers.PhoneNumber
     prices: OfferPrices
     images: list[UploadFile]
+    latitude: float | None = Field(None, ge=-90, le=90)
+    longitude: float | None = Field(None, ge=-180, le=180)
+
+
+class OfferCreate(OfferBase):
+
+    @model_validator(mode='after')
+    def check_coordinates(self):
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError('Latitude and longitude must be set together')
+        return self
 
 
 class OfferCreateOutput(OfferCreate):
@@ -59,17 +73,83 @@ class OfferCreateOutput(OfferCreate):
 
 
 class OfferSchema(OfferCreateOutput):
+    prices: OfferPrices | None
     owner: str
+    owner_id: int
     created_at: datetime
+    rating_count: int = 0
+    rating_avg: float | None = None
+    rating_histogram: list[int] = Field(default_factory=lambda: [0] * 5)
+
+
+class OfferSearchSchema(OfferSchema):
+    rank: float
+    # description fragments with matches wrapped in <b></b>
+    headline: str
+
 
+class OfferNearbySchema(OfferSchema):
+    distance_km: float
 
-class OfferUpdate(OfferCreate):
+
+class OfferSort(str, Enum):
+    id = 'id'
+    newest = 'newest'
+    rating = 'rating'
+    # * by the daily price, offers not rented per day come last
+    price_asc = 'price_asc'
+    price_desc = 'price_desc'
+
+
+class OfferFilters(BaseModel):
+    city: str | None = None
+    offer_type: OfferType | None = None
+    owner_id: int | None = None
+    min_rating: float | None = Field(None, ge=1, le=5)
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    min_per_hour: float | None = Field(None, ge=0)
+    max_per_hour: float | None = Field(None, ge=0)
+    min_per_day: float | None = Field(None, ge=0)
+    max_per_day: float | None = Field(None, ge=0)
+    min_per_month: float | None = Field(None, ge=0)
+    max_per_month: float | None = Field(None, ge=0)
+    min_per_year: float | None = Field(None, ge=0)
+    max_per_year: float | None = Field(None, ge=0)
+
+
+class QuoteRequest(BaseModel):
+    start: datetime
+    end: datetime
+    # * either explicit offers or the filtered catalogue
+    offer_ids: list[int] | None = Field(None, max_length=1000)
+    filters: OfferFilters = OfferFilters()
+
+    @model_validator(mode='after')
+    def check_period(self):
+        if self.end <= self.start:
+            raise ValueError('Stay must end after it starts')
+        return self
+
+
+class QuoteSchema(BaseModel):
+    offer_id: int
+    total: float
+    years: int
+    months: int
+    days: int
+    hours: int
+
+
+# * one coordinate may change alone, see OfferUseCase.update_offer
+class OfferUpdate(OfferBase):
     name: str | None = Field(None, min_length=4, max_length=50)
     description: str | None = None
     offer_type: OfferType | None = None
     city: str | None = None
     phone: phone_numbers.PhoneNumber | None = None
     prices: OfferPrices | None = None
+    images: list[UploadFile] | None = None
 
 
 class OfferUnitSchema(OfferSchema):
@@ -4,7 +4,11 @@ from abc import ABC, abstractmethod
 class ISqlRepository(ABC):
 
     @abstractmethod
-    async def list(self):
+    async def list(self, limit: int | None = None, offset: int | None = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self, **kwargs) -> int:
         raise NotImplementedError
 
     @abstractmethod
@@ -33,3 +37,19 @@ class IRedisRepository(ABC):
     @abstractmethod
     async def smembers(self, key: str):
         raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value, ex: int | None = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def sismember(self, key: str, value: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
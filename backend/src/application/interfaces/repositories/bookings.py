@@ -0,0 +1,25 @@
+from abc import abstractmethod
+from datetime import datetime
+
+from src.application.interfaces.repositories.base import ISqlRepository
+
+
+class IBookingRepository(ISqlRepository):
+
+    @abstractmethod
+    async def get_bookings(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_booked_periods(
+        self,
+        offer_id: int,
+        start: datetime,
+        end: datetime,
+    ) -> list[tuple[datetime, datetime]]:
+        raise NotImplementedError
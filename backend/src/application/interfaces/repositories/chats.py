@@ -1,4 +1,6 @@
 from abc import abstractmethod
+from datetime import datetime
+from typing import Sequence
 
 from src.application.interfaces.repositories.base import ISqlRepository
 
@@ -6,7 +8,29 @@ from src.application.interfaces.repositories.base import ISqlRepository
 class IChatRepository(ISqlRepository):
 
     @abstractmethod
-    async def get_chats(self, user_id: int):
+    async def get_chats(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_chats(self, user_id: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_inbox(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_read(self, chat_id: int, user_id: int, message_id: int | None):
         raise NotImplementedError
 
     @abstractmethod
@@ -14,13 +38,44 @@ class IChatRepository(ISqlRepository):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_chat_messages(self, chat_id: int):
+    async def get_chat_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_chat_messages(self, chat_id: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_chat_history(
+        self,
+        chat_id: int,
+        after: tuple[datetime, int] | None,
+        limit: int,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_recent_messages(
+        self,
+        chat_id: int,
+        since: int | None,
+        limit: int,
+    ):
         raise NotImplementedError
 
     @abstractmethod
     async def add_message(self, data: dict):
         raise NotImplementedError
 
+    @abstractmethod
+    async def add_messages(self, data: Sequence[dict]):
+        raise NotImplementedError
+
     @abstractmethod
     async def clear_chat(self, chat_id: int):
         raise NotImplementedError
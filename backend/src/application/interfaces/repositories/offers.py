@@ -1,10 +1,71 @@
 from abc import abstractmethod
+from datetime import datetime
 
 from src.application.interfaces.repositories.base import ISqlRepository
 
 
 class IOfferRepository(ISqlRepository):
 
+    @abstractmethod
+    async def search(
+        self,
+        text: str,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_search(self, text: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        cells: list[str],
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        cells: list[str],
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_prices(
+        self,
+        offer_ids: list[int] | None = None,
+        filters: dict | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_feed(self, after: tuple[datetime, int] | None, limit: int):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_feedbacks(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_feedbacks(self, offer_id: int) -> int:
+        raise NotImplementedError
+
     @abstractmethod
     async def add_prices(self, data: dict):
         raise NotImplementedError
@@ -6,14 +6,32 @@ from src.application.interfaces.repositories.base import ISqlRepository
 class IUserRepository(ISqlRepository):
 
     @abstractmethod
-    async def get_user_offers(self, name: str):
+    async def get_user_offers(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_user_offers(self, user_id: int) -> int:
         raise NotImplementedError
 
 
 class ICompanyRepository(ISqlRepository):
 
     @abstractmethod
-    async def get_company_offers(self, name: str):
+    async def get_company_offers(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_company_offers(self, user_id: int) -> int:
         raise NotImplementedError
 
     @abstractmethod
@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+
+class ICacheStore(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clock(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: str,
+        ttl: int,
+        tags: Iterable[str],
+        since: int | None = None,
+    ) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, timeout: float) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_lock(self, key: str, token: str) -> None:
+        raise NotImplementedError
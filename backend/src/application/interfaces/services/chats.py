@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from src.domain.entities.chats import Message
+
+
+class IMessageStore(ABC):
+    @abstractmethod
+    async def add_messages(self, data: Sequence[dict], durable: bool) -> list[Message]:
+        raise NotImplementedError
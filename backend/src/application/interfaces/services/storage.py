@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+from fastapi import UploadFile
+
+
+class IStorageService(ABC):
+    @abstractmethod
+    async def save_image(self, image: UploadFile, folder: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_variants(self, path: str) -> None:
+        raise NotImplementedError
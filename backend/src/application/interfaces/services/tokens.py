@@ -10,3 +10,7 @@ class ITokenService(ABC):
     @abstractmethod
     async def decode(self, token: str, rdb: Redis | None = None) -> dict:
         raise NotImplementedError
+
+    @abstractmethod
+    async def revoke(self, token: str, rdb: Redis) -> None:
+        raise NotImplementedError
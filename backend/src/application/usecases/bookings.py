@@ -0,0 +1,86 @@
+import calendar
+
+from datetime import datetime, timedelta, timezone
+
+from src.application.interfaces.repositories.bookings import IBookingRepository
+from src.application.dtos.bookings import (
+    AvailabilitySchema,
+    BookingCreate,
+    BookingPeriod,
+    BookingSchema,
+    DayAvailability,
+    DayStatus,
+)
+
+
+class BookingUseCase:
+
+    def __init__(self, repository: IBookingRepository):
+        self.repository = repository
+
+    async def create_booking(
+        self,
+        offer_id: int,
+        user_id: int,
+        data: BookingCreate,
+    ) -> BookingSchema:
+        booking_data = data.model_dump()
+        booking_data['offer_id'] = offer_id
+        booking_data['user_id'] = user_id
+        # * overlaps are rejected by the exclusion constraint
+        async with self.repository.uow:
+            booking = await self.repository.add(booking_data)
+        return BookingSchema(**booking.to_dict())
+
+    async def get_bookings(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[BookingSchema], int]:
+        bookings = await self.repository.get_bookings(offer_id, limit, offset)
+        total = await self.repository.count(offer_id)
+        return [BookingSchema(**booking.to_dict()) for booking in bookings], total
+
+    async def get_availability(
+        self,
+        offer_id: int,
+        year: int,
+        month: int,
+    ) -> AvailabilitySchema:
+        """Day by day availability of a month (UTC)."""
+
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        days_count = calendar.monthrange(year, month)[1]
+        end = start + timedelta(days=days_count)
+        periods = await self.repository.get_booked_periods(offer_id, start, end)
+
+        # bookings never overlap, so booked time of a day is a plain sum
+        day = timedelta(days=1)
+        booked = [timedelta()] * days_count
+        for period_start, period_end in periods:
+            index = (period_start - start) // day
+            while index < days_count:
+                day_start = start + index * day
+                if day_start >= period_end:
+                    break
+                overlap = min(period_end, day_start + day) - max(period_start, day_start)
+                booked[index] += overlap
+                index += 1
+
+        days = []
+        for index, booked_time in enumerate(booked):
+            if not booked_time:
+                status = DayStatus.free
+            elif booked_time < day:
+                status = DayStatus.partial
+            else:
+                status = DayStatus.booked
+            days.append(DayAvailability(day=(start + index * day).date(), status=status))
+
+        return AvailabilitySchema(
+            year=year,
+            month=month,
+            booked=[BookingPeriod(start=s, end=e) for s, e in periods],
+            days=days,
+        )
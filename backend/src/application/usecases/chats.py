@@ -1,7 +1,15 @@
+from datetime import datetime
+
 from src.application.dtos.users import UserSchema
-from src.application.dtos.chats import ChatSchema, MessageSchema
-from src.application.utils.chats import ConnectionManager
+from src.application.dtos.chats import (
+    ChatReadOutput,
+    ChatSchema,
+    InboxChatSchema,
+    LastMessageSchema,
+    MessageSchema,
+)
 from src.application.interfaces.services.tokens import ITokenService
+from src.application.utils.chats import message_buffer
 from src.application.interfaces.repositories.users import IUserRepository
 from src.application.interfaces.repositories.chats import IChatRepository
 
@@ -28,9 +36,61 @@ class ChatUseCase:
             chat = await self.chat_repo.add(data)
         return ChatSchema(**chat.to_dict())
 
-    async def get_chats(self, user_id: int) -> list[ChatSchema]:
-        chats = await self.chat_repo.get_chats(user_id)
-        return [ChatSchema(**chat.to_entity().to_dict()) for chat in chats]
+    async def get_chats(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[ChatSchema], int]:
+        chats = await self.chat_repo.get_chats(user_id, limit, offset)
+        total = await self.chat_repo.count_chats(user_id)
+        return [ChatSchema(**chat.to_entity().to_dict()) for chat in chats], total
+
+    async def get_inbox(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[InboxChatSchema], int]:
+        rows = await self.chat_repo.get_inbox(user_id, limit, offset)
+        if offset or limit is None or len(rows) == limit:
+            total = await self.chat_repo.count_chats(user_id)
+        else:
+            total = len(rows)
+        response = []
+        for row in rows:
+            partner = row.partner
+            last_message = None
+            if row.last_message_id is not None:
+                last_message = LastMessageSchema(
+                    id=row.last_message_id,
+                    sender_id=row.sender_id,
+                    content=row.content,
+                    timestamp=row.timestamp,
+                )
+            response.append(
+                InboxChatSchema(
+                    id=row.id,
+                    partner=UserSchema(**partner.to_entity().to_dict()) if partner else None,
+                    last_message=last_message,
+                    unread=row.unread,
+                )
+            )
+        return response, total
+
+    async def mark_read(
+        self,
+        user_id: int,
+        chat_id: int,
+        message_id: int | None = None,
+    ) -> ChatReadOutput:
+        async with self.chat_repo.uow:
+            chat = await self.chat_repo.mark_read(chat_id, user_id, message_id)
+        if chat.first_user_id == user_id:
+            last_read_id = chat.first_user_read_id
+        else:
+            last_read_id = chat.second_user_read_id
+        return ChatReadOutput(last_read_id=last_read_id)
 
     async def get_chat(self, user_id: int, chat_id: int) -> ChatSchema:
         chat = await self.chat_repo.retrieve(chat_id=chat_id, user_id=user_id)
@@ -40,13 +100,57 @@ class ChatUseCase:
         chat_id = await self.chat_repo.get_chat_id(first_user_id, second_user_id)
         return chat_id
 
-    async def get_chat_messages(self, chat_id: int) -> list[MessageSchema]:
-        messages = await self.chat_repo.get_chat_messages(chat_id)
+    async def get_chat_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[MessageSchema], int]:
+        messages = await self.chat_repo.get_chat_messages(chat_id, limit, offset)
+        total = await self.chat_repo.count_chat_messages(chat_id)
         response = []
         for msg in messages:
             msg_data = msg.__dict__
             msg_data['sender'] = UserSchema(**msg_data['sender'].to_entity().to_dict())
             response.append(MessageSchema(**msg_data))
+        return response, total
+
+    async def get_chat_history(
+        self,
+        chat_id: int,
+        after: tuple[datetime, int] | None = None,
+        size: int = 20,
+    ) -> tuple[list[MessageSchema], tuple[datetime, int] | None]:
+        # fetch one extra row to know whether there is a next page
+        messages = await self.chat_repo.get_chat_history(chat_id, after, size + 1)
+        next_key = None
+        if len(messages) > size:
+            messages = messages[:size]
+            next_key = (messages[-1].timestamp, messages[-1].id)
+        response = []
+        for msg in messages:
+            msg_data = msg.to_entity().to_dict()
+            msg_data['sender'] = UserSchema(**msg.sender.to_entity().to_dict())
+            response.append(MessageSchema(**msg_data))
+        return response, next_key
+
+    async def get_recent_messages(
+        self,
+        chat_id: int,
+        since: int | None = None,
+        size: int = 50,
+    ) -> list[MessageSchema]:
+        """
+        The last `size` messages or the first `size` after `since`,
+        oldest first.
+        """
+
+        messages = await self.chat_repo.get_recent_messages(chat_id, since, size)
+        response = []
+        for msg in messages:
+            msg_data = msg.to_entity().to_dict()
+            msg_data['sender'] = UserSchema(**msg.sender.to_entity().to_dict())
+            response.append(MessageSchema(**msg_data))
         return response
 
     async def get_sender(self, token: str) -> int:
@@ -55,9 +159,21 @@ class ChatUseCase:
         sender = await self.user_repo.retrieve(id=user_id)
         return UserSchema(**sender.to_dict())
 
+    async def send_message(
+        self,
+        chat_id: int,
+        sender: UserSchema,
+        content: str,
+    ) -> MessageSchema:
+        data = {'chat_id': chat_id, 'sender_id': sender.id, 'content': content}
+        if message_buffer.enabled:
+            message = await message_buffer.add(data)
+        else:
+            async with self.chat_repo.uow:
+                message = await self.chat_repo.add_message(data)
+        return MessageSchema(**message.to_dict(), sender=sender)
+
     async def clear_chat(self, chat_id: int):
         async with self.chat_repo.uow:
             await self.chat_repo.clear_chat(chat_id)
 
-    def get_connection_manager(self) -> ConnectionManager:
-        return ConnectionManager(self.chat_repo, self.user_repo)
@@ -1,20 +1,45 @@
+import asyncio
+import numpy as np
+
+from datetime import datetime
+
+from src.application.exceptions import ValidationError
 from src.application.interfaces.repositories.offers import IOfferRepository
+from src.application.interfaces.services.storage import IStorageService
 from src.application.dtos.offers import (
     FeedbackCreate,
+    FeedbackSchema,
     OfferCreate,
+    OfferFilters,
+    OfferNearbySchema,
     OfferSchema,
+    OfferSearchSchema,
+    OfferSort,
     OfferUnitSchema,
     OfferUpdate,
     OfferCreateOutput,
+    QuoteRequest,
+    QuoteSchema,
 )
-from src.application.utils.common import generate_image_path
-from src.application.utils.offers import format_offer
+from src.application.utils.cache import cache, cached
+from src.application.utils.geo import covering_cells, encode_geohash
+from src.application.utils.quotes import quote, stay_hours
+from src.application.utils.offers import format_offer, offers_owner_tags
+
+
+# feedbacks embedded in the offer detail response
+FEEDBACKS_PAGE_SIZE = 20
 
 
 class OfferUseCase:
 
-    def __init__(self, repository: IOfferRepository):
+    def __init__(
+        self,
+        repository: IOfferRepository,
+        storage_service: IStorageService,
+    ):
         self.repository = repository
+        self.storage_service = storage_service
 
     async def create_offer(
         self,
@@ -22,10 +47,24 @@ class OfferUseCase:
         offer: OfferCreate,
         # images: list
     ) -> OfferCreateOutput:
+        # * files are stored and rendered before the transaction is opened,
+        # * an invalid image fails the request before anything is written
+        paths = []
+        for image in offer.images:
+            paths.append(await self.storage_service.save_image(image, 'offers'))
+
+        # thumbnails for lists, medium size for the detail page
+        await asyncio.gather(*[
+            self.storage_service.create_variants(path)
+            for path in paths
+        ])
+
         async with self.repository.uow:
             # Save offer
             offer_data = offer.model_dump(exclude=['prices', 'images'])
             offer_data['owner_id'] = user_id
+            if offer.latitude is not None:
+                offer_data['geohash'] = encode_geohash(offer.latitude, offer.longitude)
             offer_response = await self.repository.add(offer_data)
             offer_id = offer_response.id
 
@@ -35,51 +74,191 @@ class OfferUseCase:
             prices = await self.repository.add_prices(price_data)
 
             # Save images
-            images_input = []
-            folder = 'media/offers/'
-            for image in offer.images:
-                img_path = folder + image.filename
-                path = await generate_image_path(
-                    path=img_path,
-                    image=image,
-                    content_type=image.content_type,
-                )
-                image_data = {'data': path, 'offer_id': offer_id}
-                images_input.append(image_data)
-
+            images_input = [{'data': path, 'offer_id': offer_id} for path in paths]
             images_db_response = await self.repository.add_images(images_input)
             images_response = [image.to_dict() for image in images_db_response]
 
+        await cache.invalidate('offers')
+
         response = offer_response.to_dict()
         response['images'] = images_response
         response['prices'] = prices.to_dict()
         return OfferCreateOutput(**response)
 
+    @cached(
+        key='offer:{offer_id}',
+        tags=['offer:{offer_id}'],
+        # * feedbacks embed their authors' usernames
+        result_tags=lambda offer: [
+            f'user:{offer.owner_id}',
+            *(f'user:{feedback.user_id}' for feedback in offer.feedbacks),
+        ],
+        distributed=True,
+    )
     async def get_offer(self, offer_id: int) -> OfferUnitSchema:
-        offer, avg_rating = await self.repository.retrieve(id=offer_id)
-        response_data = format_offer(offer)
+        offer = await self.repository.retrieve(id=offer_id)
+        response_data = format_offer(offer, variant='medium')
 
-        # Get feedbacks
-        feedbacks = []
-        for feedback in offer.feedbacks:
-            feedback_entity = feedback.to_entity()
-            feedback_to_dict = feedback_entity.to_dict()
-            feedback_to_dict['user'] = feedback.user.username
-            feedbacks.append(feedback_to_dict)
+        # * only the first page, the rest via get_feedbacks
+        feedbacks, _ = await self.get_feedbacks(offer_id, limit=FEEDBACKS_PAGE_SIZE)
 
         response_data['feedbacks'] = feedbacks
-        response_data['avg_rating'] = avg_rating
+        response_data['avg_rating'] = offer.rating_avg
         return OfferUnitSchema(**response_data)
 
-    async def get_offers(self) -> list[OfferSchema]:
-        offers = await self.repository.list()
+    @cached(
+        key='offer:{offer_id}:feedbacks:{limit}:{offset}',
+        tags=['offer:{offer_id}'],
+        result_tags=lambda result: [f'user:{feedback.user_id}' for feedback in result[0]],
+    )
+    async def get_feedbacks(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[FeedbackSchema], int]:
+        feedbacks = await self.repository.get_feedbacks(offer_id, limit, offset)
+        if offset or limit is None or len(feedbacks) == limit:
+            total = await self.repository.count_feedbacks(offer_id)
+        else:
+            total = len(feedbacks)
+        response_data = []
+        for feedback in feedbacks:
+            feedback_data = feedback.to_entity().to_dict()
+            feedback_data['user'] = feedback.user.username
+            response_data.append(FeedbackSchema(**feedback_data))
+        return response_data, total
+
+    @cached(
+        key='offers:{sort.value}:{filters}:{limit}:{offset}',
+        tags=['offers'],
+        result_tags=offers_owner_tags,
+    )
+    async def get_offers(
+        self,
+        sort: OfferSort = OfferSort.id,
+        filters: OfferFilters = OfferFilters(),
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[OfferSchema], int]:
+        filters_data = filters.model_dump(exclude_none=True)
+        offers = await self.repository.list(limit, offset, sort.value, filters_data)
+        total = await self.repository.count(filters_data, sort.value)
         response_data = []
         for offer in offers:
             response_data.append(OfferSchema(**format_offer(offer)))
-        return response_data
+        return response_data, total
+
+    @cached(
+        key='offers:search:{text}:{limit}:{offset}',
+        tags=['offers'],
+        result_tags=offers_owner_tags,
+    )
+    async def search_offers(
+        self,
+        text: str,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[OfferSearchSchema], int]:
+        rows = await self.repository.search(text, limit, offset)
+        if offset or limit is None or len(rows) == limit:
+            total = await self.repository.count_search(text)
+        else:
+            total = len(rows)
+        response_data = []
+        for offer, rank, headline in rows:
+            offer_data = format_offer(offer)
+            offer_data['rank'] = rank
+            offer_data['headline'] = headline
+            response_data.append(OfferSearchSchema(**offer_data))
+        return response_data, total
+
+    async def get_nearby_offers(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[OfferNearbySchema], int]:
+        cells = covering_cells(latitude, longitude, radius_km)
+        args = (latitude, longitude, radius_km, cells)
+        rows = await self.repository.nearby(*args, limit, offset)
+        if offset or limit is None or len(rows) == limit:
+            total = await self.repository.count_nearby(*args)
+        else:
+            total = len(rows)
+        response_data = []
+        for offer, distance in rows:
+            offer_data = format_offer(offer)
+            offer_data['distance_km'] = round(distance, 3)
+            response_data.append(OfferNearbySchema(**offer_data))
+        return response_data, total
+
+    async def get_quotes(
+        self,
+        data: QuoteRequest,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[QuoteSchema], int]:
+        """Cheapest price of the stay for every matching offer, lowest first."""
+
+        filters = data.filters.model_dump(exclude_none=True)
+        rows = await self.repository.get_prices(data.offer_ids, filters)
+        if not rows:
+            return [], 0
+
+        matrix = np.array(rows, dtype=np.float64)
+        totals, counts = quote(matrix[:, 1:], stay_hours(data.start, data.end))
+
+        # ! offers that can't be rented for this stay are left out
+        order = np.argsort(totals, kind='stable')
+        order = order[np.isfinite(totals[order])]
+        offset = offset or 0
+        page = order[offset:offset + limit if limit is not None else None]
+
+        response_data = []
+        for index in page:
+            years, months, days, hours = counts[index].tolist()
+            response_data.append(QuoteSchema(
+                offer_id=int(matrix[index, 0]),
+                total=round(float(totals[index]), 2),
+                years=years,
+                months=months,
+                days=days,
+                hours=hours,
+            ))
+        return response_data, len(order)
+
+    async def get_offers_feed(
+        self,
+        after: tuple[datetime, int] | None = None,
+        size: int = 20,
+    ) -> tuple[list[OfferSchema], tuple[datetime, int] | None]:
+        # fetch one extra row to know whether there is a next page
+        offers = await self.repository.get_feed(after, size + 1)
+        next_key = None
+        if len(offers) > size:
+            offers = offers[:size]
+            next_key = (offers[-1].created_at, offers[-1].id)
+        response_data = [OfferSchema(**format_offer(offer)) for offer in offers]
+        return response_data, next_key
 
     async def update_offer(self, offer_id: int, data: OfferUpdate) -> OfferUpdate:
         offer_data = data.model_dump(exclude=['prices'], exclude_unset=True)
+        if 'latitude' in offer_data or 'longitude' in offer_data:
+            latitude, longitude = data.latitude, data.longitude
+            if 'latitude' not in offer_data or 'longitude' not in offer_data:
+                # the other coordinate is kept
+                offer = await self.repository.retrieve(id=offer_id)
+                latitude = offer_data.get('latitude', offer.latitude)
+                longitude = offer_data.get('longitude', offer.longitude)
+            if (latitude is None) != (longitude is None):
+                raise ValidationError('Latitude and longitude must be set together')
+            offer_data['geohash'] = (
+                encode_geohash(latitude, longitude)
+                if latitude is not None else None
+            )
         response = {}
         async with self.repository.uow:
             if offer_data:
@@ -87,17 +266,23 @@ class OfferUseCase:
                 response = offer.to_dict()
             if data.prices:
                 prices_data = data.prices.model_dump(exclude_unset=True)
-                filter_by = {'offer_id': offer_id}
-                prices = await self.repository.update_prices(prices_data, filter_by)
+                prices = await self.repository.update_prices(
+                    prices_data,
+                    offer_id=offer_id,
+                )
                 response['prices'] = prices.to_dict()
+        await cache.invalidate(f'offer:{offer_id}', 'offers')
         return OfferUpdate(**response)
 
     async def delete_offer(self, offer_id: int) -> dict:
         async with self.repository.uow:
             await self.repository.delete(offer_id)
+        await cache.invalidate(f'offer:{offer_id}', 'offers')
         return {'status': 'Deleted'}
 
     async def create_feedback(self, data: dict) -> FeedbackCreate:
         async with self.repository.uow:
             response = await self.repository.add_feedback(data)
+        # * rating aggregates are shown in lists too
+        await cache.invalidate(f'offer:{data['offer_id']}', 'offers')
         return FeedbackCreate(**response.to_dict())
@@ -23,11 +23,17 @@ from src.application.dtos.companies import (
     CompanyUpdate,
     CompanyRegister,
 )
-from src.application.utils.common import generate_image_path
-from src.application.utils.offers import format_offer
-from src.application.utils.users import PasswordService, prepare_image_data
+from src.application.utils.cache import cache, cached
+from src.application.utils.offers import format_offer, offers_owner_tags
+from src.application.utils.users import (
+    PasswordService,
+    invalidate_snapshot,
+    user_invalidated_channel,
+    user_snapshots,
+)
 from src.application.interfaces.services.tokens import ITokenService
 from src.application.interfaces.services.tasks import IBackgroundTasksService
+from src.application.interfaces.services.storage import IStorageService
 from src.application.interfaces.repositories.base import IRedisRepository
 from src.application.interfaces.repositories.users import (
     ICompanyRepository,
@@ -43,26 +49,27 @@ class UserUseCase:
         redis_repo: IRedisRepository,
         token_service: ITokenService,
         background_service: IBackgroundTasksService,
+        storage_service: IStorageService,
     ):
         self.repository = repository
         self.redis_repo = redis_repo
         self.token_service = token_service
         self.background_service = background_service
+        self.storage_service = storage_service
 
     async def registration(self, data: UserRegister) -> dict:
         input_data = data.model_dump(exclude_unset=True)
-        input_data['password'] = PasswordService.generate(data.password)
+        input_data['password'] = await PasswordService.agenerate(data.password)
 
         if data.avatar:
-            image = {
-                'path': 'media/users/',
-                'image': data.avatar,
-                'username': data.username
-            }
-            input_data['avatar'] = await prepare_image_data(image)
+            input_data['avatar'] = await self.storage_service.save_image(
+                image=data.avatar,
+                folder='users',
+            )
 
         async with self.repository.uow:
             user = await self.repository.add(input_data)
+        await cache.invalidate('users')
 
         response = {'status': 'Check your email for confirmation letter.'}
         token_data = {'user_id': user.id, 'email': data.email}
@@ -78,14 +85,24 @@ class UserUseCase:
 
         async with self.repository.uow:
             user = await self.repository.update({'is_active': True}, id=user_id)
+        await self.invalidate_user(user_id)
         return UserSchema(**user.to_dict())
 
     async def login(self, username: str, password: str) -> Token:
-        user = await self.get_user(username)
+        # ! never check a password against a cached hash
+        response = await self.repository.retrieve(username=username)
+        user = UserComplete(**response.to_dict())
 
         if user.provider != 'local':
             raise InvalidDataError('User is registered with social provider')
-        PasswordService.check(password, user.password)
+        await PasswordService.acheck(password, user.password)
+
+        # * transparently move the stored hash to the configured cost
+        if PasswordService.needs_rehash(user.password):
+            pswd = await PasswordService.agenerate(password)
+            async with self.repository.uow:
+                await self.repository.update({'password': pswd}, id=user.id)
+            await self.invalidate_user(user.id)
 
         jwt_data = {'id': user.id, 'username': user.username}
 
@@ -96,8 +113,7 @@ class UserUseCase:
         return Token(access_token=access, refresh_token=refresh)
 
     async def logout(self, token: str) -> dict:
-        await self.token_service.decode(token)
-        await self.redis_repo.sadd('jwt_blacklist', token)
+        await self.token_service.revoke(token, self.redis_repo)
         return {'status': 'You logged out'}
 
     async def update_token(self, form_data: RefreshToken) -> Token:
@@ -114,10 +130,21 @@ class UserUseCase:
             access = self.token_service.encode(token_data)
             return Token(access_token=access)
 
-    async def get_users(self) -> list[UserSchema]:
-        users = await self.repository.list()
-        return [UserSchema(**user.to_entity().to_dict()) for user in users]
-
+    @cached(key='users:{limit}:{offset}', tags=['users'])
+    async def get_users(
+        self,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[UserSchema], int]:
+        users = await self.repository.list(limit, offset)
+        total = await self.repository.count()
+        return [UserSchema(**user.to_entity().to_dict()) for user in users], total
+
+    @cached(
+        key='user:name:{username}',
+        result_tags=lambda user: [f'user:{user.id}'],
+        distributed=True,
+    )
     async def get_user(self, username: str) -> UserComplete:
         user = await self.repository.retrieve(username=username)
         return UserComplete(**user.to_dict())
@@ -126,33 +153,61 @@ class UserUseCase:
         token_data = await self.token_service.decode(token, rdb=self.redis_repo)
         return token_data
 
-    async def get_user_offers(self, data: str) -> list[dict]:
-        owner = await self.repository.get_user_offers(data)
-        offers = owner.offers
+    async def get_current_user(self, token: str) -> UserComplete:
+        token_data = await self.get_user_data(token)
+        user_id = token_data.get('id')
+        if user_id is None:
+            return await self.get_user(token_data.get('username'))
+
+        user = user_snapshots.get(user_id)
+        if user is None:
+            response = await self.repository.retrieve(id=user_id)
+            user = UserComplete(**response.to_dict())
+            user_snapshots.set(user_id, user)
+        return user.model_copy()
+
+    async def invalidate_user(self, user_id: int) -> None:
+        invalidate_snapshot(user_id)
+        await self.redis_repo.publish(user_invalidated_channel, user_id)
+        await cache.invalidate(f'user:{user_id}', 'users')
+
+    @cached(
+        key='user_offers:{username}:{limit}:{offset}',
+        tags=['offers'],
+        result_tags=offers_owner_tags,
+    )
+    async def get_user_offers(
+        self,
+        username: str,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[dict], int]:
+        owner = await self.repository.retrieve(username=username)
+        offers = await self.repository.get_user_offers(owner.id, limit, offset)
+        total = await self.repository.count_user_offers(owner.id)
         response_data = []
         for offer in offers:
             formatted = format_offer(offer, owner.username)
             response_data.append(formatted)
-        return response_data
+        return response_data, total
 
     async def update_user(self, user_id: int, data: UserUpdate) -> UserSchema:
         async with self.repository.uow:
             input_data = data.model_dump(exclude_unset=True)
             if data.avatar:
-                avatar = data.avatar
-                path = 'media/users/' + avatar.filename
-                input_data['avatar'] = await generate_image_path(
-                    path=path,
-                    image=avatar,
-                    content_type=avatar.content_type,
+                input_data['avatar'] = await self.storage_service.save_image(
+                    image=data.avatar,
+                    folder='users',
                 )
             response = await self.repository.update(input_data, id=user_id)
+        await self.invalidate_user(user_id)
         return UserSchema(**response.to_dict())
     
     async def reset_avatar(self, user_id: int) -> dict:
         async with self.repository.uow:
             default_avatar = 'static/img/user_logo.png'
             await self.repository.update({'avatar': default_avatar}, id=user_id)
+        await self.invalidate_user(user_id)
         return {'status': 'Avatar has been deleted'}
 
     async def change_password(
@@ -160,20 +215,26 @@ class UserUseCase:
         user: UserComplete,
         form_data: PasswordChange,
     ) -> dict:
-        PasswordService.check(form_data.old_password, user.password)
-        pswd = PasswordService.generate(form_data.new_password)
+        # ! the snapshot may hold a hash another worker already replaced
+        stored = await self.repository.retrieve(id=user.id)
+        await PasswordService.acheck(form_data.old_password, stored.password)
+        pswd = await PasswordService.agenerate(form_data.new_password)
         async with self.repository.uow:
             await self.repository.update({'password': pswd}, id=user.id)
+        await self.invalidate_user(user.id)
         return {'status': 'Password has been changed'}
 
     async def delete_user(self, user_id: int, token: str) -> dict:
         await self.delete_inactive_user(user_id)
-        await self.redis_repo.sadd('jwt_blacklist', token)
+        await self.token_service.revoke(token, self.redis_repo)
         return {'status': 'Deleted'}
 
     async def delete_inactive_user(self, user_id: int) -> None:
         async with self.repository.uow:
             await self.repository.delete(user_id)
+        # * offers and the company are deleted with the user
+        await self.invalidate_user(user_id)
+        await cache.invalidate('offers', f'company:{user_id}', 'companies')
 
     async def password_reset(self, form_data: PasswordReset) -> dict:
         email = form_data.email
@@ -195,11 +256,12 @@ class UserUseCase:
         # decode token
         data = await self.token_service.decode(token)
         user_id = data['user_id']
-        pswd = PasswordService.generate(pswd1)
+        pswd = await PasswordService.agenerate(pswd1)
 
         # try to update password
         async with self.repository.uow:
             await self.repository.update({'password': pswd}, id=user_id)
+        await self.invalidate_user(user_id)
         return {'status': 'Password has been changed'}
 
     def send_confirmation_letter(self, data: dict) -> str:
@@ -232,36 +294,70 @@ class UserUseCase:
 
 class CompanyUseCase:
     
-    def __init__(self, repository: ICompanyRepository):
+    def __init__(
+        self,
+        repository: ICompanyRepository,
+        storage_service: IStorageService,
+    ):
         self.repository = repository
+        self.storage_service = storage_service
 
-    async def get_companies(self) -> list[CompanySchema]:
-        companies = await self.repository.list()
-        return [CompanySchema(**company.to_entity().to_dict()) for company in companies]
-
+    @cached(key='companies:{limit}:{offset}', tags=['companies'])
+    async def get_companies(
+        self,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[CompanySchema], int]:
+        companies = await self.repository.list(limit, offset)
+        total = await self.repository.count()
+        response_data = [
+            CompanySchema(**company.to_entity().to_dict())
+            for company in companies
+        ]
+        return response_data, total
+
+    @cached(
+        key='company:name:{name}',
+        result_tags=lambda company: [f'company:{company.user_id}'],
+    )
     async def get_company(self, name: str) -> CompanySchema:
         company = await self.repository.retrieve(name=name)
         return CompanySchema(**company.to_dict())
 
-    async def get_company_offers(self, name: str) -> list[dict]:
-        company = await self.repository.get_company_offers(name)
-        offers = company.user.offers
+    @cached(
+        key='company_offers:{name}:{limit}:{offset}',
+        tags=['offers'],
+        result_tags=lambda result: offers_owner_tags(result, 'company'),
+    )
+    async def get_company_offers(
+        self,
+        name: str,
+        limit: int | None = None,
+        offset: int | None = None,
+    ) -> tuple[list[dict], int]:
+        company = await self.repository.retrieve(name=name)
+        user_id = company.user_id
+        offers = await self.repository.get_company_offers(user_id, limit, offset)
+        total = await self.repository.count_company_offers(user_id)
         response_data = []
         for offer in offers:
             formatted = format_offer(offer, company.name)
             response_data.append(formatted)
-        return response_data
+        return response_data, total
 
     async def register_company(self, user_id: int, data: CompanyRegister) -> CompanySchema:
         input_data = data.model_dump()
         input_data['user_id'] = user_id
 
         if data.logo:
-            image = {'path': 'media/companies/', 'image': data.logo}
-            input_data['logo'] = await prepare_image_data(image)
+            input_data['logo'] = await self.storage_service.save_image(
+                image=data.logo,
+                folder='companies',
+            )
 
         async with self.repository.uow:
             user = await self.repository.add(input_data)
+        await cache.invalidate('companies')
         return CompanySchema(**user.to_dict())
 
     async def update_company(
@@ -272,30 +368,38 @@ class CompanyUseCase:
         async with self.repository.uow:
             input_data = data.model_dump(exclude_unset=True)
             if data.logo:
-                logo = data.logo
-                path = 'media/users/' + logo.filename
-                input_data['logo'] = await generate_image_path(
-                    path=path,
-                    image=logo,
-                    content_type=logo.content_type,
+                input_data['logo'] = await self.storage_service.save_image(
+                    image=data.logo,
+                    folder='companies',
                 )
             company = await self.repository.get_user_company(user_id)
             response = await self.repository.update(input_data, id=company.id)
+        await cache.invalidate(f'company:{user_id}', 'companies')
         return CompanySchema(**response.to_dict())
 
     async def delete_company(self, user_id: int) -> dict:
         async with self.repository.uow:
             await self.repository.delete(user_id)
+        await cache.invalidate(f'company:{user_id}', 'companies')
         return {'status': 'Deleted'}
 
 
 class UserSocialUseCase:
 
-    def __init__(self, repository: IUserRepository, token_service: ITokenService):
+    def __init__(
+        self,
+        repository: IUserRepository,
+        redis_repo: IRedisRepository,
+        token_service: ITokenService,
+    ):
         self.repository = repository
+        self.redis_repo = redis_repo
         self.token_service = token_service
         self.http_client = httpx.AsyncClient()
 
+    # * same snapshot, pub/sub and cache invalidation as the other write paths
+    invalidate_user = UserUseCase.invalidate_user
+
     @staticmethod
     def get_google_link(client_id: str, redirect_uri: str) -> dict:
         url = 'https://accounts.google.com/o/oauth2/auth'
@@ -355,6 +459,7 @@ class UserSocialUseCase:
                 }
                 async with self.repository.uow:
                     await self.repository.update(switch_to_google, id=user.id)
+                await self.invalidate_user(user.id)
             data = {'id': user.id, 'username': user.username}
             access_token = self.token_service.encode(data)
             refresh_token = self.token_service.encode(data, exp_time=1440)
@@ -374,4 +479,5 @@ class UserSocialUseCase:
 
         async with self.repository.uow:
             response = await self.repository.add(input_data)
+        await cache.invalidate('users')
         return UserSchema(**response.to_dict())
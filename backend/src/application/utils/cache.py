@@ -0,0 +1,335 @@
+import asyncio
+import functools
+import inspect
+import json
+import math
+import time
+
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterable,
+    NamedTuple,
+    get_type_hints,
+)
+from pydantic import TypeAdapter
+
+from src.application.interfaces.services.cache import ICacheStore
+from src.application.utils.singleflight import SingleFlight
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        now = time.monotonic()
+        return [
+            (key, value)
+            for key, (expire_at, value) in self._data.items()
+            if expire_at > now
+        ]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+cache_invalidated_channel = 'cache_invalidated'
+
+MISSING = object()
+
+
+class ReadThroughCache:
+    """
+    Two-tier cache for use-case reads: TTLCache in the worker (L1) and a
+    shared ICacheStore (L2) bound on startup. Entries are fresh for `ttl`
+    seconds and may then be served stale for `stale_ttl` more seconds
+    while a single caller refreshes them. Concurrent misses of a key share
+    one load, `distributed` loads also take a short lock in the store so
+    only one worker queries the database.
+    """
+
+    lock_timeout = 2.0
+    lock_poll_interval = 0.05
+
+    def __init__(self, maxsize: int = 10_000):
+        self.local = TTLCache(maxsize=maxsize, ttl=24 * 60 * 60)
+        self.store: ICacheStore | None = None
+        self.counters = dict.fromkeys(
+            ('l1_hits', 'l2_hits', 'stale_hits', 'misses', 'invalidations'),
+            0,
+        )
+        self.flights = SingleFlight()
+        self._generation = 0
+
+    def bind(self, store: ICacheStore | None) -> None:
+        self.store = store
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            'size': len(self.local),
+            'l2': self.store is not None,
+            'in_flight': len(self.flights),
+            'shared_loads': self.flights.shared,
+        }
+
+    def reset(self) -> None:
+        """Invalidations may have been missed, drop everything local."""
+        self._generation += 1
+        self.local.clear()
+
+    def clear(self) -> None:
+        self.local.clear()
+        for name in self.counters:
+            self.counters[name] = 0
+
+    async def get_or_load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Any]],
+        adapter: TypeAdapter,
+        tags: Callable[[Any], Iterable[str]],
+        ttl: float,
+        stale_ttl: float,
+        distributed: bool = False,
+    ) -> Any:
+        entry = await self.read(key, adapter, stale_ttl)
+        if entry is not None:
+            if entry.fresh_until > time.time():
+                return entry.value
+            if key in self.flights:
+                # somebody is already refreshing this key
+                self.counters['stale_hits'] += 1
+                return entry.value
+        else:
+            self.counters['misses'] += 1
+
+        async def refresh():
+            # * the generation guards L1, the store clock guards L2
+            generation = self._generation
+            since = await self.store.clock() if self.store is not None else None
+            if distributed and self.store is not None:
+                lock = await self.store.acquire_lock(key, self.lock_timeout)
+                if lock is None:
+                    # another worker is loading, use its result or the stale one
+                    value = await self.wait_for(key, adapter, stale_ttl, entry)
+                    if value is not MISSING:
+                        return value
+            else:
+                lock = None
+
+            try:
+                value = await load()
+                if generation == self._generation:
+                    await self.set(
+                        key,
+                        value,
+                        adapter,
+                        tags(value),
+                        ttl,
+                        stale_ttl,
+                        since,
+                    )
+                return value
+            finally:
+                if lock is not None:
+                    await self.store.release_lock(key, lock)
+
+        return await self.flights.do(key, refresh)
+
+    async def read(
+        self,
+        key: str,
+        adapter: TypeAdapter,
+        stale_ttl: float,
+    ) -> 'CacheEntry | None':
+        entry = self.local.get(key)
+        if entry is not None:
+            self.counters['l1_hits'] += 1
+            return entry
+        if self.store is None:
+            return None
+
+        payload = await self.store.get(key)
+        if payload is None:
+            return None
+        data = json.loads(payload)
+        entry = CacheEntry(
+            value=adapter.validate_python(data['value']),
+            fresh_until=data['fresh_until'],
+            tags=frozenset(data['tags']),
+        )
+        expire_in = entry.fresh_until + stale_ttl - time.time()
+        self.local.set(key, entry, ttl=expire_in)
+        self.counters['l2_hits'] += 1
+        return entry
+
+    async def wait_for(
+        self,
+        key: str,
+        adapter: TypeAdapter,
+        stale_ttl: float,
+        stale: 'CacheEntry | None',
+    ) -> Any:
+        if stale is not None:
+            self.counters['stale_hits'] += 1
+            return stale.value
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            self.local.delete(key)
+            entry = await self.read(key, adapter, stale_ttl)
+            if entry is not None and entry.fresh_until > time.time():
+                return entry.value
+        return MISSING
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        adapter: TypeAdapter,
+        tags: Iterable[str],
+        ttl: float,
+        stale_ttl: float,
+        since: int | None = None,
+    ) -> None:
+        """Not stored when a tag was invalidated after `since` of the store clock."""
+
+        entry = CacheEntry(value, time.time() + ttl, frozenset(tags))
+        if self.store is not None:
+            payload = json.dumps({
+                'value': adapter.dump_python(value, mode='json'),
+                'fresh_until': entry.fresh_until,
+                'tags': list(entry.tags),
+            })
+            stored = await self.store.set(
+                key,
+                payload,
+                math.ceil(ttl + stale_ttl),
+                entry.tags,
+                since,
+            )
+            if not stored:
+                return
+        self.local.set(key, entry, ttl=ttl + stale_ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        self.drop_local(tags)
+        if self.store is not None:
+            await self.store.invalidate(tags)
+
+    def drop_local(self, tags: Iterable[str] | str) -> None:
+        """Also used as the pub/sub handler, messages are json lists of tags."""
+
+        if isinstance(tags, str):
+            tags = json.loads(tags)
+        tags = set(tags)
+        self._generation += 1
+        self.counters['invalidations'] += 1
+        for key, entry in self.local.items():
+            if entry.tags & tags:
+                self.local.delete(key)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fresh_until: float
+    tags: frozenset[str]
+
+
+cache = ReadThroughCache()
+
+
+def cached(
+    key: str,
+    tags: Iterable[str] = (),
+    result_tags: Callable[[Any], Iterable[str]] | None = None,
+    ttl: float = 60,
+    stale_ttl: float = 300,
+    distributed: bool = False,
+):
+    """
+    Cache a use-case method. `key` and `tags` are formatted with the call
+    arguments, `result_tags` adds tags computed from the returned value.
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        adapter = None
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            nonlocal adapter
+            if adapter is None:
+                adapter = TypeAdapter(get_type_hints(func)['return'])
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            cache_key = key.format(**arguments)
+
+            def get_tags(value):
+                formatted = {tag.format(**arguments) for tag in tags}
+                if result_tags is not None:
+                    formatted.update(result_tags(value))
+                return formatted
+
+            return await cache.get_or_load(
+                key=cache_key,
+                load=lambda: func(*args, **kwargs),
+                adapter=adapter,
+                tags=get_tags,
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                distributed=distributed,
+            )
+        return wrapper
+    return decorator
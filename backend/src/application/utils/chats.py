@@ -1,47 +1,109 @@
-from src.application.interfaces.repositories.users import IUserRepository
-from src.application.interfaces.repositories.chats import IChatRepository
+import asyncio
 
+from src.application.interfaces.services.chats import IMessageStore
+from src.domain.entities.chats import Message
 
-class ConnectionManager:
 
-    def __init__(
-        self,
-        chat_repo: IChatRepository,
-        user_repo: IUserRepository,
-    ):
-        self.active_connections: dict[int, list] = {}
-        self.chat_repo = chat_repo
-        self.user_repo = user_repo
+class MessageBuffer:
+    """
+    Write-behind buffer for chat messages. Messages arriving within `delay`
+    seconds, up to `max_rows` of them, are stored with one multi-row insert
+    and one commit. Every sender waits for its batch and gets the stored
+    message back, with the id and timestamp assigned by the database.
 
-    async def connect(self, websocket, chat_id: int):
-        await websocket.accept()
-        if chat_id not in self.active_connections:
-            self.active_connections[chat_id] = []
-        
-        self.active_connections[chat_id].append(websocket)
-        print(self.active_connections)
+    With `durable` off the commit does not wait for the WAL flush, a crash
+    may lose the last acknowledged batches but never leaves a partial one.
+    Senders still wait for the insert in both modes, the message is only
+    published once the database has given it an id.
 
-    def disconnect(self, websocket, chat_id: int):
-        self.active_connections[chat_id].remove(websocket)
-        print(self.active_connections)
+    A batch that fails, e.g. because one of its chats was cleared meanwhile,
+    is retried row by row so only the senders of bad rows get the error.
+    """
 
-    async def send_message(self, data: dict):
-        content = data['content']
-        chat_id = data['chat_id']
-        sender_id = data['sender']['id']
+    def __init__(self, max_rows: int = 100, delay: float = 0.005, durable: bool = True):
+        self.max_rows = max_rows
+        self.delay = delay
+        self.durable = durable
+        self.store: IMessageStore | None = None
+        self.flushes = 0
+        self.rows = 0
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._writes: set[asyncio.Task] = set()
 
-        async with self.chat_repo.uow:
-            msg = await self.save_to_db(chat_id, sender_id, content)
+    def configure(self, max_rows: int, delay: float, durable: bool) -> None:
+        self.max_rows = max_rows
+        self.delay = delay
+        self.durable = durable
 
-            data['id'] = msg.id
-            data['timestamp'] = msg.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    def bind(self, store: IMessageStore | None) -> None:
+        self.store = store
 
-            for connection in self.active_connections[chat_id]:
-                await connection.send_json(data)
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
 
-    async def receive_message(self, websocket) -> dict:
-        return await websocket.receive_json()
+    async def add(self, data: dict) -> Message:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # * a sender that went away never awaits its error, mark it retrieved
+        future.add_done_callback(self._retrieve)
+        self._pending.append((data, future))
+        if len(self._pending) >= self.max_rows:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self.flush)
+        # ! shielded, a sender that goes away must not lose its batch
+        return await asyncio.shield(future)
 
-    async def save_to_db(self, chat_id: int, sender_id: int, content: str):
-        data = {'chat_id': chat_id, 'sender_id': sender_id, 'content': content}
-        return await self.chat_repo.add_message(data)
+    def flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def close(self) -> None:
+        self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    @staticmethod
+    def _retrieve(future: asyncio.Future) -> None:
+        if not future.cancelled():
+            future.exception()
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            messages = await self.store.add_messages(
+                [data for data, _ in batch],
+                durable=self.durable,
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for item in batch:
+                await self._write([item])
+            return
+        self.flushes += 1
+        self.rows += len(messages)
+        for (_, future), message in zip(batch, messages):
+            future.set_result(message)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'durable': self.durable,
+            'pending': len(self._pending),
+            'writing': len(self._writes),
+            'flushes': self.flushes,
+            'rows': self.rows,
+        }
+
+
+message_buffer = MessageBuffer()
@@ -0,0 +1,95 @@
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+EARTH_RADIUS_KM = 6371.0
+
+# stored precision, a cell is about 5 x 5 m
+GEOHASH_PRECISION = 9
+
+
+def encode_geohash(
+    latitude: float,
+    longitude: float,
+    precision: int = GEOHASH_PRECISION,
+) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # bits alternate between longitude and latitude, longitude first
+        if even:
+            rng, coordinate = lon_range, longitude
+        else:
+            rng, coordinate = lat_range, latitude
+        middle = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            rng[0] = middle
+        else:
+            rng[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """Cell (height, width) in degrees."""
+
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> list[str]:
+    """
+    Geohash prefixes whose cells cover the circle: the cell containing the
+    center and its eight neighbours, at the finest precision where a cell
+    is not smaller than the radius.
+    """
+
+    km_per_lat = math.pi * EARTH_RADIUS_KM / 180
+    # ! degrees of longitude shrink towards the poles, use the circle's edge
+    edge = min(abs(latitude) + radius_km / km_per_lat, 90)
+    km_per_lon = km_per_lat * math.cos(math.radians(edge))
+
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(candidate)
+        if height * km_per_lat < radius_km or width * km_per_lon < radius_km:
+            break
+        precision = candidate
+    if precision == 0:
+        # ! the whole globe, no prefix can narrow it down
+        return ['']
+
+    height, width = cell_size(precision)
+    cells = []
+    for dlat in (-height, 0, height):
+        for dlon in (-width, 0, width):
+            lat = min(max(latitude + dlat, -90), 90 - 1e-9)
+            lon = (longitude + dlon + 180) % 360 - 180
+            cell = encode_geohash(lat, lon, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2) ** 2 +
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+        math.sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -1,20 +1,44 @@
 
-def format_offer(data, owner=None) -> dict:
-    offer_entity = data.to_entity()
+# * pre-generated webp variants, see MediaStorageService.create_variants
+IMAGE_VARIANTS = {
+    'thumb': (320, 240),
+    'medium': (1280, 960),
+}
+
+
+def image_variant(path: str, variant: str) -> str:
+    stem = path.rsplit('.', 1)[0]
+    return f'{stem}.{variant}.webp'
+
 
-    prices = data.prices
-    price_entity = prices.to_entity()
+def format_offer(data, owner=None, variant: str | None = 'thumb') -> dict:
+    offer_entity = data.to_entity()
 
     images = []
     for image in data.images:
-        image_entity = image.to_entity()
-        images.append(image_entity.to_dict())
+        image_data = image.to_entity().to_dict()
+        # ! only uploaded files have variants, not external urls
+        if variant and image.data.startswith('media/'):
+            image_data['original'] = image.data
+            image_data['data'] = image_variant(image.data, variant)
+        images.append(image_data)
 
     response_data = offer_entity.to_dict()
     if owner:
         response_data['owner'] = owner
     else:
         response_data['owner'] = data.owner.username
-    response_data['prices'] = price_entity.to_dict()
+    # * offers without prices are listed too, see OfferRepository.list
+    response_data['prices'] = data.prices.to_entity().to_dict() if data.prices else None
     response_data['images'] = images
     return response_data
+
+
+def offers_owner_tags(result: tuple[list, int], prefix: str = 'user') -> set[str]:
+    """Cache tags for a page of offers, formatted or not."""
+
+    offers, _ = result
+    return {
+        f'{prefix}:{offer['owner_id'] if isinstance(offer, dict) else offer.owner_id}'
+        for offer in offers
+    }
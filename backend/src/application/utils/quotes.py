@@ -0,0 +1,66 @@
+import math
+import numpy as np
+
+from datetime import datetime
+
+
+# rental units in hours, in the column order of the price matrix
+UNITS = {
+    'years': 365 * 24,
+    'months': 30 * 24,
+    'days': 24,
+    'hours': 1,
+}
+
+
+def stay_hours(start: datetime, end: datetime) -> int:
+    """Started hours are charged in full."""
+    return math.ceil((end - start).total_seconds() / 3600)
+
+
+def unit_combinations(hours: int) -> np.ndarray:
+    """
+    Candidate unit counts covering the stay. At every unit the cheapest
+    cover uses none of it, as many as fit, or one more to cover the rest,
+    so a handful of candidates is enough regardless of the prices.
+    """
+
+    sizes = list(UNITS.values())
+    combinations = set()
+
+    def walk(level: int, remaining: int, counts: tuple):
+        if remaining <= 0:
+            combinations.add(counts + (0,) * (len(sizes) - level))
+            return
+        size = sizes[level]
+        if level == len(sizes) - 1:
+            combinations.add(counts + (math.ceil(remaining / size),))
+            return
+        fit = remaining // size
+        for count in {0, fit, fit + 1}:
+            walk(level + 1, remaining - count * size, counts + (count,))
+
+    walk(0, hours, ())
+    return np.array(sorted(combinations), dtype=np.int64)
+
+
+def quote(prices: np.ndarray, hours: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cheapest cost of the stay for every row of `prices`, an (n, 4) matrix
+    of per year, month, day and hour prices. Zero price means the unit is
+    not offered. Returns (totals, counts), totals are inf when no offered
+    combination covers the stay.
+    """
+
+    combinations = unit_combinations(hours)
+    unit_prices = np.where(prices > 0, prices, np.inf)
+
+    # (n, k) cost of each candidate, unused units don't count even if not offered
+    costs = np.zeros((len(prices), len(combinations)))
+    for unit in range(combinations.shape[1]):
+        used = combinations[:, unit] > 0
+        costs[:, used] += np.outer(unit_prices[:, unit], combinations[used, unit])
+
+    best = costs.argmin(axis=1)
+    totals = costs[np.arange(len(prices)), best]
+    return totals, combinations[best]
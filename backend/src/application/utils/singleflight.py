@@ -0,0 +1,56 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable
+
+
+class LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight call and its
+    result or exception. If the leading call is cancelled, one of the
+    waiters takes over instead of failing.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+        self.shared = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._lead(key, func)
+
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except LeaderCancelled:
+                continue
+
+    async def _lead(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        # ! waiters may be gone, don't warn about unretrieved exceptions
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
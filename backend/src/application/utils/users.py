@@ -1,10 +1,59 @@
+import asyncio
+import threading
 import bcrypt
 
-from src.application.utils.common import generate_image_path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from src.application.utils.cache import TTLCache
 from src.application.exceptions import InvalidDataError, ValidationError
 
 
+# * UserComplete snapshots for authenticated requests, keyed by user id
+user_snapshots = TTLCache(maxsize=10_000, ttl=60)
+user_invalidated_channel = 'user_invalidated'
+
+
+def invalidate_snapshot(user_id: int | str) -> None:
+    user_snapshots.delete(int(user_id))
+
+
 class PasswordService:
+    """
+    bcrypt releases the GIL, so the async variants run it on a bounded
+    thread pool and keep the event loop free.
+    """
+
+    rounds = 12
+    max_workers = 4
+
+    _executor: ThreadPoolExecutor | None = None
+    _lock = threading.Lock()
+    _queued = 0
+    _running = 0
+    _completed = 0
+
+    @classmethod
+    def configure(cls, rounds: int, max_workers: int) -> None:
+        cls.shutdown()
+        cls.rounds = rounds
+        cls.max_workers = max_workers
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False)
+            cls._executor = None
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            'rounds': cls.rounds,
+            'max_workers': cls.max_workers,
+            'queued': cls._queued,
+            'running': cls._running,
+            'completed': cls._completed,
+        }
 
     @staticmethod
     def validate(password: str) -> None:
@@ -13,35 +62,69 @@ class PasswordService:
         if password.isalpha() or password.isdigit():
             raise ValidationError('Password must contain digits and characters')
 
-    @staticmethod
-    def hash(password: str) -> bytes:
+    @classmethod
+    def hash(cls, password: str) -> bytes:
         pwd_bytes = password.encode()
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=cls.rounds)
         hashed = bcrypt.hashpw(password=pwd_bytes, salt=salt)
         return hashed
 
     @classmethod
     def check(cls, password: str, hashed_password: str) -> None:
         cls.validate(password)
-        pwd_bytes = password.encode()
-        user_pwd_bytes = hashed_password.encode()
-        is_verified = bcrypt.checkpw(pwd_bytes, user_pwd_bytes)
-        if not is_verified:
+        if not cls.verify(password, hashed_password):
             raise InvalidDataError('Invalid password')
 
+    @staticmethod
+    def verify(password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
     @classmethod
     def generate(cls, password: str) -> str:
         cls.validate(password)
         hashed_password = cls.hash(password)
         return hashed_password.decode()
 
+    @classmethod
+    def needs_rehash(cls, hashed_password: str) -> bool:
+        # * hashes look like $2b$<rounds>$<salt+hash>
+        try:
+            return int(hashed_password.split('$')[2]) != cls.rounds
+        except (IndexError, ValueError):
+            return True
+
+    @classmethod
+    async def acheck(cls, password: str, hashed_password: str) -> None:
+        cls.validate(password)
+        if not await cls._run(cls.verify, password, hashed_password):
+            raise InvalidDataError('Invalid password')
+
+    @classmethod
+    async def agenerate(cls, password: str) -> str:
+        cls.validate(password)
+        hashed_password = await cls._run(cls.hash, password)
+        return hashed_password.decode()
+
+    @classmethod
+    async def _run(cls, func: Callable, *args):
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=cls.max_workers,
+                thread_name_prefix='bcrypt',
+            )
+
+        def job():
+            with cls._lock:
+                cls._queued -= 1
+                cls._running += 1
+            try:
+                return func(*args)
+            finally:
+                with cls._lock:
+                    cls._running -= 1
+                    cls._completed += 1
 
-async def prepare_image_data(file: dict) -> str:
-    image = file['image']
-    image_ext = image.filename.split('.')[-1]
-    path = f'{file['path']}{file['username']}.{image_ext}'
-    return await generate_image_path(
-        path=path,
-        image=image,
-        content_type=image.content_type,
-    )
+        with cls._lock:
+            cls._queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(cls._executor, job)
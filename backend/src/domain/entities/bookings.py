@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.domain.entities.base import Entity
+
+
+@dataclass
+class Booking(Entity):
+    offer_id: int
+    user_id: int
+    start: datetime
+    end: datetime
+    created_at: datetime
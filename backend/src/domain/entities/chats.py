@@ -8,6 +8,8 @@ from src.domain.entities.base import Entity
 class Chat(Entity):
     first_user_id: int
     second_user_id: int
+    first_user_read_id: int | None = None
+    second_user_read_id: int | None = None
 
 
 @dataclass
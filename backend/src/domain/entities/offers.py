@@ -1,5 +1,5 @@
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 from src.domain.entities.base import Entity
@@ -19,6 +19,13 @@ class Offer(Entity):
     phone: str
     created_at: datetime
     owner_id: int
+    rating_count: int = 0
+    rating_sum: int = 0
+    rating_histogram: list[int] = field(default_factory=lambda: [0] * 5)
+    rating_avg: float | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    geohash: str | None = None
 
 
 @dataclass
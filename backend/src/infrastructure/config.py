@@ -17,6 +17,39 @@ class Settings(BaseSettings):
     postgres_host: str
     postgres_test_db: str
 
+    # Passwords
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+
+    # Media
+    image_workers: int = 2
+
+    # Chats, frames queued per websocket and what to do when it is full:
+    # drop, disconnect or coalesce
+    chat_send_queue_size: int = 100
+    chat_overflow_policy: str = 'coalesce'
+    # recent messages kept in Redis per chat and pushed on connect
+    chat_recent_size: int = 50
+
+    # Write-behind batching of chat messages, off by default
+    chat_write_buffer: bool = False
+    chat_write_buffer_rows: int = 100
+    chat_write_buffer_delay: float = 0.005
+    chat_write_durable: bool = True
+
+    # Redis
+    redis_host: str = 'redis'
+    redis_port: int = 6379
+    redis_db: int = 0
+    redis_max_connections: int = 50
+    redis_pool_timeout: float = 5.0
+    redis_socket_timeout: float = 5.0
+    redis_socket_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30
+
+    # Shared secret of the /monitoring endpoints, closed when unset
+    monitoring_token: str | None = None
+
     # Email
     email_host_user: str
     email_host_password: str
@@ -43,3 +76,21 @@ def get_test_database_url():
     password = settings.postgres_password
     host = settings.postgres_host
     return f"postgresql+asyncpg://{user}:{password}@{host}/{db}"
+
+
+def get_redis_url():
+    settings = get_settings()
+    host = settings.redis_host
+    port = settings.redis_port
+    db = settings.redis_db
+    return f"redis://{host}:{port}/{db}"
+
+
+def get_redis_pool_kwargs():
+    settings = get_settings()
+    return {
+        'max_connections': settings.redis_max_connections,
+        'socket_timeout': settings.redis_socket_timeout,
+        'socket_connect_timeout': settings.redis_socket_connect_timeout,
+        'health_check_interval': settings.redis_health_check_interval,
+    }
@@ -1,7 +1,7 @@
 import contextlib
 
-from typing import AsyncGenerator, AsyncIterator
-from redis.asyncio import Redis, ConnectionPool
+from typing import AsyncContextManager, AsyncGenerator, AsyncIterator, Callable
+from redis.asyncio import Redis, BlockingConnectionPool
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncSession,
@@ -9,7 +9,12 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
-from src.infrastructure.config import get_database_url
+from src.infrastructure.config import (
+    get_database_url,
+    get_redis_pool_kwargs,
+    get_redis_url,
+    get_settings,
+)
     
     
 class DatabaseSessionManager:
@@ -57,18 +62,70 @@ class DatabaseSessionManager:
             await session.close()
 
 
+class RedisSessionManager:
+    """Owns one connection pool for the whole app, opened by the lifespan."""
+
+    def __init__(self, url: str, pool_kwargs: dict | None = None):
+        self._url = url
+        self._pool_kwargs = pool_kwargs or {}
+        self._pool = None
+        self._client = None
+
+    def open(self):
+        self._pool = BlockingConnectionPool.from_url(
+            self._url,
+            decode_responses=True,
+            **self._pool_kwargs,
+        )
+        self._client = Redis(connection_pool=self._pool)
+
+    async def close(self):
+        if self._client is None:
+            raise Exception("RedisSessionManager is not initialized")
+        await self._client.aclose()
+        await self._pool.disconnect()
+
+        self._client = None
+        self._pool = None
+
+    @property
+    def client(self) -> Redis:
+        if self._client is None:
+            raise Exception("RedisSessionManager is not initialized")
+        return self._client
+
+    def stats(self) -> dict:
+        if self._pool is None:
+            return {'initialized': False}
+        in_use = len(self._pool._in_use_connections)
+        available = len(self._pool._available_connections)
+        return {
+            'initialized': True,
+            'max_connections': self._pool.max_connections,
+            'created_connections': in_use + available,
+            'in_use_connections': in_use,
+            'available_connections': available,
+        }
+
+
 session_manager = DatabaseSessionManager(host=get_database_url())
+redis_manager = RedisSessionManager(
+    url=get_redis_url(),
+    pool_kwargs={
+        **get_redis_pool_kwargs(),
+        'timeout': get_settings().redis_pool_timeout,
+    },
+)
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with session_manager.session() as session:
         yield session
 
 
-async def get_redis_session() -> AsyncGenerator[Redis, None]:
-    pool = ConnectionPool(host='redis', decode_responses=True)
-    redis = Redis(connection_pool=pool)
-    try:
-        yield redis
-    finally:
-        await redis.aclose()
-        await redis.connection_pool.disconnect()
+def get_session_factory() -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """For long-lived connections that need a session per operation."""
+    return session_manager.session
+
+
+async def get_redis_session() -> Redis:
+    return redis_manager.client
@@ -0,0 +1,55 @@
+from datetime import datetime
+from sqlalchemy import CheckConstraint, ForeignKey, text
+from sqlalchemy.dialects.postgresql import TSTZRANGE, ExcludeConstraint, Range
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from src.domain.entities import bookings as entities
+from src.infrastructure.models.base import Base
+from src.infrastructure.models.offers import Offer
+from src.infrastructure.models.users import User
+
+
+class Booking(Base):
+    __tablename__ = 'booking'
+    __table_args__ = (
+        # * overlapping bookings of an offer fail on insert, without locks.
+        # * offer_id is compared as a one-element range, so the GiST index
+        # * needs no btree_gist extension
+        ExcludeConstraint(
+            (text("int4range(offer_id, offer_id, '[]')"), '&&'),
+            ('period', '&&'),
+            name='exclude_overlapping_bookings',
+            using='gist',
+        ),
+        CheckConstraint('NOT isempty(period)', name='check_period_not_empty'),
+    )
+
+    # Columns
+    # ! half-open [start, end), back-to-back bookings don't overlap
+    period: Mapped[Range[datetime]] = mapped_column(TSTZRANGE)
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=text("TIMEZONE('utc', now())")
+    )
+
+    # Foreign keys
+    offer_id: Mapped[int] = mapped_column(
+        ForeignKey('offer.id', ondelete='CASCADE'),
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'),
+        index=True,
+    )
+
+    # Relationships
+    offer: Mapped['Offer'] = relationship()
+    user: Mapped['User'] = relationship()
+
+    def to_entity(self):
+        return entities.Booking(
+            id=self.id,
+            offer_id=self.offer_id,
+            user_id=self.user_id,
+            start=self.period.lower,
+            end=self.period.upper,
+            created_at=self.created_at,
+        )
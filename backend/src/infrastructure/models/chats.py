@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, text, CheckConstraint, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, text, CheckConstraint, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.domain.entities import chats as entities
@@ -21,8 +21,13 @@ class Chat(Base):
     second_user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='SET NULL'),
         nullable=True,
+        index=True,
     )
 
+    # Read watermarks, the last message id each participant has read
+    first_user_read_id: Mapped[int | None]
+    second_user_read_id: Mapped[int | None]
+
     first_user: Mapped['User'] = relationship(
         back_populates='chats',
         foreign_keys=[first_user_id]
@@ -40,12 +45,20 @@ class Chat(Base):
         return entities.Chat(
             id=self.id,
             first_user_id=self.first_user_id,
-            second_user_id=self.second_user_id
+            second_user_id=self.second_user_id,
+            first_user_read_id=self.first_user_read_id,
+            second_user_read_id=self.second_user_read_id,
         )
 
 
 class Message(Base):
     __tablename__ = 'message'
+    __table_args__ = (
+        # keyset pagination of the chat history
+        Index('ix_message_chat_id_timestamp_id', 'chat_id', 'timestamp', 'id'),
+        # unread messages after a read watermark
+        Index('ix_message_chat_id_id', 'chat_id', 'id'),
+    )
 
     chat_id: Mapped[int] = mapped_column(
         ForeignKey('chat.id', ondelete='CASCADE')
@@ -53,6 +66,7 @@ class Message(Base):
     sender_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='SET NULL'),
         nullable=True,
+        index=True,
     )
     content: Mapped[str]
     timestamp: Mapped[datetime] = mapped_column(
@@ -1,5 +1,20 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, SmallInteger, CheckConstraint, UniqueConstraint, text
+from sqlalchemy import (
+    DDL,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    SmallInteger,
+    String,
+    CheckConstraint,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from src.domain.entities import offers as entities
@@ -9,6 +24,21 @@ from src.infrastructure.models.users import User
 
 class Offer(Base):
     __tablename__ = 'offer'
+    __table_args__ = (
+        # keyset pagination of the feed
+        Index('ix_offer_created_at_id', 'created_at', 'id'),
+        # catalogue filters, newest first within each
+        Index('ix_offer_city_offer_type_created_at', 'city', 'offer_type', 'created_at'),
+        Index('ix_offer_offer_type_created_at', 'offer_type', 'created_at'),
+        Index('ix_offer_owner_id_created_at', 'owner_id', 'created_at'),
+        Index('ix_offer_search_vector', 'search_vector', postgresql_using='gin'),
+        # geohash prefix lookups of /offers/nearby
+        Index(
+            'ix_offer_geohash',
+            'geohash',
+            postgresql_ops={'geohash': 'text_pattern_ops'},
+        ),
+    )
 
     # Columns
     name: Mapped[str]
@@ -20,6 +50,39 @@ class Offer(Base):
         server_default=text("TIMEZONE('utc', now())")
     )
 
+    # Rating aggregates, maintained by the feedback_rating_aggregate trigger
+    rating_count: Mapped[int] = mapped_column(server_default='0')
+    rating_sum: Mapped[int] = mapped_column(server_default='0')
+    rating_histogram: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer),
+        server_default='{0,0,0,0,0}',
+    )
+    rating_avg: Mapped[float | None] = mapped_column(
+        Numeric(2, 1, asdecimal=False),
+        Computed(
+            'CASE WHEN rating_count > 0 '
+            'THEN round(rating_sum::numeric / rating_count, 1) END',
+            persisted=True,
+        ),
+    )
+
+    # Location, geohash is derived from the coordinates on write
+    latitude: Mapped[float | None]
+    longitude: Mapped[float | None]
+    geohash: Mapped[str | None] = mapped_column(String(12))
+
+    # Full-text search document, see OfferRepository.search
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(city, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
     # Foreign keys
     owner_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE'),
@@ -51,6 +114,13 @@ class Offer(Base):
             phone=self.phone,
             created_at=self.created_at,
             owner_id=self.owner_id,
+            rating_count=self.rating_count,
+            rating_sum=self.rating_sum,
+            rating_histogram=self.rating_histogram,
+            rating_avg=self.rating_avg,
+            latitude=self.latitude,
+            longitude=self.longitude,
+            geohash=self.geohash,
         )
 
 
@@ -64,6 +134,7 @@ class Image(Base):
     offer: Mapped['Offer'] = relationship(back_populates='images')
     offer_id: Mapped[int] = mapped_column(
         ForeignKey('offer.id', ondelete='CASCADE'),
+        index=True,
     )
 
     def to_entity(self):
@@ -76,6 +147,19 @@ class Image(Base):
 
 class Price(Base):
     __tablename__ = 'price'
+    __table_args__ = (
+        Index('ix_price_offer_id', 'offer_id'),
+        # ! price range filters always require a non-zero price
+        *(
+            Index(
+                f'ix_price_{column}',
+                column,
+                'offer_id',
+                postgresql_where=text(f'{column} > 0'),
+            )
+            for column in ('per_hour', 'per_day', 'per_month', 'per_year')
+        ),
+    )
 
     per_hour: Mapped[float] = mapped_column(
         CheckConstraint('per_hour >= 0', name='check_per_hour_positive'),
@@ -111,6 +195,8 @@ class Feedback(Base):
     __tablename__ = 'feedback'
     __table_args__ = (
         UniqueConstraint('user_id', 'offer_id', name='unique_user_offer_feedback'),
+        # newest-first feedback pages of an offer
+        Index('ix_feedback_offer_id_created_at_id', 'offer_id', 'created_at', 'id'),
     )
 
     # Columns
@@ -144,3 +230,55 @@ class Feedback(Base):
             user_id=self.user_id,
             offer_id=self.offer_id,
         )
+
+
+# * "top rated" listings
+Index(
+    'ix_offer_rating_avg_count_id',
+    Offer.rating_avg.desc().nulls_last(),
+    Offer.rating_count.desc(),
+    Offer.id,
+)
+
+
+# * "cheapest first" listings, see OfferRepository.orderings
+Index(
+    'ix_price_per_day_sort',
+    func.nullif(Price.per_day, 0),
+    Price.offer_id,
+)
+
+# * "most expensive first", zero prices sort last on their own
+Index('ix_price_per_day_desc', Price.per_day.desc(), Price.offer_id)
+
+# * keep offer rating aggregates in sync within the feedback transaction
+rating_function = DDL("""
+CREATE OR REPLACE FUNCTION offer_rating_aggregate() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE offer SET
+            rating_count = rating_count - 1,
+            rating_sum = rating_sum - OLD.rating,
+            rating_histogram[OLD.rating] = rating_histogram[OLD.rating] - 1
+        WHERE id = OLD.offer_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE offer SET
+            rating_count = rating_count + 1,
+            rating_sum = rating_sum + NEW.rating,
+            rating_histogram[NEW.rating] = rating_histogram[NEW.rating] + 1
+        WHERE id = NEW.offer_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+rating_trigger = DDL("""
+CREATE TRIGGER feedback_rating_aggregate
+AFTER INSERT OR DELETE OR UPDATE OF rating, offer_id ON feedback
+FOR EACH ROW EXECUTE FUNCTION offer_rating_aggregate()
+""")
+
+event.listen(Feedback.__table__, 'after_create', rating_function)
+event.listen(Feedback.__table__, 'after_create', rating_trigger)
@@ -71,6 +71,7 @@ class Company(Base):
     # Columns
     user_id: Mapped[int] = mapped_column(
         ForeignKey('users.id', ondelete='CASCADE'),
+        index=True,
     )
     user: Mapped['User'] = relationship(back_populates='company')
     owner: Mapped[str]
@@ -1,5 +1,5 @@
 from redis.asyncio import Redis
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
@@ -13,12 +13,13 @@ from src.infrastructure.repositories.uow import SqlAlchemyUnitOfWork
 
 def switch_model(model):
     def decorator(func):
-        async def wrapper(self, data: dict):
+        async def wrapper(self, *args, **kwargs):
             original_model = self.model
             self.model = model
-            response = await func(self, data)
-            self.model = original_model
-            return response
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                self.model = original_model
         return wrapper
     return decorator
 
@@ -51,11 +52,21 @@ class SQLAlchemyRepository(ISqlRepository):
         query = select(self.model).filter_by(**kwargs)
         return await self.get_scalar(query)
 
-    async def list(self):
-        query = select(self.model)
+    async def list(self, limit: int | None = None, offset: int | None = None):
+        query = (
+            select(self.model).
+            order_by(self.model.id).
+            limit(limit).
+            offset(offset)
+        )
         res = await self.session.execute(query)
         return res.scalars().all()
 
+    async def count(self, **kwargs) -> int:
+        query = select(func.count()).select_from(self.model).filter_by(**kwargs)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
     async def get_scalar(self, query):
         try:
             response = await self.session.execute(query)
@@ -75,3 +86,15 @@ class RedisRepository(IRedisRepository):
 
     async def smembers(self, key: str):
         return await self.session.smembers(key)
+
+    async def set(self, key: str, value, ex: int | None = None):
+        await self.session.set(key, value, ex=ex)
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self.session.exists(key))
+
+    async def sismember(self, key: str, value: str) -> bool:
+        return bool(await self.session.sismember(key, value))
+
+    async def publish(self, channel: str, message: str):
+        await self.session.publish(channel, message)
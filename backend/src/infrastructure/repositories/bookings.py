@@ -0,0 +1,83 @@
+from datetime import datetime
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.exc import IntegrityError
+
+from src.application.exceptions import AlreadyExistsError, RepositoryError
+from src.application.interfaces.repositories.bookings import IBookingRepository
+from src.infrastructure.repositories.base import SQLAlchemyRepository
+from src.infrastructure.models.bookings import Booking
+
+
+# https://www.postgresql.org/docs/current/errcodes-appendix.html
+EXCLUSION_VIOLATION = '23P01'
+
+
+class BookingRepository(SQLAlchemyRepository, IBookingRepository):
+    model = Booking
+
+    def of_offer(self, offer_id: int):
+        # ! same expression as in the exclusion constraint,
+        # ! so that its GiST index is used
+        offer_key = func.int4range(self.model.offer_id, self.model.offer_id, '[]')
+        return offer_key.op('&&')(func.int4range(offer_id, offer_id, '[]'))
+
+    async def add(self, data: dict):
+        data = data.copy()
+        data['period'] = Range(data.pop('start'), data.pop('end'), bounds='[)')
+        stmt = insert(self.model).values(**data).returning(self.model)
+        try:
+            response = await self.session.execute(stmt)
+        except IntegrityError as e:
+            if getattr(e.orig, 'sqlstate', None) == EXCLUSION_VIOLATION:
+                raise AlreadyExistsError('Offer is already booked for this period')
+            raise RepositoryError(str(e))
+        return response.scalar_one().to_entity()
+
+    async def get_bookings(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        query = (
+            select(self.model).
+            where(self.of_offer(offer_id)).
+            order_by(func.lower(self.model.period), self.model.id).
+            limit(limit).
+            offset(offset)
+        )
+        bookings = await self.session.execute(query)
+        return [booking.to_entity() for booking in bookings.scalars().all()]
+
+    async def count(self, offer_id: int) -> int:
+        query = (
+            select(func.count()).
+            select_from(self.model).
+            where(self.of_offer(offer_id))
+        )
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def get_booked_periods(
+        self,
+        offer_id: int,
+        start: datetime,
+        end: datetime,
+    ) -> list[tuple[datetime, datetime]]:
+        """Booked periods overlapping [start, end), clipped to it."""
+
+        window = Range(start, end, bounds='[)')
+        query = (
+            select(
+                func.greatest(func.lower(self.model.period), literal(start)),
+                func.least(func.upper(self.model.period), literal(end)),
+            ).
+            where(
+                self.of_offer(offer_id),
+                self.model.period.overlaps(window),
+            ).
+            order_by(func.lower(self.model.period))
+        )
+        res = await self.session.execute(query)
+        return [tuple(row) for row in res.all()]
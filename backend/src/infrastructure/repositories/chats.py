@@ -1,5 +1,7 @@
-from sqlalchemy import delete, select, or_, and_
-from sqlalchemy.orm import joinedload
+from datetime import datetime
+from typing import Sequence
+from sqlalchemy import case, delete, func, insert, select, or_, and_, true, tuple_, update
+from sqlalchemy.orm import aliased, joinedload
 
 from src.application.interfaces.repositories.chats import IChatRepository
 from src.infrastructure.repositories.base import SQLAlchemyRepository, switch_model
@@ -14,6 +16,13 @@ class ChatRepository(SQLAlchemyRepository, IChatRepository):
     async def add_message(self, data: dict):
         return await self.add(data)
 
+    async def add_messages(self, data: Sequence[dict]):
+        """One multi-row insert, rows are returned in the order of `data`."""
+
+        stmt = insert(Message).returning(Message, sort_by_parameter_order=True)
+        res = await self.session.execute(stmt, list(data))
+        return [message.to_entity() for message in res.scalars().all()]
+
     async def retrieve(self, **kwargs):
         user_id = kwargs.get('user_id')
         query = (
@@ -30,7 +39,12 @@ class ChatRepository(SQLAlchemyRepository, IChatRepository):
         )
         return await self.get_scalar(query)
 
-    async def get_chats(self, user_id: int):
+    async def get_chats(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
         query = (
             select(self.model).
             where(
@@ -38,11 +52,134 @@ class ChatRepository(SQLAlchemyRepository, IChatRepository):
                     (self.model.first_user_id == user_id),
                     (self.model.second_user_id == user_id)
                 )
-            )
+            ).
+            order_by(self.model.id).
+            limit(limit).
+            offset(offset)
         )
         chats = await self.session.execute(query)
         return chats.scalars().all()
 
+    async def count_chats(self, user_id: int) -> int:
+        query = (
+            select(func.count(self.model.id)).
+            where(
+                or_(
+                    (self.model.first_user_id == user_id),
+                    (self.model.second_user_id == user_id)
+                )
+            )
+        )
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def get_inbox(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        """
+        Chats of the user with the partner, the last message and the number
+        of unread messages, most recently active first.
+        """
+
+        is_first = self.model.first_user_id == user_id
+        partner_id = case((is_first, self.model.second_user_id), else_=self.model.first_user_id)
+        read_id = case((is_first, self.model.first_user_read_id), else_=self.model.second_user_read_id)
+
+        # * both laterals run on the message indexes of a single chat
+        last_message = (
+            select(
+                Message.id,
+                Message.sender_id,
+                Message.content,
+                Message.timestamp,
+            ).
+            where(Message.chat_id == self.model.id).
+            order_by(Message.timestamp.desc(), Message.id.desc()).
+            limit(1).
+            lateral('last_message')
+        )
+        unread = (
+            select(func.count().label('count')).
+            where(
+                Message.chat_id == self.model.id,
+                Message.id > func.coalesce(read_id, 0),
+                Message.sender_id.is_distinct_from(user_id),
+            ).
+            lateral('unread')
+        )
+        partner = aliased(User, name='partner')
+
+        query = (
+            select(
+                self.model.id,
+                partner,
+                last_message.c.id.label('last_message_id'),
+                last_message.c.sender_id,
+                last_message.c.content,
+                last_message.c.timestamp,
+                unread.c.count.label('unread'),
+            ).
+            select_from(self.model).
+            outerjoin(last_message, true()).
+            join(unread, true()).
+            outerjoin(partner, partner.id == partner_id).
+            where(
+                or_(
+                    (self.model.first_user_id == user_id),
+                    (self.model.second_user_id == user_id)
+                )
+            ).
+            order_by(last_message.c.timestamp.desc().nulls_last(), self.model.id.desc()).
+            limit(limit).
+            offset(offset)
+        )
+        res = await self.session.execute(query)
+        return res.all()
+
+    async def mark_read(self, chat_id: int, user_id: int, message_id: int | None):
+        """
+        Move the user's read watermark forward, never back and never past
+        the last message of the chat.
+        """
+
+        last_id = (
+            select(func.coalesce(func.max(Message.id), 0)).
+            where(Message.chat_id == chat_id).
+            scalar_subquery()
+        )
+        if message_id is None:
+            message_id = last_id
+        else:
+            message_id = func.least(message_id, last_id)
+        first = self.model.first_user_id == user_id
+        first_read = self.model.first_user_read_id
+        second_read = self.model.second_user_read_id
+        stmt = (
+            update(self.model).
+            where(
+                self.model.id == chat_id,
+                or_(
+                    (self.model.first_user_id == user_id),
+                    (self.model.second_user_id == user_id)
+                )
+            ).
+            values(
+                first_user_read_id=case(
+                    (first, func.greatest(first_read, message_id)),
+                    else_=first_read,
+                ),
+                second_user_read_id=case(
+                    (first, second_read),
+                    else_=func.greatest(second_read, message_id),
+                ),
+            ).
+            returning(self.model)
+        )
+        return await self.get_scalar(stmt)
+
     async def get_chat_id(self, first_user_id: int, second_user_id: int):
         query = (
             select(self.model.id).
@@ -62,20 +199,75 @@ class ChatRepository(SQLAlchemyRepository, IChatRepository):
         res = await self.session.execute(query)
         return res.scalar_one()
 
-    @switch_model(Message)
-    async def get_chat_messages(self, chat_id: int):
+    async def get_chat_messages(
+        self,
+        chat_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
         query = (
-            select(self.model).
+            select(Message).
             options(
-                joinedload(self.model.sender).
+                joinedload(Message.sender).
                 selectin_polymorphic([User, Company])
             ).
-            where(self.model.chat_id == chat_id).
-            order_by(self.model.timestamp)
+            where(Message.chat_id == chat_id).
+            order_by(Message.timestamp, Message.id).
+            limit(limit).
+            offset(offset)
         )
         messages = await self.session.execute(query)
         return messages.scalars().all()
 
+    async def count_chat_messages(self, chat_id: int) -> int:
+        query = select(func.count(Message.id)).where(Message.chat_id == chat_id)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def get_chat_history(
+        self,
+        chat_id: int,
+        after: tuple[datetime, int] | None,
+        limit: int,
+    ):
+        query = (
+            select(Message).
+            options(joinedload(Message.sender)).
+            where(Message.chat_id == chat_id).
+            order_by(Message.timestamp.desc(), Message.id.desc()).
+            limit(limit)
+        )
+        if after is not None:
+            key = tuple_(Message.timestamp, Message.id)
+            query = query.where(key < tuple_(*after))
+        messages = await self.session.execute(query)
+        return messages.scalars().all()
+
+    async def get_recent_messages(
+        self,
+        chat_id: int,
+        since: int | None,
+        limit: int,
+    ):
+        """
+        Oldest first, the last `limit` messages or, after `since`, the first
+        `limit` that follow it, so a resuming client skips nothing.
+        """
+
+        query = (
+            select(Message).
+            options(joinedload(Message.sender)).
+            where(Message.chat_id == chat_id).
+            limit(limit)
+        )
+        if since is not None:
+            query = query.where(Message.id > since).order_by(Message.id)
+            messages = await self.session.execute(query)
+            return messages.scalars().all()
+        query = query.order_by(Message.timestamp.desc(), Message.id.desc())
+        messages = await self.session.execute(query)
+        return messages.scalars().all()[::-1]
+
     @switch_model(Message)
     async def clear_chat(self, chat_id: int):
         query = delete(self.model).where(self.model.chat_id == chat_id)
@@ -1,8 +1,13 @@
-from sqlalchemy import insert, select, func
-from sqlalchemy.orm import joinedload
+import math
+
+from datetime import datetime
+from typing import Sequence
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 from src.application.exceptions import NotFoundError
 from src.application.interfaces.repositories.offers import IOfferRepository
+from src.application.utils.geo import EARTH_RADIUS_KM
 from src.infrastructure.repositories.base import SQLAlchemyRepository, switch_model
 from src.infrastructure.models.offers import Image, Offer, Feedback, Price
 
@@ -10,38 +15,308 @@ from src.infrastructure.models.offers import Image, Offer, Feedback, Price
 class OfferRepository(SQLAlchemyRepository, IOfferRepository):
     model = Offer
 
-    async def list(self) -> list:
+    orderings = {
+        'id': (Offer.id,),
+        'newest': (Offer.created_at.desc(), Offer.id.desc()),
+        'rating': (
+            Offer.rating_avg.desc().nulls_last(),
+            Offer.rating_count.desc(),
+            Offer.id,
+        ),
+        'price_asc': (func.nullif(Price.per_day, 0).asc().nulls_last(), Offer.id),
+        'price_desc': (Price.per_day.desc(), Offer.id),
+    }
+
+    price_columns = ('per_hour', 'per_day', 'per_month', 'per_year')
+
+    # ! must match the configuration of the search_vector column
+    search_config = 'english'
+
+    def filters_prices(self, filters: dict, sort: str = 'id') -> bool:
+        return sort.startswith('price_') or any(
+            filters.get(f'{bound}_{column}') is not None
+            for column in self.price_columns
+            for bound in ('min', 'max')
+        )
+
+    def filter(self, query, filters: dict):
+        for field in ('city', 'offer_type', 'owner_id'):
+            if field in filters:
+                query = query.where(getattr(Offer, field) == filters[field])
+        if 'min_rating' in filters:
+            query = query.where(Offer.rating_avg >= filters['min_rating'])
+        if 'created_after' in filters:
+            query = query.where(Offer.created_at >= filters['created_after'])
+        if 'created_before' in filters:
+            query = query.where(Offer.created_at < filters['created_before'])
+
+        for column in self.price_columns:
+            low = filters.get(f'min_{column}')
+            high = filters.get(f'max_{column}')
+            if low is None and high is None:
+                continue
+            price = getattr(Price, column)
+            # ! zero price means the offer isn't rented for this period,
+            # ! the condition also matches the partial price indexes
+            query = query.where(price > 0)
+            if low is not None:
+                query = query.where(price >= low)
+            if high is not None:
+                query = query.where(price <= high)
+        return query
+
+    async def list(
+        self,
+        limit: int | None = None,
+        offset: int | None = None,
+        sort: str = 'id',
+        filters: dict | None = None,
+    ):
+        # * images are loaded with a separate query,
+        # * so LIMIT applies to offers instead of joined rows
+        filters = filters or {}
+        query = select(self.model)
+        # ! offers without prices are listed unless prices are filtered or sorted
+        if self.filters_prices(filters, sort):
+            query = query.join(self.model.prices)
+        else:
+            query = query.outerjoin(self.model.prices)
+        query = (
+            query.
+            options(
+                joinedload(self.model.owner),
+                contains_eager(self.model.prices),
+                selectinload(self.model.images),
+            ).
+            order_by(*self.orderings[sort]).
+            limit(limit).
+            offset(offset)
+        )
+        query = self.filter(query, filters)
+        offers = await self.session.execute(query)
+        return offers.scalars().all()
+
+    async def count(
+        self,
+        filters: dict | None = None,
+        sort: str = 'id',
+        **kwargs,
+    ) -> int:
+        filters = filters or {}
+        query = (
+            select(func.count()).
+            select_from(self.model).
+            filter_by(**kwargs)
+        )
+        if self.filters_prices(filters, sort):
+            query = query.join(self.model.prices)
+        query = self.filter(query, filters)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def search(
+        self,
+        text: str,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        """Return (offer, rank, headline) rows, best matches first."""
+
+        tsquery = func.websearch_to_tsquery(self.search_config, text)
+        rank = func.ts_rank(self.model.search_vector, tsquery)
+        # * rank the matches on the index, then build headlines for the page only
+        page = (
+            select(self.model.id, rank.label('rank')).
+            where(self.model.search_vector.op('@@')(tsquery)).
+            order_by(rank.desc(), self.model.id).
+            limit(limit).
+            offset(offset).
+            subquery()
+        )
+        # ! descriptions are user input, escaped so the <b> highlights are the only markup
+        description = self.model.description
+        for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')):
+            description = func.replace(description, char, entity)
+        headline = func.ts_headline(
+            self.search_config,
+            description,
+            tsquery,
+            'MaxFragments=2, MaxWords=20, MinWords=5',
+        )
+        query = (
+            select(self.model, page.c.rank, headline.label('headline')).
+            join(page, page.c.id == self.model.id).
+            options(
+                joinedload(self.model.owner),
+                joinedload(self.model.prices),
+                selectinload(self.model.images),
+            ).
+            order_by(page.c.rank.desc(), self.model.id)
+        )
+        res = await self.session.execute(query)
+        return res.all()
+
+    async def count_search(self, text: str) -> int:
+        tsquery = func.websearch_to_tsquery(self.search_config, text)
+        query = (
+            select(func.count()).
+            select_from(self.model).
+            where(self.model.search_vector.op('@@')(tsquery))
+        )
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    def distance(self, latitude: float, longitude: float):
+        """Haversine distance in km, see src.application.utils.geo."""
+
+        dlat = func.radians(self.model.latitude - latitude)
+        dlon = func.radians(self.model.longitude - longitude)
+        a = (
+            func.power(func.sin(dlat / 2), 2) +
+            math.cos(math.radians(latitude)) *
+            func.cos(func.radians(self.model.latitude)) *
+            func.power(func.sin(dlon / 2), 2)
+        )
+        return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(a, 1)))
+
+    def within(
+        self,
+        query,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        cells: Sequence[str],
+    ):
+        # * prefix scans of the geohash index, then the exact distance
+        distance = self.distance(latitude, longitude)
+        return query.where(
+            or_(*[self.model.geohash.startswith(cell) for cell in cells]),
+            distance <= radius_km,
+        )
+
+    async def nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        cells: Sequence[str],
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        """Return (offer, distance_km) rows, closest first."""
+
+        distance = self.distance(latitude, longitude)
+        query = (
+            select(self.model, distance.label('distance')).
+            options(
+                joinedload(self.model.owner),
+                joinedload(self.model.prices),
+                selectinload(self.model.images),
+            ).
+            order_by(distance, self.model.id).
+            limit(limit).
+            offset(offset)
+        )
+        query = self.within(query, latitude, longitude, radius_km, cells)
+        res = await self.session.execute(query)
+        return res.all()
+
+    async def count_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        cells: Sequence[str],
+    ) -> int:
+        query = select(func.count()).select_from(self.model)
+        query = self.within(query, latitude, longitude, radius_km, cells)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def get_prices(
+        self,
+        offer_ids: Sequence[int] | None = None,
+        filters: dict | None = None,
+    ):
+        """(offer_id, per_year, per_month, per_day, per_hour) rows."""
+
+        query = (
+            select(
+                Price.offer_id,
+                Price.per_year,
+                Price.per_month,
+                Price.per_day,
+                Price.per_hour,
+            ).
+            join(Price.offer).
+            order_by(Price.offer_id)
+        )
+        if offer_ids is not None:
+            query = query.where(Price.offer_id.in_(offer_ids))
+        query = self.filter(query, filters or {})
+        res = await self.session.execute(query)
+        return res.all()
+
+    async def get_feed(self, after: tuple[datetime, int] | None, limit: int):
         query = (
             select(self.model).
             options(
                 joinedload(self.model.owner),
-                joinedload(self.model.images),
                 joinedload(self.model.prices),
-            )
+                selectinload(self.model.images),
+            ).
+            order_by(self.model.created_at.desc(), self.model.id.desc()).
+            limit(limit)
         )
+        if after is not None:
+            key = tuple_(self.model.created_at, self.model.id)
+            query = query.where(key < tuple_(*after))
         offers = await self.session.execute(query)
-        return offers.unique().scalars().all()
+        return offers.scalars().all()
 
     async def retrieve(self, **kwargs):
-        avg_rating = func.round(func.avg(Feedback.rating), 1).label('avg_rating')
+        # * rating aggregates are stored on the offer, feedbacks are paginated
+        # * separately and images use their own query, so rows don't multiply
         query = (
-            select(self.model, avg_rating).
+            select(self.model).
             filter_by(**kwargs).
-            outerjoin(self.model.feedbacks).
             options(
                 joinedload(self.model.owner),
                 joinedload(self.model.prices),
-                joinedload(self.model.images),
-                joinedload(self.model.feedbacks).joinedload(Feedback.user),
-            ).
-            group_by(self.model)
+                selectinload(self.model.images),
+            )
         )
         res = await self.session.execute(query)
-        try:
-            offer, avg_rating = res.first()
-        except TypeError:
+        offer = res.scalar_one_or_none()
+        if offer is None:
             raise NotFoundError('Offer not found')
-        return offer, avg_rating
+        return offer
+
+    async def get_feedbacks(
+        self,
+        offer_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
+        query = (
+            select(Feedback).
+            where(Feedback.offer_id == offer_id).
+            options(joinedload(Feedback.user)).
+            order_by(Feedback.created_at.desc(), Feedback.id.desc()).
+            limit(limit).
+            offset(offset)
+        )
+        feedbacks = await self.session.execute(query)
+        return feedbacks.scalars().all()
+
+    async def count_feedbacks(self, offer_id: int) -> int:
+        query = (
+            select(func.count()).
+            select_from(Feedback).
+            where(Feedback.offer_id == offer_id)
+        )
+        res = await self.session.execute(query)
+        return res.scalar_one()
 
     @switch_model(Price)
     async def add_prices(self, data: dict):
@@ -1,5 +1,5 @@
-from sqlalchemy import delete, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import joinedload, selectinload
 
 from src.application.interfaces.repositories.users import (
     ICompanyRepository,
@@ -13,37 +13,60 @@ from src.infrastructure.models.offers import Offer
 class UserRepository(SQLAlchemyRepository, IUserRepository):
     model = User
 
-    async def get_user_offers(self, username: str):
+    async def get_user_offers(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
         query = (
-            select(self.model).
-            where(self.model.username == username).
+            select(Offer).
+            where(Offer.owner_id == user_id).
             options(
-                joinedload(self.model.offers).joinedload(Offer.prices),
-                joinedload(self.model.offers).joinedload(Offer.images)
-            )
+                joinedload(Offer.prices),
+                selectinload(Offer.images),
+            ).
+            order_by(Offer.id).
+            limit(limit).
+            offset(offset)
         )
         offers = await self.session.execute(query)
-        return offers.unique().scalar_one()
+        return offers.scalars().all()
+
+    async def count_user_offers(self, user_id: int) -> int:
+        query = select(func.count(Offer.id)).where(Offer.owner_id == user_id)
+        res = await self.session.execute(query)
+        return res.scalar_one()
 
 
 class CompanyRepository(SQLAlchemyRepository, ICompanyRepository):
     model = Company
 
-    async def get_company_offers(self, name: str):
+    async def get_company_offers(
+        self,
+        user_id: int,
+        limit: int | None = None,
+        offset: int | None = None,
+    ):
         query = (
-            select(self.model).
-            where(self.model.name == name).
+            select(Offer).
+            where(Offer.owner_id == user_id).
             options(
-                joinedload(self.model.user).
-                joinedload(User.offers).
                 joinedload(Offer.prices),
-                joinedload(self.model.user).
-                joinedload(User.offers).
-                joinedload(Offer.images)
-            )
+                selectinload(Offer.images),
+            ).
+            order_by(Offer.id).
+            limit(limit).
+            offset(offset)
         )
-        return await self.get_scalar(query)
-    
+        offers = await self.session.execute(query)
+        return offers.scalars().all()
+
+    async def count_company_offers(self, user_id: int) -> int:
+        query = select(func.count(Offer.id)).where(Offer.owner_id == user_id)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
     async def get_user_company(self, user_id: int):
         query = select(self.model).where(self.model.user_id == user_id)
         return await self.get_scalar(query)
@@ -0,0 +1,111 @@
+import json
+import uuid
+
+from typing import Iterable
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from src.application.interfaces.services.cache import ICacheStore
+from src.application.utils.cache import cache_invalidated_channel
+
+
+class RedisCacheStore(ICacheStore):
+    """
+    Shared L2 for ReadThroughCache. Every tag is a set of the keys carrying
+    it, invalidation deletes those keys and notifies the other workers.
+
+    Invalidation also stamps its tags with the next value of a shared clock.
+    A value loaded since an earlier clock value is not stored when one of
+    its tags was stamped later, whichever worker invalidated it.
+    """
+
+    key_prefix = 'cache:'
+    tag_prefix = 'cache_tag:'
+    lock_prefix = 'cache_lock:'
+    version_prefix = 'cache_version:'
+    clock_key = 'cache_clock'
+    # ! must outlast any load, a missing version reads as never invalidated
+    version_ttl = 24 * 60 * 60
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def get(self, key: str) -> str | None:
+        return await self.redis.get(self.key_prefix + key)
+
+    async def clock(self) -> int:
+        return int(await self.redis.get(self.clock_key) or 0)
+
+    async def set(
+        self,
+        key: str,
+        value: str,
+        ttl: int,
+        tags: Iterable[str],
+        since: int | None = None,
+    ) -> bool:
+        tags = list(tags)
+        version_keys = [self.version_prefix + tag for tag in tags]
+        async with self.redis.pipeline() as pipe:
+            try:
+                if since is not None and version_keys:
+                    # * an invalidation after the check aborts the transaction
+                    await pipe.watch(*version_keys)
+                    versions = await pipe.mget(*version_keys)
+                    if any(int(v) > since for v in versions if v is not None):
+                        return False
+                    pipe.multi()
+                pipe.set(self.key_prefix + key, value, ex=ttl)
+                for tag in tags:
+                    pipe.sadd(self.tag_prefix + tag, key)
+                    # ! keep the tag set at least as long as its keys
+                    pipe.expire(self.tag_prefix + tag, ttl, gt=True)
+                    pipe.expire(self.tag_prefix + tag, ttl, nx=True)
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        tag_keys = [self.tag_prefix + tag for tag in tags]
+        # * stamped before the keys are read, so no load can store them again
+        clock = await self.redis.incr(self.clock_key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.set(self.version_prefix + tag, clock, ex=self.version_ttl)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = (await pipe.execute())[len(tags):]
+
+        keys = {
+            self.key_prefix + (key.decode() if isinstance(key, bytes) else key)
+            for group in members
+            for key in group
+        }
+        if keys or tag_keys:
+            await self.redis.delete(*keys, *tag_keys)
+        await self.redis.publish(cache_invalidated_channel, json.dumps(tags))
+
+    async def acquire_lock(self, key: str, timeout: float) -> str | None:
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            self.lock_prefix + key,
+            token,
+            nx=True,
+            px=int(timeout * 1000),
+        )
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        # * delete the lock only if it is still ours
+        lock_key = self.lock_prefix + key
+        async with self.redis.pipeline() as pipe:
+            try:
+                await pipe.watch(lock_key)
+                if await pipe.get(lock_key) == token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+            except WatchError:
+                pass
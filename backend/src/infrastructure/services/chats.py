@@ -0,0 +1,416 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+import uuid
+
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable
+from fastapi import WebSocket, status
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError, WatchError
+from sqlalchemy import text
+
+from src.application.interfaces.services.chats import IMessageStore
+from src.infrastructure.database import DatabaseSessionManager
+from src.infrastructure.repositories.chats import ChatRepository
+from src.infrastructure.services.pubsub import PubSubListener
+
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    # discard the oldest queued frame
+    drop = 'drop'
+    # close the socket, the client reconnects and reloads the history
+    disconnect = 'disconnect'
+    # merge the backlog into one JSON array frame, up to `coalesce_factor`
+    # times the queue size in frames, then disconnect
+    coalesce = 'coalesce'
+
+
+class ChatConnection:
+    """
+    Outbound side of a chat websocket. Frames are queued without waiting
+    and sent by the connection's own writer task, so a slow client only
+    delays itself. A paused connection queues frames until `start`.
+    """
+
+    # * coalesced frames kept per queue slot before the client is dropped
+    coalesce_factor = 10
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        chat_id: int,
+        size: int,
+        overflow: OverflowPolicy,
+        paused: bool = False,
+    ):
+        self.websocket = websocket
+        self.chat_id = chat_id
+        self.size = size
+        self.overflow = overflow
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0.0
+        self.closed = False
+        self.frames = 0
+        self._closing: asyncio.Task | None = None
+        # (enqueued at, frames), frames of one item are sent as one array
+        self._queue: deque[tuple[float, list[str]]] = deque()
+        self._ready = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+        if not paused:
+            self.start()
+
+    def start(self, first: str | None = None) -> None:
+        """Start sending, the `first` frame goes out before the queue."""
+
+        if first is not None:
+            self._queue.appendleft((time.monotonic(), [first]))
+            self.frames += 1
+            self._ready.set()
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+
+    def put(self, frame: str) -> None:
+        if self.closed:
+            return
+        if len(self._queue) >= self.size:
+            if self.overflow == OverflowPolicy.drop:
+                _, frames = self._queue.popleft()
+                self.frames -= len(frames)
+                self.dropped += len(frames)
+            elif (
+                self.overflow == OverflowPolicy.disconnect or
+                self.frames >= self.size * self.coalesce_factor
+            ):
+                self._disconnect()
+                return
+            else:
+                enqueued_at = self._queue[0][0]
+                frames = [queued for _, item in self._queue for queued in item]
+                frames.append(frame)
+                self.coalesced += len(self._queue)
+                self._queue.clear()
+                self._queue.append((enqueued_at, frames))
+                self.frames += 1
+                return
+        self._queue.append((time.monotonic(), [frame]))
+        self.frames += 1
+        self._ready.set()
+
+    def _disconnect(self) -> None:
+        # * the backlog is released now, the client reloads it on reconnect
+        self.closed = True
+        self._queue.clear()
+        self.frames = 0
+        self._closing = asyncio.create_task(
+            self.close(status.WS_1013_TRY_AGAIN_LATER),
+        )
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    enqueued_at, frames = self._queue.popleft()
+                    self.frames -= len(frames)
+                    text = frames[0] if len(frames) == 1 else f'[{",".join(frames)}]'
+                    await self.websocket.send_text(text)
+                    self.sent += len(frames)
+                    self.max_lag = max(self.max_lag, time.monotonic() - enqueued_at)
+                self._ready.clear()
+        except Exception:
+            # ! the socket is gone, its receive loop disconnects it
+            self.closed = True
+
+    async def close(self, code: int | None = None) -> None:
+        self.closed = True
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        lag = time.monotonic() - self._queue[0][0] if self._queue else 0.0
+        return {
+            'chat_id': self.chat_id,
+            'queued': len(self._queue),
+            'frames': self.frames,
+            'lag': lag,
+            'max_lag': self.max_lag,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'closed': self.closed,
+        }
+
+
+class SqlMessageStore(IMessageStore):
+
+    def __init__(self, session_manager: DatabaseSessionManager):
+        self.session_manager = session_manager
+
+    async def add_messages(self, data, durable):
+        async with self.session_manager.session() as session:
+            repo = ChatRepository(session)
+            async with repo.uow:
+                if not durable:
+                    # * commit without waiting for the WAL flush
+                    await session.execute(text('SET LOCAL synchronous_commit TO OFF'))
+                return await repo.add_messages(data)
+
+
+class ChatHub:
+    """
+    Process-wide registry of chat websockets. Messages are delivered to the
+    local sockets directly and published to `chat:<chat_id>`, other workers
+    subscribe to a chat channel only while they hold a socket of that chat.
+    Messages published while a worker is disconnected from Redis are lost
+    for its sockets, clients resume from their last message on reconnect.
+
+    The last `recent_size` frames of a chat are kept in the capped list
+    `chat:<chat_id>:recent` and pushed to a socket on connect, so opening
+    a chat or resuming after a reconnect usually needs no database query.
+    The list is only created from the database and then appended to, so it
+    is always the tail of the history or missing.
+    """
+
+    channel_prefix = 'chat:'
+    # * idle chats fall back to the database after a week
+    recent_ttl = 7 * 24 * 3600
+
+    def __init__(
+        self,
+        send_queue_size: int = 100,
+        overflow: OverflowPolicy = OverflowPolicy.coalesce,
+        recent_size: int = 50,
+    ):
+        self.id = uuid.uuid4().hex
+        self.send_queue_size = send_queue_size
+        self.overflow = overflow
+        self.recent_size = recent_size
+        self.recent_hits = 0
+        self.recent_misses = 0
+        self.connections: dict[int, dict[WebSocket, ChatConnection]] = {}
+        self._redis: Redis | None = None
+        self._listener: PubSubListener | None = None
+
+    def configure(self, send_queue_size: int, overflow: str, recent_size: int) -> None:
+        self.send_queue_size = send_queue_size
+        self.overflow = OverflowPolicy(overflow)
+        self.recent_size = recent_size
+
+    def bind(self, redis: Redis | None, listener: PubSubListener | None) -> None:
+        """Without Redis messages reach the sockets of this worker only."""
+
+        self._redis = redis
+        self._listener = listener
+
+    def channel(self, chat_id: int) -> str:
+        return f'{self.channel_prefix}{chat_id}'
+
+    def recent_key(self, chat_id: int) -> str:
+        return f'{self.channel_prefix}{chat_id}:recent'
+
+    def sequence_key(self, chat_id: int) -> str:
+        return f'{self.channel_prefix}{chat_id}:sequence'
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        chat_id: int,
+        since: int | None = None,
+        load: Callable[[int | None, int], Awaitable[list[dict]]] | None = None,
+    ) -> None:
+        """
+        With `load`, the messages after `since`, or the recent ones, are sent
+        first as one array frame. `load(since, limit)` reads them from the
+        database when the recent list cannot answer. Messages published while
+        the backlog is read follow it, clients drop duplicates by id.
+
+        When more than `recent_size` messages follow `since`, the recent ones
+        are sent as {"reset": true, "messages": [...]} instead, the client
+        replaces what it has and pages back through the history.
+        """
+
+        await websocket.accept()
+        connection = ChatConnection(
+            websocket,
+            chat_id,
+            self.send_queue_size,
+            self.overflow,
+            paused=load is not None,
+        )
+        sockets = self.connections.setdefault(chat_id, {})
+        sockets[websocket] = connection
+        if len(sockets) == 1 and self._listener is not None:
+            handler = functools.partial(self._receive, chat_id)
+            await self._listener.subscribe(self.channel(chat_id), handler)
+        if load is None:
+            return
+
+        # * subscribed first, so nothing falls between the backlog and live frames
+        backlog, reset = [], False
+        try:
+            backlog = await self.recent(chat_id, since)
+            if backlog is None:
+                self.recent_misses += 1
+                backlog, reset = await self._load(chat_id, since, load)
+            else:
+                self.recent_hits += 1
+        finally:
+            messages = f'[{",".join(backlog)}]'
+            connection.start(
+                f'{{"reset": true, "messages": {messages}}}' if reset else messages,
+            )
+
+    async def recent(self, chat_id: int, since: int | None = None) -> list[str] | None:
+        """
+        Recent frames after `since`. None when the list cannot tell: it is
+        empty, or `since` already fell out of it.
+        """
+
+        if self._redis is None:
+            return None
+        try:
+            frames = await self._redis.lrange(self.recent_key(chat_id), 0, -1)
+        except (ConnectionError, TimeoutError, OSError) as e:
+            logger.warning('Chat %s recent messages not read: %s', chat_id, e)
+            return None
+        if not frames or since is None:
+            return frames or None
+        ids = [json.loads(frame)['id'] for frame in frames]
+        if since not in ids and since < max(ids):
+            return None
+        return [frame for frame, message_id in zip(frames, ids) if message_id > since]
+
+    async def _load(
+        self,
+        chat_id: int,
+        since: int | None,
+        load: Callable[[int | None, int], Awaitable[list[dict]]],
+    ) -> tuple[list[str], bool]:
+        """
+        Read from the database and, for the plain recent messages, create the
+        list. A message published meanwhile bumps the sequence and the list is
+        not created, it would miss that message. Returns (frames, reset),
+        reset when the gap after `since` is too long to send.
+        """
+
+        reset = False
+        if since is not None:
+            # * one extra row tells whether the gap fits into the backlog
+            frames = self._dump(await load(since, self.recent_size + 1))
+            if len(frames) <= self.recent_size:
+                return frames, reset
+            reset = True
+        if self._redis is None:
+            return self._dump(await load(None, self.recent_size)), reset
+
+        key = self.recent_key(chat_id)
+        frames = None
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(self.sequence_key(chat_id))
+                frames = self._dump(await load(None, self.recent_size))
+                if frames:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.rpush(key, *frames)
+                    pipe.expire(key, self.recent_ttl)
+                    await pipe.execute()
+        except WatchError:
+            pass
+        except (ConnectionError, TimeoutError, OSError) as e:
+            logger.warning('Chat %s recent messages not stored: %s', chat_id, e)
+        if frames is None:
+            frames = self._dump(await load(None, self.recent_size))
+        return frames, reset
+
+    @staticmethod
+    def _dump(messages: list[dict]) -> list[str]:
+        return [json.dumps(message) for message in messages]
+
+    async def forget(self, chat_id: int) -> None:
+        if self._redis is None:
+            return
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(self.sequence_key(chat_id))
+            pipe.delete(self.recent_key(chat_id))
+            await pipe.execute()
+
+    async def disconnect(self, websocket: WebSocket, chat_id: int) -> None:
+        sockets = self.connections.get(chat_id)
+        if sockets is None or websocket not in sockets:
+            return
+        # * the registry is updated before any await, disconnects interleave
+        connection = sockets.pop(websocket)
+        if not sockets:
+            del self.connections[chat_id]
+            if self._listener is not None:
+                await self._listener.unsubscribe(self.channel(chat_id))
+        await connection.close()
+
+    async def publish(self, chat_id: int, message: dict) -> None:
+        # * serialised once for every local and remote recipient
+        frame = json.dumps(message)
+        self._deliver(chat_id, frame)
+        if self._redis is None:
+            return
+        key = self.recent_key(chat_id)
+        try:
+            # * one round trip, the list is appended before anyone is notified
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.incr(self.sequence_key(chat_id))
+                pipe.expire(self.sequence_key(chat_id), self.recent_ttl)
+                pipe.rpushx(key, frame)
+                pipe.ltrim(key, -self.recent_size, -1)
+                pipe.expire(key, self.recent_ttl)
+                pipe.publish(self.channel(chat_id), f'{self.id}:{frame}')
+                await pipe.execute()
+        except (ConnectionError, TimeoutError, OSError) as e:
+            logger.warning('Chat %s message not published: %s', chat_id, e)
+
+    def _receive(self, chat_id: int, data: str) -> None:
+        origin, frame = data.split(':', 1)
+        # * already delivered locally by publish
+        if origin != self.id:
+            self._deliver(chat_id, frame)
+
+    def _deliver(self, chat_id: int, frame: str) -> None:
+        for connection in self.connections.get(chat_id, {}).values():
+            connection.put(frame)
+
+    def stats(self) -> dict:
+        sockets = [
+            connection.stats()
+            for connections in self.connections.values()
+            for connection in connections.values()
+        ]
+        return {
+            'chats': len(self.connections),
+            'sockets': len(sockets),
+            'send_queue_size': self.send_queue_size,
+            'overflow': self.overflow.value,
+            'recent_size': self.recent_size,
+            'recent_hits': self.recent_hits,
+            'recent_misses': self.recent_misses,
+            'connections': sockets,
+        }
+
+
+chat_hub = ChatHub()
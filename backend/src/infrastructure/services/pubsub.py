@@ -0,0 +1,125 @@
+import asyncio
+import inspect
+import logging
+
+from typing import Any, Awaitable, Callable
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubListener:
+    """One Redis pub/sub connection per worker, shared by all subscribers."""
+
+    retry_interval = 1.0
+
+    def __init__(self):
+        self._handlers: dict[str, Callable[[str], Any]] = {}
+        self._connect_hooks: list[Callable[[Redis], Awaitable[None]]] = []
+        self._disconnect_hooks: list[Callable[[], None]] = []
+        self._redis: Redis | None = None
+        self._pubsub = None
+        self._task: asyncio.Task | None = None
+        # ! SUBSCRIBE needs at least one channel
+        self._has_channels = asyncio.Event()
+
+    def add_handler(self, channel: str, handler: Callable[[str], Any]) -> None:
+        self._handlers[channel] = handler
+        self._has_channels.set()
+
+    async def subscribe(self, channel: str, handler: Callable[[str], Any]) -> None:
+        """Add a handler while the listener is running."""
+
+        self.add_handler(channel, handler)
+        await self._send('subscribe', channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        if self._handlers.pop(channel, None) is None:
+            return
+        if not self._handlers:
+            self._has_channels.clear()
+        await self._send('unsubscribe', channel)
+
+    async def _send(self, command: str, channel: str) -> None:
+        pubsub = self._pubsub
+        # * not connected yet, _run subscribes to every handler on connect
+        if pubsub is None:
+            return
+        try:
+            await getattr(pubsub, command)(channel)
+        except (ConnectionError, TimeoutError, OSError) as e:
+            # * the reconnect in _run resubscribes to the current handlers
+            logger.warning('Pub/sub %s %s failed: %s', command, channel, e)
+
+    def on_connect(self, hook: Callable[[Redis], Awaitable[None]]) -> None:
+        """Hooks run after subscribing, so no message is missed while they run."""
+        self._connect_hooks.append(hook)
+
+    def on_disconnect(self, hook: Callable[[], None]) -> None:
+        self._disconnect_hooks.append(hook)
+
+    async def start(self, redis: Redis) -> None:
+        self._redis = redis
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._disconnected()
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_channels.wait()
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                channels = list(self._handlers)
+                await pubsub.subscribe(*channels)
+                self._pubsub = pubsub
+                # * handlers added while subscribing
+                added = set(self._handlers) - set(channels)
+                if added:
+                    await pubsub.subscribe(*added)
+                for hook in self._connect_hooks:
+                    await hook(self._redis)
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        await self._dispatch(message)
+            except (ConnectionError, TimeoutError, OSError) as e:
+                logger.warning('Pub/sub connection lost: %s', e)
+                self._disconnected()
+                await asyncio.sleep(self.retry_interval)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+
+    async def _dispatch(self, message: dict) -> None:
+        channel = self._decode(message['channel'])
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            result = handler(self._decode(message['data']))
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception('Pub/sub handler for %s failed', channel)
+
+    def _disconnected(self) -> None:
+        for hook in self._disconnect_hooks:
+            hook()
+
+    @staticmethod
+    def _decode(value: bytes | str) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+
+listener = PubSubListener()
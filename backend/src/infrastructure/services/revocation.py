@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import math
+import time
+import uuid
+
+from redis.asyncio import Redis
+
+from src.application.interfaces.repositories.base import IRedisRepository
+
+
+class BloomFilter:
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(item)
+        )
+
+
+class TokenRevocationList:
+    """
+    Revoked tokens are stored as `jwt_revoked:<jti>` keys that expire
+    together with the token. Every worker mirrors them in a bloom filter
+    kept up to date over pub/sub, so Redis is queried only on a filter hit
+    or while the worker is not subscribed.
+    """
+
+    key_prefix = 'jwt_revoked:'
+    channel = 'jwt_revoked'
+
+    # ! set used before tokens had a jti, checked only for such tokens
+    legacy_key = 'jwt_blacklist'
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.synced = False
+        # * tags own publications, see receive
+        self.id = uuid.uuid4().hex
+        self._redis: Redis | None = None
+        self._rebuilding: list[str] | None = None
+        self._rebuild: asyncio.Task | None = None
+
+    @staticmethod
+    def get_token_id(claims: dict, token: str) -> str:
+        return claims.get('jti') or hashlib.sha256(token.encode()).hexdigest()
+
+    async def revoke(self, claims: dict, token: str, rdb: IRedisRepository) -> None:
+        token_id = self.get_token_id(claims, token)
+        ttl = max(math.ceil(claims['exp'] - time.time()), 1)
+        await rdb.set(self.key_prefix + token_id, 1, ex=ttl)
+        self.add(token_id)
+        await rdb.publish(self.channel, f'{self.id}:{token_id}')
+
+    async def is_revoked(
+        self,
+        claims: dict,
+        token: str,
+        rdb: IRedisRepository,
+    ) -> bool:
+        if 'jti' not in claims and await rdb.sismember(self.legacy_key, token):
+            return True
+
+        token_id = self.get_token_id(claims, token)
+        if self.synced and token_id not in self.bloom:
+            return False
+        return await rdb.exists(self.key_prefix + token_id)
+
+    def receive(self, data: str) -> None:
+        # * untagged ids come from workers started before the origin tag
+        origin, _, token_id = data.rpartition(':')
+        # * already added by revoke
+        if origin != self.id:
+            self.add(token_id)
+
+    def add(self, token_id: str) -> None:
+        self.bloom.add(token_id)
+        if self._rebuilding is not None:
+            self._rebuilding.append(token_id)
+        elif (
+            self.synced
+            and self.bloom.count > self.bloom.capacity
+            and (self._rebuild is None or self._rebuild.done())
+        ):
+            # keep the false positive rate bounded
+            self._rebuild = asyncio.create_task(self.load(self._redis))
+
+    async def load(self, redis: Redis) -> None:
+        """Rebuild the filter from Redis. Expired tokens are dropped."""
+
+        # ! one rebuild at a time, a reconnect waits for the running one
+        rebuild = self._rebuild
+        if (
+            rebuild is not None
+            and not rebuild.done()
+            and rebuild is not asyncio.current_task()
+        ):
+            await asyncio.wait({rebuild})
+
+        self._redis = redis
+        self._rebuilding = token_ids = []
+        try:
+            async for key in redis.scan_iter(match=self.key_prefix + '*', count=1000):
+                if isinstance(key, bytes):
+                    key = key.decode()
+                token_ids.append(key.removeprefix(self.key_prefix))
+        finally:
+            self._rebuilding = None
+
+        capacity = max(self.capacity, len(token_ids) * 2)
+        bloom = BloomFilter(capacity, self.error_rate)
+        for token_id in token_ids:
+            bloom.add(token_id)
+        self.bloom = bloom
+        self.synced = True
+
+    def reset(self) -> None:
+        self.synced = False
+
+
+revoked_tokens = TokenRevocationList()
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import uuid
+
+import aiofiles
+import aiofiles.os
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import UploadFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from src.application.exceptions import ValidationError
+from src.application.interfaces.services.storage import IStorageService
+from src.application.utils.offers import IMAGE_VARIANTS, image_variant
+
+
+def render_variants(path: str) -> None:
+    """Runs in a worker process, writes every missing variant of `path`."""
+
+    targets = {
+        name: image_variant(path, name)
+        for name in IMAGE_VARIANTS
+        if not os.path.exists(image_variant(path, name))
+    }
+    if not targets:
+        return
+
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        for name, target in targets.items():
+            size = IMAGE_VARIANTS[name]
+            if name == 'thumb':
+                # cards have a fixed size, crop instead of letterboxing
+                variant = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+            else:
+                variant = image.copy()
+                variant.thumbnail(size, Image.Resampling.LANCZOS)
+
+            tmp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+            variant.save(tmp_path, 'WEBP', quality=80, method=4)
+            os.replace(tmp_path, target)
+
+
+class MediaStorageService(IStorageService):
+    """
+    Uploads are streamed to disk while being hashed and stored once under
+    `media/<folder>/<h[:2]>/<h[2:4]>/<h>.<ext>`, so identical files share
+    a path and different files never overwrite each other.
+    """
+
+    chunk_size = 64 * 1024
+    signatures = {
+        b'\x89PNG\r\n\x1a\n': 'png',
+        b'\xff\xd8\xff': 'jpg',
+    }
+
+    max_workers = 2
+    _executor: ProcessPoolExecutor | None = None
+
+    def __init__(self, root: str = 'src', max_size: int = 10 * 1024 * 1024):
+        self.root = root
+        self.max_size = max_size
+
+    @classmethod
+    def configure(cls, max_workers: int) -> None:
+        cls.shutdown()
+        cls.max_workers = max_workers
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        if MediaStorageService._executor is None:
+            # ! forking a process that runs threads can deadlock the children
+            MediaStorageService._executor = ProcessPoolExecutor(
+                cls.max_workers,
+                mp_context=multiprocessing.get_context('forkserver'),
+            )
+        return MediaStorageService._executor
+
+    @staticmethod
+    def _discard_executor(executor: ProcessPoolExecutor) -> None:
+        # * concurrent callers may have replaced the broken pool already
+        if MediaStorageService._executor is executor:
+            MediaStorageService.shutdown()
+
+    async def create_variants(self, path: str) -> None:
+        loop = asyncio.get_running_loop()
+        full_path = os.path.join(self.root, path)
+        # * a crashed worker breaks the whole pool, retry once on a new one
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                await loop.run_in_executor(executor, render_variants, full_path)
+                return
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+            except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+                raise ValidationError('Image could not be processed')
+        raise ValidationError('Image could not be processed')
+
+    async def save_image(self, image: UploadFile, folder: str) -> str:
+        directory = os.path.join(self.root, 'media', folder)
+        await aiofiles.os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f'.{uuid.uuid4().hex}.tmp')
+
+        try:
+            digest, header = await self._write(image, tmp_path)
+            ext = self._detect_type(header)
+
+            path = f'media/{folder}/{digest[:2]}/{digest[2:4]}/{digest}.{ext}'
+            full_path = os.path.join(self.root, path)
+            if await aiofiles.os.path.exists(full_path):
+                await aiofiles.os.remove(tmp_path)
+            else:
+                await aiofiles.os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                await aiofiles.os.replace(tmp_path, full_path)
+        except BaseException:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+            raise
+        return path
+
+    async def _write(self, image: UploadFile, path: str) -> tuple[str, bytes]:
+        hasher = hashlib.sha256()
+        header = b''
+        size = 0
+        async with aiofiles.open(path, 'wb') as f:
+            while chunk := await image.read(self.chunk_size):
+                size += len(chunk)
+                if size > self.max_size:
+                    raise ValidationError('Image is too large')
+                if len(header) < 8:
+                    header += chunk[:8 - len(header)]
+                hasher.update(chunk)
+                await f.write(chunk)
+        return hasher.hexdigest(), header
+
+    def _detect_type(self, header: bytes) -> str:
+        for signature, ext in self.signatures.items():
+            if header.startswith(signature):
+                return ext
+        raise ValidationError('Only PNG and JPEG images are allowed')
@@ -1,14 +1,22 @@
+import hashlib
+import time
 import jwt
 
 from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 from redis.asyncio import Redis
 
 from src.application.exceptions import InvalidDataError
+from src.application.utils.cache import TTLCache
 from src.infrastructure.config import get_settings
+from src.infrastructure.services.revocation import revoked_tokens
 
 
 settings = get_settings()
 
+# * verified claims keyed by token digest, never outlive the token itself
+claims_cache = TTLCache(maxsize=10_000, ttl=300)
+
 
 class JWTService:
 
@@ -16,17 +24,31 @@ class JWTService:
     def encode(data: dict, exp_time: int = 10) -> str:
         expire_at = datetime.now(timezone.utc) + timedelta(minutes=exp_time)
         to_encode = data.copy()
-        to_encode.update({'exp': expire_at})
+        to_encode.update({'exp': expire_at, 'jti': uuid4().hex})
         encoded = jwt.encode(to_encode, key=settings.secret_key)
         return encoded
 
     @staticmethod
     async def decode(token: str, rdb: Redis | None = None) -> dict:
-        if rdb:
-            if token in await rdb.smembers('jwt_blacklist'):
-                raise InvalidDataError('Token is in the blacklist')
-        try:
-            data = jwt.decode(token, key=settings.secret_key, algorithms=['HS256'])
-        except jwt.exceptions.InvalidTokenError:
-            raise InvalidDataError('Invalid token')
-        return data
+        digest = hashlib.sha256(token.encode()).digest()
+        data = claims_cache.get(digest)
+        if data is None:
+            try:
+                data = jwt.decode(
+                    token,
+                    key=settings.secret_key,
+                    algorithms=['HS256'],
+                )
+            except jwt.exceptions.InvalidTokenError:
+                raise InvalidDataError('Invalid token')
+            claims_cache.set(digest, data, ttl=data['exp'] - time.time())
+
+        # ! revocation is checked on every call, cached or not
+        if rdb and await revoked_tokens.is_revoked(data, token, rdb):
+            raise InvalidDataError('Token has been revoked')
+        return data.copy()
+
+    @classmethod
+    async def revoke(cls, token: str, rdb: Redis) -> None:
+        data = await cls.decode(token)
+        await revoked_tokens.revoke(data, token, rdb)
@@ -3,6 +3,7 @@ from sqladmin import ModelView
 from src.infrastructure.models.offers import Offer, Feedback, Image, Price
 from src.infrastructure.models.users import User, Company
 from src.infrastructure.models.chats import Chat, Message
+from src.infrastructure.models.bookings import Booking
 
 
 class BaseAdmin(ModelView):
@@ -39,3 +40,7 @@ class ChatAdmin(BaseAdmin, model=Chat):
 
 class MessageAdmin(BaseAdmin, model=Message):
     pass
+
+
+class BookingAdmin(BaseAdmin, model=Booking):
+    pass
@@ -0,0 +1,27 @@
+import secrets
+
+from typing import Annotated
+from fastapi import Depends
+from fastapi.security import APIKeyHeader
+
+from src.infrastructure.config import get_settings
+
+
+monitoring_token_scheme = APIKeyHeader(
+    name='X-Monitoring-Token',
+    scheme_name='monitoring_token',
+    auto_error=False,
+)
+
+
+def get_internal_caller(
+    token: Annotated[str | None, Depends(monitoring_token_scheme)],
+) -> None:
+    """Monitoring is internal, closed unless MONITORING_TOKEN is set."""
+
+    expected = get_settings().monitoring_token
+    if not expected or not token or not secrets.compare_digest(token, expected):
+        raise PermissionError('Monitoring is internal only')
+
+
+internal_only = Depends(get_internal_caller)
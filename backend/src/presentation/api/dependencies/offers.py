@@ -9,7 +9,7 @@ from src.presentation.api.dependencies.usecases import offer_usecase
 
 
 async def is_current_offer(offer_id: int, offer_usecase: offer_usecase):
-    offer, _ = await offer_usecase.repository.retrieve(id=offer_id)
+    offer = await offer_usecase.repository.retrieve(id=offer_id)
     return OfferSchema(**format_offer(offer))
 
 
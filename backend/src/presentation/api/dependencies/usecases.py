@@ -1,8 +1,11 @@
-from typing import Annotated
+import contextlib
+
+from typing import Annotated, AsyncContextManager, Callable
 from fastapi import Depends
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.application.usecases.bookings import BookingUseCase
 from src.application.usecases.offers import OfferUseCase
 from src.application.usecases.users import (
     UserSocialUseCase,
@@ -11,20 +14,30 @@ from src.application.usecases.users import (
 )
 from src.application.usecases.chats import ChatUseCase
 from src.infrastructure.config import get_settings
-from src.infrastructure.database import get_async_session, get_redis_session
+from src.infrastructure.database import (
+    get_async_session,
+    get_redis_session,
+    get_session_factory,
+)
 from src.infrastructure.repositories.base import RedisRepository
+from src.infrastructure.repositories.bookings import BookingRepository
 from src.infrastructure.repositories.offers import OfferRepository
 from src.infrastructure.repositories.users import (
     CompanyRepository,
     UserRepository,
 )
 from src.infrastructure.repositories.chats import ChatRepository
+from src.infrastructure.services.storage import MediaStorageService
 from src.infrastructure.services.tokens import JWTService
 from src.infrastructure.services.tasks import BackgroundTasksService
 
 
 db_session = Annotated[AsyncSession, Depends(get_async_session)]
 redis_session = Annotated[Redis, Depends(get_redis_session)]
+session_factory = Annotated[
+    Callable[[], AsyncContextManager[AsyncSession]],
+    Depends(get_session_factory),
+]
 
 
 def prepare_usecase(func):
@@ -44,22 +57,33 @@ def get_user_usecase(db_session: AsyncSession, **kwargs: any):
         RedisRepository(redis_session),
         JWTService(),
         BackgroundTasksService(get_settings()),
+        MediaStorageService(),
     )
 
 
 @prepare_usecase
 def get_user_social_usecase(db_session: AsyncSession, **kwargs: any):
-    return UserSocialUseCase(UserRepository(db_session), JWTService())
+    redis_session = kwargs.get('redis_session')
+    return UserSocialUseCase(
+        UserRepository(db_session),
+        RedisRepository(redis_session),
+        JWTService(),
+    )
 
 
 @prepare_usecase
 def get_company_usecase(db_session: AsyncSession, **kwargs: any):
-    return CompanyUseCase(CompanyRepository(db_session),)
+    return CompanyUseCase(CompanyRepository(db_session), MediaStorageService())
 
 
 @prepare_usecase
 def get_offer_usecase(db_session: AsyncSession, **kwargs: any):
-    return OfferUseCase(OfferRepository(db_session))
+    return OfferUseCase(OfferRepository(db_session), MediaStorageService())
+
+
+@prepare_usecase
+def get_booking_usecase(db_session: AsyncSession, **kwargs: any):
+    return BookingUseCase(BookingRepository(db_session))
 
 
 @prepare_usecase
@@ -71,8 +95,30 @@ def get_chat_usecase(db_session: AsyncSession, **kwargs: any):
     )
 
 
+def get_chat_usecase_factory(session_factory: session_factory):
+    """
+    Websockets stay open for hours, so instead of a request-scoped session
+    every operation opens its own and returns the connection right after.
+    """
+
+    @contextlib.asynccontextmanager
+    async def scope():
+        async with session_factory() as session:
+            yield ChatUseCase(
+                ChatRepository(session),
+                UserRepository(session),
+                JWTService(),
+            )
+    return scope
+
+
 user_usecase = Annotated[UserUseCase, Depends(get_user_usecase)]
 user_social_usecase = Annotated[UserSocialUseCase, Depends(get_user_social_usecase)]
 company_usecase = Annotated[CompanyUseCase, Depends(get_company_usecase)]
 offer_usecase = Annotated[OfferUseCase, Depends(get_offer_usecase)]
+booking_usecase = Annotated[BookingUseCase, Depends(get_booking_usecase)]
 chat_usecase = Annotated[ChatUseCase, Depends(get_chat_usecase)]
+chat_usecase_factory = Annotated[
+    Callable[[], AsyncContextManager[ChatUseCase]],
+    Depends(get_chat_usecase_factory),
+]
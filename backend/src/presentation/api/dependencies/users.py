@@ -16,9 +16,7 @@ async def get_current_user(
     token: Annotated[str, Depends(user_oauth2_scheme)],
     user_usecase: user_usecase,
 ) -> UserComplete:
-    token_data = await user_usecase.get_user_data(token)
-    username = token_data.get('username')
-    return await user_usecase.get_user(username)
+    return await user_usecase.get_current_user(token)
 
 
 def get_anonymous_user(request: Request):
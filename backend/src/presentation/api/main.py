@@ -2,7 +2,6 @@ import logging
 import contextlib
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from sqladmin import Admin
@@ -10,6 +9,13 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+from src.application.utils.cache import cache, cache_invalidated_channel
+from src.application.utils.chats import message_buffer
+from src.application.utils.users import (
+    PasswordService,
+    invalidate_snapshot,
+    user_invalidated_channel,
+)
 from src.application.exceptions import (
     InvalidDataError,
     NotFoundError,
@@ -17,7 +23,13 @@ from src.application.exceptions import (
     AlreadyExistsError,
     ValidationError,
 )
-from src.infrastructure.database import session_manager
+from src.infrastructure.config import get_settings
+from src.infrastructure.database import redis_manager, session_manager
+from src.infrastructure.services.storage import MediaStorageService
+from src.infrastructure.services.cache import RedisCacheStore
+from src.infrastructure.services.chats import SqlMessageStore, chat_hub
+from src.infrastructure.services.pubsub import listener
+from src.infrastructure.services.revocation import revoked_tokens
 from src.presentation.api.dependencies.scheduler import scheduler
 from src.presentation.api.admin import (
     ChatAdmin,
@@ -28,13 +40,17 @@ from src.presentation.api.admin import (
     ImageAdmin,
     PriceAdmin,
     MessageAdmin,
+    BookingAdmin,
 )
 from src.presentation.api.routers.offers import router as offer_router
+from src.presentation.api.routers.bookings import router as booking_router
 from src.presentation.api.routers.users import router as user_router
 from src.presentation.api.routers.companies import router as company_router
 from src.presentation.api.routers.auth import router as auth_router
 from src.presentation.api.routers.chats import router as chat_router
+from src.presentation.api.routers.monitoring import router as monitoring_router
 from src.presentation.api.rate_limiter import limiter
+from src.presentation.api.staticfiles import MediaFiles
 from src.presentation.api import exceptions
 
 
@@ -42,15 +58,64 @@ logging.basicConfig()
 logging.getLogger('apscheduler').setLevel(logging.DEBUG)
 
 
-@contextlib.asynccontextmanager
-async def lifespan(app: FastAPI):
-    scheduler.start()
-    yield
-    scheduler.shutdown()
+async def close_database() -> None:
     if session_manager._engine is not None:
         await session_manager.close()
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    # ! every teardown step runs even if an earlier one fails
+    async with contextlib.AsyncExitStack() as shutdown:
+        shutdown.push_async_callback(close_database)
+        PasswordService.configure(
+            rounds=settings.bcrypt_rounds,
+            max_workers=settings.password_hash_workers,
+        )
+        shutdown.callback(PasswordService.shutdown)
+        MediaStorageService.configure(max_workers=settings.image_workers)
+        shutdown.callback(MediaStorageService.shutdown)
+        redis_manager.open()
+        shutdown.push_async_callback(redis_manager.close)
+        scheduler.start()
+        shutdown.callback(scheduler.shutdown)
+
+        # * keep the local revocation filter in sync with other workers
+        listener.add_handler(revoked_tokens.channel, revoked_tokens.receive)
+        listener.on_connect(revoked_tokens.load)
+        listener.on_disconnect(revoked_tokens.reset)
+        listener.add_handler(user_invalidated_channel, invalidate_snapshot)
+
+        # * redis is the shared second tier of the use-case cache
+        cache.bind(RedisCacheStore(redis_manager.client))
+        shutdown.callback(cache.bind, None)
+        listener.add_handler(cache_invalidated_channel, cache.drop_local)
+        listener.on_disconnect(cache.reset)
+
+        if settings.chat_write_buffer:
+            message_buffer.configure(
+                max_rows=settings.chat_write_buffer_rows,
+                delay=settings.chat_write_buffer_delay,
+                durable=settings.chat_write_durable,
+            )
+            message_buffer.bind(SqlMessageStore(session_manager))
+        shutdown.callback(message_buffer.bind, None)
+        shutdown.push_async_callback(message_buffer.close)
+
+        # * chat channels are subscribed while the worker holds their sockets
+        chat_hub.configure(
+            send_queue_size=settings.chat_send_queue_size,
+            overflow=settings.chat_overflow_policy,
+            recent_size=settings.chat_recent_size,
+        )
+        chat_hub.bind(redis_manager.client, listener)
+        shutdown.callback(chat_hub.bind, None, None)
+        await listener.start(redis_manager.client)
+        shutdown.push_async_callback(listener.stop)
+        yield
+
+
 app = FastAPI(lifespan=lifespan)
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
@@ -63,8 +128,6 @@ app.add_exception_handler(AlreadyExistsError, exceptions.already_exists_error_ha
 app.add_exception_handler(ValidationError, exceptions.validation_error_handler)
 app.add_exception_handler(PermissionError, exceptions.permission_error_handler)
 
-add_pagination(app)
-
 
 # add cors for react app
 origins = [
@@ -82,12 +145,13 @@ app.add_middleware(
 
 
 # mount static and media files
-app.mount('/static', StaticFiles(directory='src/static'), name='static')
-app.mount('/media', StaticFiles(directory='src/media'), name='media')
+app.mount('/static', MediaFiles(directory='src/static'), name='static')
+app.mount('/media', MediaFiles(directory='src/media'), name='media')
 
 
 # add routes
 app.include_router(offer_router, tags=['offers'], prefix='/offers')
+app.include_router(booking_router, tags=['bookings'], prefix='/offers')
 app.include_router(user_router, tags=['users'], prefix='/users')
 app.include_router(auth_router, tags=['auth'], prefix='/auth')
 app.include_router(chat_router, tags=['chats'], prefix='/chats')
@@ -96,6 +160,15 @@ app.include_router(
     tags=['companies'],
     prefix='/companies',
 )
+app.include_router(
+    monitoring_router,
+    tags=['monitoring'],
+    prefix='/monitoring',
+)
+
+# * must be called after routers are included,
+# * otherwise the page params are attached only on startup
+add_pagination(app)
 
 
 # admin site
@@ -108,3 +181,4 @@ admin.add_view(ImageAdmin)
 admin.add_view(PriceAdmin)
 admin.add_view(ChatAdmin)
 admin.add_view(MessageAdmin)
+admin.add_view(BookingAdmin)
@@ -1,7 +1,19 @@
-from typing import TypeVar
+import json
+
+from datetime import datetime
+from typing import Awaitable, Callable, Sequence, TypeVar
 from fastapi import Query
-from fastapi_pagination import Page
-from fastapi_pagination.customization import CustomizedPage, UseParamsFields
+from fastapi_pagination import Page, create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage
+from fastapi_pagination.cursor import CursorPage
+from fastapi_pagination.customization import (
+    CustomizedPage,
+    UseExcludedFields,
+    UseFieldsAliases,
+    UseParamsFields,
+)
+
+from src.application.exceptions import InvalidDataError
 
 
 T = TypeVar('T')
@@ -13,3 +25,68 @@ CustomPage = CustomizedPage[
         size=Query(20, ge=1, le=100),
     )
 ]
+
+
+# * opt-in keyset pagination, the cursor is an opaque (timestamp, id) pair
+CustomCursorPage = CustomizedPage[
+    CursorPage[T],
+    UseParamsFields(
+        size=Query(20, ge=1, le=100),
+    ),
+    UseExcludedFields(
+        'total',
+        'current_page',
+        'current_page_backwards',
+        'previous_page',
+    ),
+    UseFieldsAliases(next_page='next_cursor'),
+]
+
+
+async def paginate(
+    fetch: Callable[..., Awaitable[tuple[Sequence[T], int]]],
+    *args,
+) -> AbstractPage[T]:
+    """Fetch only the requested page. `fetch` returns (items, total)."""
+
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    items, total = await fetch(
+        *args,
+        limit=raw_params.limit,
+        offset=raw_params.offset,
+    )
+    return create_page(items, total=total, params=params)
+
+
+async def paginate_cursor(
+    fetch: Callable[..., Awaitable[tuple[Sequence[T], tuple | None]]],
+    *args,
+) -> AbstractPage[T]:
+    """Fetch rows after the cursor key. `fetch` returns (items, next_key)."""
+
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_cursor()
+    items, next_key = await fetch(
+        *args,
+        after=decode_cursor_key(raw_params.cursor),
+        size=raw_params.size,
+    )
+    return create_page(items, params=params, next_=encode_cursor_key(next_key))
+
+
+def encode_cursor_key(key: tuple[datetime, int] | None) -> str | None:
+    if key is None:
+        return None
+    timestamp, object_id = key
+    return json.dumps([timestamp.isoformat(), object_id])
+
+
+def decode_cursor_key(cursor: str | None) -> tuple[datetime, int] | None:
+    if cursor is None:
+        return None
+    try:
+        timestamp, object_id = json.loads(cursor)
+        return datetime.fromisoformat(timestamp), int(object_id)
+    except (TypeError, ValueError):
+        raise InvalidDataError('Invalid cursor')
@@ -1,9 +1,14 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from src.infrastructure.config import get_redis_pool_kwargs, get_redis_url
 
+
+# * slowapi talks to redis synchronously, so it keeps its own pool
+# * built from the same settings as the app one
 limiter = Limiter(
     key_func=get_remote_address,
-    storage_uri="redis://redis:6379",
+    storage_uri=get_redis_url(),
+    storage_options=get_redis_pool_kwargs(),
     default_limits=["30/minute", '200/hour', '1000/day'],
 )
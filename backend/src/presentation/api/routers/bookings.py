@@ -0,0 +1,45 @@
+from typing import Annotated
+from fastapi import APIRouter, Query, status
+
+from src.presentation.api.paginator import CustomPage, paginate
+from src.application.dtos.users import UserComplete
+from src.application.dtos.offers import OfferSchema
+from src.application.dtos.bookings import (
+    AvailabilitySchema,
+    BookingCreate,
+    BookingSchema,
+)
+from src.presentation.api.dependencies.users import current_user
+from src.presentation.api.dependencies.offers import current_offer, offer_owner
+from src.presentation.api.dependencies.usecases import booking_usecase
+
+
+router = APIRouter()
+
+
+@router.get('/{offer_id}/bookings', dependencies=[offer_owner])
+async def get_bookings(
+    offer: Annotated[OfferSchema, current_offer],
+    booking_usecase: booking_usecase,
+) -> CustomPage[BookingSchema]:
+    return await paginate(booking_usecase.get_bookings, offer.id)
+
+
+@router.post('/{offer_id}/bookings', status_code=status.HTTP_201_CREATED)
+async def create_booking(
+    current_user: Annotated[UserComplete, current_user],
+    offer: Annotated[OfferSchema, current_offer],
+    form_data: BookingCreate,
+    booking_usecase: booking_usecase,
+) -> BookingSchema:
+    return await booking_usecase.create_booking(offer.id, current_user.id, form_data)
+
+
+@router.get('/{offer_id}/availability')
+async def get_availability(
+    offer: Annotated[OfferSchema, current_offer],
+    booking_usecase: booking_usecase,
+    year: Annotated[int, Query(ge=2000, le=2100)],
+    month: Annotated[int, Query(ge=1, le=12)],
+) -> AvailabilitySchema:
+    return await booking_usecase.get_availability(offer.id, year, month)
@@ -1,13 +1,27 @@
 from typing import Annotated
-from fastapi import APIRouter, Body, WebSocket, WebSocketDisconnect
-from fastapi_pagination.async_paginator import paginate
+from fastapi import APIRouter, Body, WebSocket, WebSocketDisconnect, status
 
-from src.application.usecases.chats import ConnectionManager
+from src.application.exceptions import NotFoundError
 from src.application.dtos.users import UserComplete, UserSchema
-from src.application.dtos.chats import ChatSchema, MessageSchema
+from src.application.dtos.chats import (
+    ChatReadOutput,
+    ChatReadSchema,
+    ChatSchema,
+    InboxChatSchema,
+    MessageSchema,
+)
+from src.infrastructure.services.chats import chat_hub
 from src.presentation.api.dependencies.users import current_user
-from src.presentation.api.dependencies.usecases import chat_usecase
-from src.presentation.api.paginator import CustomPage
+from src.presentation.api.dependencies.usecases import (
+    chat_usecase,
+    chat_usecase_factory,
+)
+from src.presentation.api.paginator import (
+    CustomCursorPage,
+    CustomPage,
+    paginate,
+    paginate_cursor,
+)
 
 
 router = APIRouter()
@@ -27,8 +41,15 @@ async def get_chats(
     current_user: Annotated[UserComplete, current_user],
     chat_usecase: chat_usecase,
 ) -> CustomPage[ChatSchema]:
-    chats = await chat_usecase.get_chats(current_user.id)
-    return await paginate(chats)
+    return await paginate(chat_usecase.get_chats, current_user.id)
+
+
+@router.get('/inbox')
+async def get_inbox(
+    current_user: Annotated[UserComplete, current_user],
+    chat_usecase: chat_usecase,
+) -> CustomPage[InboxChatSchema]:
+    return await paginate(chat_usecase.get_inbox, current_user.id)
 
 
 @router.get('/id')
@@ -54,13 +75,34 @@ async def get_chat_messages(
     chat_id: int,
     chat_usecase: chat_usecase,
 ) -> CustomPage[MessageSchema]:
-    messages = await chat_usecase.get_chat_messages(chat_id)
-    return await paginate(messages)
+    return await paginate(chat_usecase.get_chat_messages, chat_id)
+
+
+@router.get('/{chat_id}/history')
+async def get_chat_history(
+    chat_id: int,
+    current_user: Annotated[UserComplete, current_user],
+    chat_usecase: chat_usecase,
+) -> CustomCursorPage[MessageSchema]:
+    # * only participants may read the chat
+    await chat_usecase.get_chat(current_user.id, chat_id)
+    return await paginate_cursor(chat_usecase.get_chat_history, chat_id)
+
+
+@router.put('/{chat_id}/read')
+async def mark_read(
+    chat_id: int,
+    current_user: Annotated[UserComplete, current_user],
+    chat_usecase: chat_usecase,
+    data: ChatReadSchema,
+) -> ChatReadOutput:
+    return await chat_usecase.mark_read(current_user.id, chat_id, data.message_id)
 
 
 @router.delete('/{chat_id}/clear')
 async def clear_chat(chat_id: int, chat_usecase: chat_usecase) -> None:
-    return await chat_usecase.clear_chat(chat_id)
+    await chat_usecase.clear_chat(chat_id)
+    await chat_hub.forget(chat_id)
 
 
 @router.websocket('/{chat_id}')
@@ -68,20 +110,38 @@ async def websocket_endpoint(
     websocket: WebSocket,
     chat_id: int,
     token: str,
-    chat_usecase: chat_usecase,
+    chat_usecase_factory: chat_usecase_factory,
+    since: int | None = None,
 ) -> None:
-    sender: UserSchema = await chat_usecase.get_sender(token)
-    manager: ConnectionManager = chat_usecase.get_connection_manager()
-    
-    await manager.connect(websocket, chat_id)
+    # ! no session is held between operations, idle sockets use no connection
+    async with chat_usecase_factory() as chat_usecase:
+        sender: UserSchema = await chat_usecase.get_sender(token)
+        try:
+            await chat_usecase.get_chat(sender.id, chat_id)
+        except NotFoundError:
+            # * only participants may join the chat
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+    async def load(since: int | None, limit: int) -> list[dict]:
+        async with chat_usecase_factory() as chat_usecase:
+            messages = await chat_usecase.get_recent_messages(chat_id, since, limit)
+        return [message.model_dump(mode='json') for message in messages]
+
     try:
+        # * the recent messages, or those after `since` when resuming,
+        # * arrive first as one array frame
+        await chat_hub.connect(websocket, chat_id, since=since, load=load)
         while True:
-            data = await manager.receive_message(websocket)
-            msg_data = {
-                'chat_id': chat_id,
-                'sender': sender.model_dump(),
-                'content': data['content'],
-            }
-            await manager.send_message(msg_data)
+            data = await websocket.receive_json()
+            async with chat_usecase_factory() as chat_usecase:
+                message = await chat_usecase.send_message(
+                    chat_id,
+                    sender,
+                    data['content'],
+                )
+            await chat_hub.publish(chat_id, message.model_dump(mode='json'))
     except WebSocketDisconnect:
-        manager.disconnect(websocket, chat_id)
+        pass
+    finally:
+        await chat_hub.disconnect(websocket, chat_id)
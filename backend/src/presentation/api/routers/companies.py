@@ -1,6 +1,5 @@
 from typing import Annotated
 from fastapi import Form, status, APIRouter
-from fastapi_pagination.async_paginator import paginate
 
 from src.application.dtos.offers import OfferSchema
 from src.application.dtos.users import UserComplete
@@ -11,7 +10,7 @@ from src.application.dtos.companies import (
 )
 from src.presentation.api.dependencies.usecases import company_usecase
 from src.presentation.api.dependencies.users import current_user
-from src.presentation.api.paginator import CustomPage
+from src.presentation.api.paginator import CustomPage, paginate
 
 
 router = APIRouter()
@@ -30,8 +29,7 @@ async def registration(
 async def get_companies(
     company_usecase: company_usecase,
 ) -> CustomPage[CompanySchema]:
-    companies = await company_usecase.get_companies()
-    return await paginate(companies)
+    return await paginate(company_usecase.get_companies)
 
 
 @router.get('/{name}')
@@ -47,8 +45,7 @@ async def get_company_offers(
     name: str,
     company_usecase: company_usecase
 ) -> CustomPage[OfferSchema]:
-    offers = await company_usecase.get_company_offers(name)
-    return await paginate(offers)
+    return await paginate(company_usecase.get_company_offers, name)
 
 
 @router.patch('/me', status_code=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+
+from src.application.utils.cache import cache
+from src.application.utils.chats import message_buffer
+from src.application.utils.users import PasswordService
+from src.infrastructure.database import redis_manager
+from src.infrastructure.services.chats import chat_hub
+from src.presentation.api.dependencies.monitoring import internal_only
+
+
+# ! pool internals and per-socket chat ids, internal callers only
+router = APIRouter(dependencies=[internal_only])
+
+
+@router.get('/redis')
+async def get_redis_stats() -> dict:
+    return redis_manager.stats()
+
+
+@router.get('/passwords')
+async def get_password_hashing_stats() -> dict:
+    return PasswordService.stats()
+
+
+@router.get('/cache')
+async def get_cache_stats() -> dict:
+    return cache.stats()
+
+
+@router.get('/chats')
+async def get_chat_stats() -> dict:
+    return {**chat_hub.stats(), 'write_buffer': message_buffer.stats()}
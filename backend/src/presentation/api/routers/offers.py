@@ -1,16 +1,27 @@
 from typing import Annotated
-from fastapi import APIRouter, Form, status
-from fastapi_pagination.async_paginator import paginate
+from fastapi import APIRouter, Depends, Form, Query, status
 
-from src.presentation.api.paginator import CustomPage
+from src.presentation.api.paginator import (
+    CustomCursorPage,
+    CustomPage,
+    paginate,
+    paginate_cursor,
+)
 from src.application.dtos.users import UserComplete
 from src.application.dtos.offers import (
     FeedbackCreate,
+    FeedbackSchema,
     OfferUnitSchema,
     OfferCreate,
     OfferCreateOutput,
+    OfferFilters,
+    OfferNearbySchema,
     OfferSchema,
+    OfferSearchSchema,
+    OfferSort,
     OfferUpdate,
+    QuoteRequest,
+    QuoteSchema,
 )
 from src.presentation.api.dependencies.users import current_user
 from src.presentation.api.dependencies.offers import current_offer, offer_owner
@@ -21,9 +32,45 @@ router = APIRouter()
 
 
 @router.get('/')
-async def get_offers(offer_usecase: offer_usecase) -> CustomPage[OfferSchema]:
-    offers = await offer_usecase.get_offers()
-    return await paginate(offers)
+async def get_offers(
+    offer_usecase: offer_usecase,
+    filters: Annotated[OfferFilters, Depends()],
+    sort: OfferSort = OfferSort.id,
+) -> CustomPage[OfferSchema]:
+    return await paginate(offer_usecase.get_offers, sort, filters)
+
+
+@router.get('/feed')
+async def get_offers_feed(
+    offer_usecase: offer_usecase,
+) -> CustomCursorPage[OfferSchema]:
+    return await paginate_cursor(offer_usecase.get_offers_feed)
+
+
+@router.get('/search')
+async def search_offers(
+    offer_usecase: offer_usecase,
+    q: Annotated[str, Query(min_length=2, max_length=200)],
+) -> CustomPage[OfferSearchSchema]:
+    return await paginate(offer_usecase.search_offers, q)
+
+
+@router.get('/nearby')
+async def get_nearby_offers(
+    offer_usecase: offer_usecase,
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    lon: Annotated[float, Query(ge=-180, le=180)],
+    radius_km: Annotated[float, Query(gt=0, le=200)] = 10,
+) -> CustomPage[OfferNearbySchema]:
+    return await paginate(offer_usecase.get_nearby_offers, lat, lon, radius_km)
+
+
+@router.post('/quotes')
+async def get_quotes(
+    form_data: QuoteRequest,
+    offer_usecase: offer_usecase,
+) -> CustomPage[QuoteSchema]:
+    return await paginate(offer_usecase.get_quotes, form_data)
 
 
 @router.get('/{offer_id}')
@@ -31,6 +78,14 @@ async def get_offer(offer_id: int, offer_usecase: offer_usecase) -> OfferUnitSch
     return await offer_usecase.get_offer(offer_id)
 
 
+@router.get('/{offer_id}/feedbacks')
+async def get_feedbacks(
+    offer: Annotated[OfferSchema, current_offer],
+    offer_usecase: offer_usecase,
+) -> CustomPage[FeedbackSchema]:
+    return await paginate(offer_usecase.get_feedbacks, offer.id)
+
+
 @router.post('/', status_code=status.HTTP_201_CREATED)
 async def create_offer(
     current_user: Annotated[UserComplete, current_user],
@@ -2,7 +2,6 @@ from typing import Annotated
 from fastapi import Form, status, APIRouter, Depends
 from fastapi.background import BackgroundTasks
 from fastapi.security import OAuth2PasswordBearer
-from fastapi_pagination.async_paginator import paginate
 
 from src.application.dtos.users import (
     PasswordReset,
@@ -19,7 +18,7 @@ from src.presentation.api.dependencies.users import (
     current_user,
     user_oauth2_scheme,
 )
-from src.presentation.api.paginator import CustomPage
+from src.presentation.api.paginator import CustomPage, paginate
 
 
 router = APIRouter()
@@ -27,8 +26,7 @@ router = APIRouter()
 
 @router.get('/')
 async def get_users(user_usecase: user_usecase) -> CustomPage[UserSchema]:
-    data = await user_usecase.get_users()
-    return await paginate(data)
+    return await paginate(user_usecase.get_users)
 
 
 @router.get('/{username}')
@@ -44,8 +42,7 @@ async def get_user_offers(
     username: str,
     user_usecase: user_usecase,
 ) -> CustomPage[OfferSchema]:
-    offers = await user_usecase.get_user_offers(username)
-    return await paginate(offers)
+    return await paginate(user_usecase.get_user_offers, username)
 
 
 @router.patch(
@@ -0,0 +1,164 @@
+import mimetypes
+import os
+import re
+
+import anyio
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles with cache headers. Content-hashed names never change, so
+    they are cached for a year, other files are revalidated by ETag.
+    Also serves single byte ranges and pre-compressed `.br`/`.gz` files.
+    """
+
+    chunk_size = 64 * 1024
+    immutable_max_age = 365 * 24 * 60 * 60
+    hashed_name = re.compile(r'[0-9a-f]{64}(\.[a-z0-9]+)+')
+    range_header = re.compile(r'bytes=(\d*)-(\d*)')
+    encodings = {'br': '.br', 'gzip': '.gz'}
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {
+            'accept-ranges': 'bytes',
+            'cache-control': self.get_cache_control(full_path),
+        }
+
+        encoding, compressed, varies = self.find_compressed(full_path, request_headers)
+        if varies:
+            # * caches must not serve one encoding for another, identity included
+            headers['vary'] = 'Accept-Encoding'
+        if encoding:
+            headers['content-encoding'] = encoding
+            response = FileResponse(
+                compressed,
+                status_code=status_code,
+                stat_result=os.stat(compressed),
+                headers=headers,
+                media_type=mimetypes.guess_type(full_path)[0] or 'text/plain',
+            )
+        else:
+            response = FileResponse(
+                full_path,
+                status_code=status_code,
+                stat_result=stat_result,
+                headers=headers,
+            )
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        # * ranges are served from the identity encoding only
+        if not encoding and 'range' in request_headers:
+            if_range = request_headers.get('if-range')
+            if if_range is None or if_range == response.headers['etag']:
+                return self.range_response(
+                    response,
+                    request_headers['range'],
+                    stat_result.st_size,
+                )
+        return response
+
+    def get_cache_control(self, full_path: str) -> str:
+        if self.hashed_name.fullmatch(os.path.basename(full_path)):
+            return f'public, max-age={self.immutable_max_age}, immutable'
+        return 'no-cache'
+
+    def find_compressed(
+        self,
+        full_path: str,
+        request_headers: Headers,
+    ) -> tuple[str | None, str | None, bool]:
+        """(encoding, path, varies), varies when a compressed sibling exists."""
+
+        available = {
+            encoding: full_path + suffix
+            for encoding, suffix in self.encodings.items()
+            if os.path.isfile(full_path + suffix)
+        }
+        accepted = self.parse_accept_encoding(request_headers.get('accept-encoding', ''))
+        best, best_q = None, 0.0
+        for encoding in available:
+            q = accepted.get(encoding, accepted.get('*', 0.0))
+            # * on equal q the order of `encodings` decides
+            if q > best_q:
+                best, best_q = encoding, q
+        return best, available.get(best), bool(available)
+
+    @staticmethod
+    def parse_accept_encoding(value: str) -> dict[str, float]:
+        """q-values by coding, `gzip;q=0` refuses gzip."""
+
+        accepted = {}
+        for item in value.split(','):
+            coding, *params = [part.strip() for part in item.split(';')]
+            if not coding:
+                continue
+            q = 1.0
+            for param in params:
+                name, _, number = param.partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        q = min(max(float(number), 0.0), 1.0)
+                    except ValueError:
+                        q = 0.0
+            accepted[coding.lower()] = q
+        return accepted
+
+    def range_response(
+        self,
+        response: FileResponse,
+        range_value: str,
+        size: int,
+    ) -> Response:
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key != 'content-length'
+        }
+
+        match = self.range_header.fullmatch(range_value.strip())
+        if match is None or match.groups() == ('', ''):
+            # ! multiple or malformed ranges, fall back to the whole file
+            return response
+
+        start, end = match.groups()
+        if start == '':
+            start, end = max(size - int(end), 0), size - 1
+        else:
+            start, end = int(start), min(int(end or size - 1), size - 1)
+
+        if start > end or start >= size:
+            headers['content-range'] = f'bytes */{size}'
+            return Response(status_code=416, headers=headers)
+
+        headers['content-range'] = f'bytes {start}-{end}/{size}'
+        headers['content-length'] = str(end - start + 1)
+        return StreamingResponse(
+            self.read_range(response.path, start, end),
+            status_code=206,
+            headers=headers,
+        )
+
+    async def read_range(self, path: str, start: int, end: int):
+        remaining = end - start + 1
+        async with await anyio.open_file(path, 'rb') as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
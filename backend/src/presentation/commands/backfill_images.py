@@ -0,0 +1,53 @@
+"""
+Generate missing variants for images uploaded before they existed.
+
+    python -m src.presentation.commands.backfill_images
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from src.application.exceptions import ValidationError
+from src.infrastructure.config import get_settings
+from src.infrastructure.database import session_manager
+from src.infrastructure.models.offers import Image
+from src.infrastructure.services.storage import MediaStorageService
+
+
+logger = logging.getLogger(__name__)
+
+
+async def backfill_images() -> None:
+    settings = get_settings()
+    MediaStorageService.configure(max_workers=settings.image_workers)
+    storage = MediaStorageService()
+
+    async with session_manager.session() as session:
+        query = select(Image.data).where(Image.data.startswith('media/'))
+        paths = (await session.scalars(query)).all()
+
+    # * keep a bounded number of images in flight
+    semaphore = asyncio.Semaphore(settings.image_workers * 2)
+
+    async def process(path: str) -> bool:
+        async with semaphore:
+            try:
+                await storage.create_variants(path)
+            except ValidationError:
+                logger.warning('Skipping %s', path)
+                return False
+            return True
+
+    try:
+        results = await asyncio.gather(*[process(path) for path in set(paths)])
+    finally:
+        MediaStorageService.shutdown()
+        await session_manager.close()
+    logger.info('Processed %s images, %s failed', len(results), results.count(False))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_images())
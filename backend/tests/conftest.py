@@ -4,15 +4,20 @@ from httpx import ASGITransport, AsyncClient
 from redis.asyncio import Redis
 from sqlalchemy.pool import NullPool
 
+from src.application.utils.cache import cache
+from src.application.utils.users import user_snapshots
 from src.infrastructure.config import get_test_database_url
 from src.infrastructure.database import (
     DatabaseSessionManager,
     get_async_session,
     get_redis_session,
+    get_session_factory,
 )
 from src.infrastructure.models.base import Base
+from src.infrastructure.services.tokens import claims_cache
 from src.presentation.api.main import app
 
+from tests.factories.bookings import BookingFactory
 from tests.factories.users import CompanyFactory, UserFactory
 from tests.factories.chats import ChatFactory, MessageFactory
 from tests.factories.offers import (
@@ -36,6 +41,7 @@ async def get_test_session():
 
 
 app.dependency_overrides[get_async_session] = get_test_session
+app.dependency_overrides[get_session_factory] = lambda: session_manager.session
 app.dependency_overrides[get_redis_session] = (
     lambda: Redis(host='redis', port=6379, db=1)
 )
@@ -52,9 +58,19 @@ async def set_session_for_factories():
         ImageFactory._meta.sqlalchemy_session = session
         PriceFactory._meta.sqlalchemy_session = session
         FeedbackFactory._meta.sqlalchemy_session = session
+        BookingFactory._meta.sqlalchemy_session = session
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # ! ids are reused after the tables are recreated
+    user_snapshots.clear()
+    claims_cache.clear()
+    cache.clear()
+    yield
+
+
 @pytest.fixture(autouse=True)
 async def prepare_database(set_session_for_factories):
     engine = session_manager._engine
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import Range
+
+from src.infrastructure.models.bookings import Booking
+from tests.factories.users import AsyncFactory
+
+
+class BookingFactory(AsyncFactory):
+    class Meta:
+        model = Booking
+
+    offer_id = 1
+    user_id = 2
+    period = Range(
+        datetime(2030, 5, 10, tzinfo=timezone.utc),
+        datetime(2030, 5, 12, 12, tzinfo=timezone.utc),
+        bounds='[)',
+    )
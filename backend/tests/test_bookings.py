@@ -0,0 +1,55 @@
+import asyncio
+
+from tests.factories.bookings import BookingFactory
+
+
+async def test_create_booking(ac):
+    data = {'start': '2030-05-12T12:00:00Z', 'end': '2030-05-14T12:00:00Z'}
+    response = await ac.post('/offers/1/bookings', json=data)
+    assert response.status_code == 201, response.json()
+    assert response.json()['offer_id'] == 1
+
+
+async def test_create_booking_invalid_period(ac):
+    data = {'start': '2030-05-14T12:00:00Z', 'end': '2030-05-12T12:00:00Z'}
+    response = await ac.post('/offers/1/bookings', json=data)
+    assert response.status_code == 422, response.json()
+
+
+async def test_create_overlapping_bookings(ac):
+    await BookingFactory()
+
+    data = {'start': '2030-05-12T00:00:00Z', 'end': '2030-05-13T00:00:00Z'}
+    response = await ac.post('/offers/1/bookings', json=data)
+    assert response.status_code == 409, response.json()
+
+    # only one of the concurrent requests can win
+    data = {'start': '2030-06-01T00:00:00Z', 'end': '2030-06-03T00:00:00Z'}
+    responses = await asyncio.gather(*[
+        ac.post('/offers/1/bookings', json=data) for _ in range(5)
+    ])
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201, 409, 409, 409, 409]
+
+
+async def test_get_bookings(ac):
+    await BookingFactory()
+
+    response = await ac.get('/offers/1/bookings')
+    assert response.status_code == 200, response.json()
+    assert response.json()['total'] == 1
+
+
+async def test_get_availability(c):
+    await BookingFactory()
+
+    response = await c.get('/offers/1/availability', params={'year': 2030, 'month': 5})
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert len(data['days']) == 31
+    statuses = {day['day']: day['status'] for day in data['days']}
+    assert statuses['2030-05-09'] == 'free'
+    assert statuses['2030-05-10'] == 'booked'
+    assert statuses['2030-05-11'] == 'booked'
+    assert statuses['2030-05-12'] == 'partial'
+    assert len(data['booked']) == 1
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+import pytest
+
+from pydantic import TypeAdapter
+from redis.asyncio import Redis
+
+from src.application.utils.cache import ReadThroughCache
+from src.infrastructure.services.cache import RedisCacheStore
+
+
+adapter = TypeAdapter(int)
+
+
+class Source:
+    """Stands for the database, `blocked` holds loads until it is set."""
+
+    def __init__(self, value: int):
+        self.value = value
+        self.loads = 0
+        self.blocked = asyncio.Event()
+        self.blocked.set()
+
+    async def load(self) -> int:
+        self.loads += 1
+        value = self.value
+        await self.blocked.wait()
+        return value
+
+
+@pytest.fixture
+async def store():
+    redis = Redis(host='redis', port=6379, db=1)
+    yield RedisCacheStore(redis)
+    await redis.aclose()
+
+
+async def get(cache: ReadThroughCache, key: str, source: Source, ttl: float = 60):
+    return await cache.get_or_load(
+        key=key,
+        load=source.load,
+        adapter=adapter,
+        tags=lambda value: {key},
+        ttl=ttl,
+        stale_ttl=300,
+    )
+
+
+async def test_cache_l2_shared(store):
+    key = uuid.uuid4().hex
+    source = Source(1)
+    # * two caches stand for two workers sharing the store
+    first, second = ReadThroughCache(), ReadThroughCache()
+    first.bind(store)
+    second.bind(store)
+
+    assert await get(first, key, source) == 1
+    assert await get(second, key, source) == 1
+    assert source.loads == 1
+    assert second.counters['l2_hits'] == 1
+
+    await second.invalidate(key)
+    assert await store.get(key) is None
+
+
+async def test_cache_l2_skips_stale_write_back(store):
+    key = uuid.uuid4().hex
+    source = Source(1)
+    first, second = ReadThroughCache(), ReadThroughCache()
+    first.bind(store)
+    second.bind(store)
+
+    # the first worker reads the old value, the second changes and invalidates it
+    source.blocked.clear()
+    loading = asyncio.create_task(get(first, key, source))
+    await asyncio.sleep(0.05)
+    source.value = 2
+    await second.invalidate(key)
+    source.blocked.set()
+    assert await loading == 1
+
+    # the stale value reached neither tier
+    assert await store.get(key) is None
+    assert await get(second, key, source) == 2
+    assert await get(first, key, source) == 2
+    assert source.loads == 2
+
+
+async def test_cache_stale_while_revalidate():
+    key = uuid.uuid4().hex
+    source = Source(1)
+    cache = ReadThroughCache()
+    assert await get(cache, key, source, ttl=0.05) == 1
+    await asyncio.sleep(0.1)
+
+    # one caller refreshes, the others get the stale value meanwhile
+    source.value = 2
+    source.blocked.clear()
+    refreshing = asyncio.create_task(get(cache, key, source, ttl=0.05))
+    await asyncio.sleep(0)
+    assert await get(cache, key, source, ttl=0.05) == 1
+    assert cache.counters['stale_hits'] == 1
+    source.blocked.set()
+    assert await refreshing == 2
+    assert source.loads == 2
@@ -1,3 +1,51 @@
+import asyncio
+import gc
+import json
+import pytest
+
+from urllib.parse import urlencode
+
+from redis.asyncio import Redis
+from sqlalchemy import event
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.application.utils.chats import MessageBuffer
+from src.infrastructure.services.chats import (
+    ChatHub,
+    OverflowPolicy,
+    SqlMessageStore,
+    chat_hub,
+)
+from src.infrastructure.repositories.chats import ChatRepository
+from src.infrastructure.services.pubsub import PubSubListener
+from src.infrastructure.services.tokens import JWTService
+from src.presentation.api.main import app
+from tests.conftest import session_manager
+from tests.factories.chats import ChatFactory, MessageFactory
+from tests.factories.users import UserFactory
+
+
+class FakeWebSocket:
+
+    def __init__(self, blocked: bool = False):
+        self.messages = asyncio.Queue()
+        self.closed_with = None
+        # a blocked socket stands for a client that stopped reading
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        await self.unblocked.wait()
+        await self.messages.put(json.loads(data))
+
+    async def close(self, code: int):
+        self.closed_with = code
+
 
 async def test_create_chat(ac):
     response = await ac.post('/chats/', json={'user_id': 2})
@@ -22,3 +70,388 @@ async def test_get_chat_id(ac):
 async def test_get_chat_messages(ac):
     response = await ac.get('/chats/1/messages')
     assert response.status_code == 200
+
+
+async def test_get_chat_history(ac):
+    for _ in range(2):
+        await MessageFactory(sender_id=1, chat_id=1)
+
+    response = await ac.get('/chats/1/history', params={'size': 2})
+    assert response.status_code == 200, response.json()
+    assert len(response.json()['items']) == 2
+
+    params = {'size': 2, 'cursor': response.json()['next_cursor']}
+    response = await ac.get('/chats/1/history', params=params)
+    assert response.status_code == 200, response.json()
+    assert [item['id'] for item in response.json()['items']] == [1]
+
+
+async def test_get_chat_history_not_participant(ac):
+    other = await UserFactory()
+    chat = await ChatFactory(first_user_id=2, second_user_id=other.id)
+    await MessageFactory(sender_id=2, chat_id=chat.id)
+
+    response = await ac.get(f'/chats/{chat.id}/history')
+    assert response.status_code == 404, response.json()
+
+
+async def test_get_inbox(ac):
+    await MessageFactory(sender_id=2, chat_id=1)
+    last = await MessageFactory(sender_id=2, chat_id=1)
+
+    response = await ac.get('/chats/inbox')
+    assert response.status_code == 200, response.json()
+    chat = response.json()['items'][0]
+    assert chat['partner']['id'] == 2
+    assert chat['last_message']['id'] == last.id
+    # * own messages are never unread
+    assert chat['unread'] == 2
+
+
+async def test_mark_read(ac):
+    first = await MessageFactory(sender_id=2, chat_id=1)
+    await MessageFactory(sender_id=2, chat_id=1)
+
+    response = await ac.put('/chats/1/read', json={'message_id': first.id})
+    assert response.status_code == 200, response.json()
+    assert response.json()['last_read_id'] == first.id
+    response = await ac.get('/chats/inbox')
+    assert response.json()['items'][0]['unread'] == 1
+
+    # the watermark never moves back
+    response = await ac.put('/chats/1/read', json={})
+    assert response.json()['last_read_id'] == first.id + 1
+    response = await ac.put('/chats/1/read', json={'message_id': first.id})
+    assert response.json()['last_read_id'] == first.id + 1
+    response = await ac.get('/chats/inbox')
+    assert response.json()['items'][0]['unread'] == 0
+
+    response = await ac.put('/chats/100/read', json={})
+    assert response.status_code == 404
+
+
+async def test_mark_read_past_last_message(ac):
+    last = await MessageFactory(sender_id=2, chat_id=1)
+
+    response = await ac.put('/chats/1/read', json={'message_id': 999999999})
+    assert response.status_code == 200, response.json()
+    assert response.json()['last_read_id'] == last.id
+
+    # later messages still count as unread
+    await MessageFactory(sender_id=2, chat_id=1)
+    response = await ac.get('/chats/inbox')
+    assert response.json()['items'][0]['unread'] == 1
+
+
+class ASGIWebSocket:
+    """Client end of a websocket served by the app in the test's event loop."""
+
+    def __init__(self, path: str, **params):
+        self.scope = {
+            'type': 'websocket',
+            'asgi': {'version': '3.0'},
+            'scheme': 'ws',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': urlencode(params).encode(),
+            'headers': [],
+            'client': ('testclient', 50000),
+            'server': ('test', 80),
+            'subprotocols': [],
+        }
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        self.task = None
+
+    async def connect(self) -> list[dict]:
+        self.to_app.put_nowait({'type': 'websocket.connect'})
+        self.task = asyncio.create_task(
+            app(self.scope, self.to_app.get, self.from_app.put),
+        )
+        message = await asyncio.wait_for(self.from_app.get(), 10)
+        assert message['type'] == 'websocket.accept', message
+        # the backlog always comes first
+        return await self.receive_json()
+
+    def send_json(self, data: dict):
+        self.to_app.put_nowait({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive_json(self) -> dict:
+        message = await asyncio.wait_for(self.from_app.get(), 10)
+        return json.loads(message['text'])
+
+    async def close(self):
+        self.to_app.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 10)
+
+
+def test_chat_websocket():
+    token = JWTService.encode({'id': 1})
+    client = TestClient(app)
+    with client.websocket_connect(f'/chats/1?token={token}') as websocket:
+        assert [message['id'] for message in websocket.receive_json()] == [1]
+        websocket.send_json({'content': 'hello'})
+        message = websocket.receive_json()
+        assert message['content'] == 'hello'
+        assert message['sender']['id'] == 1
+
+    # not a participant
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f'/chats/100?token={token}'):
+            pass
+
+
+async def test_chat_hub_fan_out():
+    redis = Redis(host='redis', port=6379, db=1)
+    # * two hubs stand for two workers sharing Redis
+    listeners = [PubSubListener(), PubSubListener()]
+    hubs = [ChatHub(), ChatHub()]
+    for hub, listener in zip(hubs, listeners):
+        hub.bind(redis, listener)
+        await listener.start(redis)
+    first, second, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    try:
+        await hubs[0].connect(first, 1)
+        await hubs[1].connect(second, 1)
+        await hubs[1].connect(other, 2)
+        for _ in range(50):
+            if dict(await redis.pubsub_numsub('chat:1'))[b'chat:1'] == 2:
+                break
+            await asyncio.sleep(0.1)
+
+        await hubs[0].publish(1, {'content': 'hi'})
+        message = await asyncio.wait_for(second.messages.get(), 5)
+        assert message == {'content': 'hi'}
+        # local sockets get the message once, other chats not at all
+        assert first.messages.get_nowait() == {'content': 'hi'}
+        await asyncio.sleep(0.2)
+        assert first.messages.empty() and other.messages.empty()
+
+        # the channel is dropped with the last local socket
+        await hubs[1].disconnect(second, 1)
+        assert 'chat:1' not in listeners[1]._handlers
+        assert 2 in hubs[1].connections
+    finally:
+        for listener in listeners:
+            await listener.stop()
+        await redis.aclose()
+
+
+async def test_chat_hub_slow_socket():
+    hub = ChatHub(send_queue_size=2, overflow=OverflowPolicy.drop)
+    slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+    await hub.connect(slow, 1)
+    await hub.connect(fast, 1)
+
+    for i in range(4):
+        await hub.publish(1, {'id': i})
+        await asyncio.sleep(0)
+    received = [await asyncio.wait_for(fast.messages.get(), 1) for _ in range(4)]
+    assert [m['id'] for m in received] == [0, 1, 2, 3]
+
+    stats = {s['queued']: s for s in hub.stats()['connections']}
+    # the first frame is already being sent, two wait in the queue
+    assert stats[2]['dropped'] == 1 and stats[2]['lag'] > 0
+
+    slow.unblocked.set()
+    received = [await asyncio.wait_for(slow.messages.get(), 1) for _ in range(3)]
+    assert [m['id'] for m in received] == [0, 2, 3]
+    await hub.disconnect(slow, 1)
+    await hub.disconnect(fast, 1)
+    assert hub.stats()['sockets'] == 0
+
+
+@pytest.mark.parametrize('overflow', [OverflowPolicy.coalesce, OverflowPolicy.disconnect])
+async def test_chat_hub_overflow(overflow):
+    hub = ChatHub(send_queue_size=2, overflow=overflow)
+    slow = FakeWebSocket(blocked=True)
+    await hub.connect(slow, 1)
+    for i in range(4):
+        await hub.publish(1, {'id': i})
+        await asyncio.sleep(0)
+    slow.unblocked.set()
+
+    if overflow == OverflowPolicy.coalesce:
+        assert await asyncio.wait_for(slow.messages.get(), 1) == {'id': 0}
+        batch = await asyncio.wait_for(slow.messages.get(), 1)
+        assert batch == [{'id': 1}, {'id': 2}, {'id': 3}]
+    else:
+        await asyncio.sleep(0.1)
+        assert slow.closed_with == 1013
+    await hub.disconnect(slow, 1)
+
+
+async def test_chat_hub_coalesce_is_bounded():
+    hub = ChatHub(send_queue_size=2, overflow=OverflowPolicy.coalesce)
+    stalled = FakeWebSocket(blocked=True)
+    await hub.connect(stalled, 1)
+    connection = hub.connections[1][stalled]
+    limit = 2 * connection.coalesce_factor
+
+    for i in range(limit * 3):
+        await hub.publish(1, {'id': i})
+        assert connection.frames <= limit
+    await asyncio.sleep(0.1)
+    # the stalled client is dropped instead of collecting the whole chat
+    assert stalled.closed_with == 1013
+    assert connection.closed and connection.frames == 0
+    await hub.disconnect(stalled, 1)
+
+
+@pytest.mark.parametrize('durable', [True, False])
+async def test_message_buffer(durable):
+    buffer = MessageBuffer(max_rows=3, delay=0.05, durable=durable)
+    buffer.bind(SqlMessageStore(session_manager))
+    data = [{'chat_id': 1, 'sender_id': 1 + i % 2, 'content': str(i)} for i in range(4)]
+
+    statements = []
+    engine = session_manager._engine.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        # three rows fill a batch, the fourth is written after the delay
+        messages = await asyncio.gather(*(buffer.add(item) for item in data))
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert len([s for s in statements if s.startswith('INSERT')]) == 2
+    assert [m.content for m in messages] == ['0', '1', '2', '3']
+    assert len({m.id for m in messages}) == 4
+    assert all(m.timestamp is not None for m in messages)
+    assert buffer.stats()['flushes'] == 2
+
+    # * stored, the default message of the chat comes first
+    async with session_manager.session() as session:
+        count = await ChatRepository(session).count_chat_messages(1)
+    assert count == 5
+
+
+async def test_message_buffer_bad_row():
+    buffer = MessageBuffer(max_rows=10, delay=0.05)
+    buffer.bind(SqlMessageStore(session_manager))
+    errors = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    try:
+        good = asyncio.create_task(buffer.add({'chat_id': 1, 'sender_id': 1, 'content': 'ok'}))
+        # the chat doesn't exist, e.g. deleted while the batch filled up
+        bad = asyncio.create_task(buffer.add({'chat_id': 100, 'sender_id': 1, 'content': 'x'}))
+        gone = asyncio.create_task(buffer.add({'chat_id': 100, 'sender_id': 2, 'content': 'y'}))
+        await asyncio.sleep(0)
+        gone.cancel()
+        await buffer.close()
+
+        # only the senders of bad rows fail
+        assert (await good).content == 'ok'
+        with pytest.raises(Exception):
+            await bad
+        del gone
+        gc.collect()
+        assert errors == []
+    finally:
+        loop.set_exception_handler(None)
+
+
+async def test_idle_websockets_hold_no_connections():
+    token = JWTService.encode({'id': 1})
+    checked_out = 0
+
+    def checkout(*args):
+        nonlocal checked_out
+        checked_out += 1
+
+    def checkin(*args):
+        nonlocal checked_out
+        checked_out -= 1
+
+    engine = session_manager._engine.sync_engine
+    event.listen(engine, 'checkout', checkout)
+    event.listen(engine, 'checkin', checkin)
+    sockets = []
+    try:
+        for _ in range(20):
+            batch = [ASGIWebSocket('/chats/1', token=token) for _ in range(50)]
+            await asyncio.gather(*(websocket.connect() for websocket in batch))
+            sockets += batch
+        assert len(chat_hub.connections[1]) == 1000
+        assert checked_out == 0
+
+        # a message borrows a connection only while it is stored
+        sockets[0].send_json({'content': 'hello'})
+        message = await sockets[-1].receive_json()
+        assert message['content'] == 'hello'
+        assert checked_out == 0
+    finally:
+        await asyncio.gather(*(websocket.close() for websocket in sockets))
+        event.remove(engine, 'checkout', checkout)
+        event.remove(engine, 'checkin', checkin)
+    assert 1 not in chat_hub.connections
+
+
+async def test_chat_recent_messages():
+    redis = Redis(host='redis', port=6379, db=1, decode_responses=True)
+    keys = chat_hub.recent_key(1), chat_hub.sequence_key(1)
+    await redis.delete(*keys)
+    chat_hub.bind(redis, None)
+    token = JWTService.encode({'id': 1})
+
+    statements = []
+    engine = session_manager._engine.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    reads = lambda: [s for s in statements if 'FROM message' in s]
+    try:
+        # the first open fills the list from the database
+        websocket = ASGIWebSocket('/chats/1', token=token)
+        assert [message['id'] for message in await websocket.connect()] == [1]
+        assert len(reads()) == 1
+        websocket.send_json({'content': 'hello'})
+        sent = await websocket.receive_json()
+        await websocket.close()
+
+        # * opening and resuming are answered by Redis
+        statements.clear()
+        websocket = ASGIWebSocket('/chats/1', token=token)
+        assert [message['id'] for message in await websocket.connect()] == [1, sent['id']]
+        await websocket.close()
+        websocket = ASGIWebSocket('/chats/1', token=token, since=1)
+        assert [message['id'] for message in await websocket.connect()] == [sent['id']]
+        await websocket.close()
+        assert reads() == []
+
+        # resuming from before the list goes to the database
+        websocket = ASGIWebSocket('/chats/1', token=token, since=0)
+        assert [message['id'] for message in await websocket.connect()] == [1, sent['id']]
+        await websocket.close()
+        assert len(reads()) == 1
+
+        # clearing the chat drops the list
+        await chat_hub.forget(1)
+        assert not await redis.exists(chat_hub.recent_key(1))
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+        chat_hub.bind(None, None)
+        await redis.delete(*keys)
+        await redis.aclose()
+
+
+async def test_chat_resume_after_long_gap():
+    messages = [await MessageFactory(sender_id=2, chat_id=1) for _ in range(4)]
+    ids = [message.id for message in messages]
+    token = JWTService.encode({'id': 1})
+    recent_size = chat_hub.recent_size
+    chat_hub.recent_size = 2
+    try:
+        # a short gap is sent from `since` on, oldest first
+        websocket = ASGIWebSocket('/chats/1', token=token, since=ids[1])
+        assert [message['id'] for message in await websocket.connect()] == ids[2:]
+        await websocket.close()
+
+        # a longer one restarts the client from the recent messages
+        websocket = ASGIWebSocket('/chats/1', token=token, since=1)
+        backlog = await websocket.connect()
+        await websocket.close()
+        assert backlog['reset'] is True
+        assert [message['id'] for message in backlog['messages']] == ids[2:]
+    finally:
+        chat_hub.recent_size = recent_size
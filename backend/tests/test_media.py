@@ -0,0 +1,169 @@
+import gzip
+import os
+import shutil
+import struct
+import zlib
+import pytest
+
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from src.application.exceptions import ValidationError
+from src.application.utils.offers import IMAGE_VARIANTS, image_variant
+from src.infrastructure.services.storage import MediaStorageService
+
+
+HASHED_NAME = 'a' * 64 + '.thumb.webp'
+
+
+@pytest.fixture
+def media_files():
+    directory = 'src/media/users'
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'hashed': os.path.join(directory, HASHED_NAME),
+        'plain': os.path.join(directory, 'plain.txt'),
+        'compressed': os.path.join(directory, 'plain.txt.gz'),
+    }
+    with open(paths['hashed'], 'wb') as f:
+        f.write(b'0123456789' * 10)
+    with open(paths['plain'], 'wb') as f:
+        f.write(b'plain text ' * 10)
+    with open(paths['compressed'], 'wb') as f:
+        f.write(gzip.compress(b'plain text ' * 10))
+    yield
+    for path in paths.values():
+        os.remove(path)
+
+
+async def test_hashed_file_is_immutable(media_files, c):
+    response = await c.get(f'/media/users/{HASHED_NAME}')
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['cache-control']
+
+
+async def test_etag_revalidation(media_files, c):
+    response = await c.get('/static/img/user_logo.png')
+    assert response.status_code == 200
+    assert response.headers['cache-control'] == 'no-cache'
+
+    etag = response.headers['etag']
+    response = await c.get(
+        '/static/img/user_logo.png',
+        headers={'If-None-Match': etag},
+    )
+    assert response.status_code == 304
+
+
+async def test_range_request(media_files, c):
+    response = await c.get(
+        f'/media/users/{HASHED_NAME}',
+        headers={'Range': 'bytes=5-14'},
+    )
+    assert response.status_code == 206
+    assert response.headers['content-range'] == 'bytes 5-14/100'
+    assert response.content == b'5678901234'
+
+    response = await c.get(
+        f'/media/users/{HASHED_NAME}',
+        headers={'Range': 'bytes=200-'},
+    )
+    assert response.status_code == 416
+
+
+async def test_precompressed_file(media_files, c):
+    response = await c.get(
+        '/media/users/plain.txt',
+        headers={'Accept-Encoding': 'gzip'},
+    )
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.content == b'plain text ' * 10
+
+    # an explicit refusal gets the identity encoding, which varies too
+    for accept_encoding in ('gzip;q=0', 'br, gzip; q=0', '*;q=0', 'identity'):
+        response = await c.get(
+            '/media/users/plain.txt',
+            headers={'Accept-Encoding': accept_encoding},
+        )
+        assert response.status_code == 200
+        assert 'content-encoding' not in response.headers
+        assert response.headers['vary'] == 'Accept-Encoding'
+
+    response = await c.get('/media/users/plain.txt', headers={'Accept-Encoding': '*'})
+    assert response.headers['content-encoding'] == 'gzip'
+
+    # without a compressed sibling the response doesn't vary
+    response = await c.get(f'/media/users/{HASHED_NAME}')
+    assert 'vary' not in response.headers
+
+
+async def test_create_variants(tmp_path):
+    path = 'media/offers/test.png'
+    os.makedirs(tmp_path / 'media/offers')
+    shutil.copy('tests/images/test.png', tmp_path / path)
+
+    storage = MediaStorageService(root=str(tmp_path))
+    try:
+        await storage.create_variants(path)
+    finally:
+        MediaStorageService.shutdown()
+
+    # thumbnails are cropped to the card size, larger variants never upscale
+    with Image.open(tmp_path / image_variant(path, 'thumb')) as thumb:
+        assert thumb.format == 'WEBP'
+        assert thumb.size == IMAGE_VARIANTS['thumb']
+    with Image.open(tmp_path / image_variant(path, 'medium')) as medium:
+        assert medium.format == 'WEBP'
+        assert medium.size == (225, 225)
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack('>I', len(data)) + kind + data +
+        struct.pack('>I', zlib.crc32(kind + data))
+    )
+
+
+async def test_create_variants_decompression_bomb(tmp_path):
+    path = 'media/offers/bomb.png'
+    os.makedirs(tmp_path / 'media/offers')
+    # * only the header claims 20000x20000 pixels, the upload itself is tiny
+    header = struct.pack('>IIBBBBB', 20000, 20000, 8, 2, 0, 0, 0)
+    with open(tmp_path / path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(png_chunk(b'IHDR', header))
+        f.write(png_chunk(b'IDAT', zlib.compress(b'')))
+        f.write(png_chunk(b'IEND', b''))
+
+    storage = MediaStorageService(root=str(tmp_path))
+    try:
+        with pytest.raises(ValidationError):
+            await storage.create_variants(path)
+    finally:
+        MediaStorageService.shutdown()
+
+
+async def test_create_variants_broken_pool(tmp_path):
+    path = 'media/offers/test.png'
+    os.makedirs(tmp_path / 'media/offers')
+    shutil.copy('tests/images/test.png', tmp_path / path)
+
+    class BrokenPool:
+        """Stands for a pool whose worker crashed."""
+
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool('A child process terminated abruptly')
+
+        def shutdown(self, *args, **kwargs):
+            pass
+
+    MediaStorageService._executor = BrokenPool()
+    storage = MediaStorageService(root=str(tmp_path))
+    try:
+        await storage.create_variants(path)
+    finally:
+        MediaStorageService.shutdown()
+    assert os.path.exists(tmp_path / image_variant(path, 'thumb'))
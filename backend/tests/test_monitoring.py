@@ -0,0 +1,36 @@
+import pytest
+
+from src.infrastructure.config import get_settings
+
+
+TOKEN = 'monitoring-secret'
+
+
+@pytest.fixture
+def monitoring_token(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'monitoring_token', TOKEN)
+    return {'X-Monitoring-Token': TOKEN}
+
+
+async def test_get_redis_stats(c, monitoring_token):
+    response = await c.get('/monitoring/redis', headers=monitoring_token)
+    assert response.status_code == 200
+
+
+async def test_get_chat_stats(c, monitoring_token):
+    response = await c.get('/monitoring/chats', headers=monitoring_token)
+    assert response.status_code == 200
+    assert response.json()['sockets'] == 0
+
+
+async def test_monitoring_is_internal(c, monitoring_token):
+    response = await c.get('/monitoring/cache')
+    assert response.status_code == 403
+    response = await c.get('/monitoring/cache', headers={'X-Monitoring-Token': 'wrong'})
+    assert response.status_code == 403
+
+
+async def test_monitoring_closed_without_token(c, monkeypatch):
+    monkeypatch.setattr(get_settings(), 'monitoring_token', None)
+    response = await c.get('/monitoring/chats', headers={'X-Monitoring-Token': ''})
+    assert response.status_code == 403
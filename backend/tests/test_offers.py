@@ -1,6 +1,28 @@
+import asyncio
 import json
 import pytest
 
+from redis.asyncio import Redis
+from sqlalchemy import event
+
+from src.application.utils.geo import encode_geohash, haversine_km
+from src.application.dtos.offers import OfferUpdate
+from src.application.dtos.users import UserUpdate
+from src.application.exceptions import ValidationError
+from src.infrastructure.repositories.offers import OfferRepository
+from src.presentation.api.dependencies.usecases import (
+    get_offer_usecase,
+    get_user_usecase,
+)
+from tests.conftest import session_manager
+from tests.factories.users import UserFactory
+from tests.factories.offers import (
+    FeedbackFactory,
+    ImageFactory,
+    OfferFactory,
+    PriceFactory,
+)
+
 
 @pytest.mark.parametrize('path, status', [
     ('/offers/', 200),
@@ -11,6 +33,57 @@ async def test_get_offer(c, path, status):
     assert response.status_code == status, response.json()
 
 
+async def test_get_offers_page(c):
+    offer = await OfferFactory(owner_id=1)
+    await PriceFactory(offer_id=offer.id)
+
+    response = await c.get('/offers/', params={'page': 2, 'size': 1})
+    assert response.status_code == 200, response.json()
+    assert response.json()['total'] == 2
+    assert [item['id'] for item in response.json()['items']] == [offer.id]
+
+
+async def test_get_offer_image_variants(c):
+    await ImageFactory(offer_id=1, data='media/offers/ab/cd/abcd.png')
+
+    response = await c.get('/offers/')
+    images = response.json()['items'][0]['images']
+    assert {
+        'data': 'media/offers/ab/cd/abcd.thumb.webp',
+        'original': 'media/offers/ab/cd/abcd.png',
+    } in images
+
+    response = await c.get('/offers/1')
+    images = response.json()['images']
+    assert {
+        'data': 'media/offers/ab/cd/abcd.medium.webp',
+        'original': 'media/offers/ab/cd/abcd.png',
+    } in images
+
+
+async def test_get_offers_feed(c):
+    for _ in range(2):
+        offer = await OfferFactory(owner_id=1)
+        await PriceFactory(offer_id=offer.id)
+
+    response = await c.get('/offers/feed', params={'size': 2})
+    assert response.status_code == 200, response.json()
+    first_page = response.json()
+    assert len(first_page['items']) == 2
+    assert first_page['next_cursor'] is not None
+
+    # an offer created while paging must not shift the next page
+    new_offer = await OfferFactory(owner_id=1)
+    await PriceFactory(offer_id=new_offer.id)
+
+    params = {'size': 2, 'cursor': first_page['next_cursor']}
+    response = await c.get('/offers/feed', params=params)
+    assert response.status_code == 200, response.json()
+    second_page = response.json()
+    assert [item['id'] for item in second_page['items']] == [1]
+    assert second_page['next_cursor'] is None
+
+
 async def test_create_offer(ac):
     data = {
         'name': 'Test offer',
@@ -46,6 +119,23 @@ async def test_update_offer(ac):
     assert response.status_code == 202, response.json()
 
 
+async def test_update_offer_coordinates():
+    async with session_manager.session() as session:
+        offer_usecase = get_offer_usecase(session, redis_session=None)
+        data = OfferUpdate(latitude=50.4501, longitude=30.5234)
+        await offer_usecase.update_offer(1, data)
+
+        # one coordinate moves alone, the geohash follows
+        response = await offer_usecase.update_offer(1, OfferUpdate(longitude=24.03))
+        assert (response.latitude, response.longitude) == (50.4501, 24.03)
+        offer = await OfferRepository(session).retrieve(id=1)
+        assert offer.geohash == encode_geohash(50.4501, 24.03)
+
+        # both or none
+        with pytest.raises(ValidationError):
+            await offer_usecase.update_offer(1, OfferUpdate(latitude=None))
+
+
 async def test_create_feedback(ac):
     data = {'rating': 5, 'text': 'Test feedback'}
     response = await ac.post('/offers/1/feedback', json=data)
@@ -55,3 +145,180 @@ async def test_create_feedback(ac):
 async def test_delete_offer(ac):
     response = await ac.delete('/offers/1')
     assert response.status_code == 204, response.json()
+
+
+async def test_get_offer_single_flight(c):
+    statements = []
+    engine = session_manager._engine.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        responses = await asyncio.gather(*[c.get('/offers/1') for _ in range(10)])
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    # offer, its images and the first feedback page
+    assert all(response.status_code == 200 for response in responses)
+    assert len(statements) == 3
+
+
+async def test_offer_rating_aggregates(c):
+    await FeedbackFactory(offer_id=1, user_id=2, rating=3)
+    offer = await OfferFactory(owner_id=1)
+    await PriceFactory(offer_id=offer.id)
+
+    response = await c.get('/offers/1')
+    data = response.json()
+    assert data['rating_count'] == 2
+    assert data['rating_avg'] == 4.0
+    assert data['rating_histogram'] == [0, 0, 1, 0, 1]
+
+    response = await c.get('/offers/', params={'sort': 'rating'})
+    assert [item['id'] for item in response.json()['items']] == [1, offer.id]
+
+
+async def test_get_offer_feedbacks(c):
+    user = await UserFactory()
+    await FeedbackFactory(offer_id=1, user_id=2, rating=4)
+    await FeedbackFactory(offer_id=1, user_id=user.id, rating=3)
+
+    response = await c.get('/offers/1/feedbacks', params={'page': 2, 'size': 2})
+    assert response.status_code == 200, response.json()
+    assert response.json()['total'] == 3
+    assert len(response.json()['items']) == 1
+
+    response = await c.get('/offers/1')
+    assert len(response.json()['feedbacks']) == 3
+
+
+async def test_get_offer_feedback_author_renamed(c):
+    user = await UserFactory()
+    await FeedbackFactory(offer_id=1, user_id=user.id)
+
+    response = await c.get('/offers/1')
+    assert user.username in [item['user'] for item in response.json()['feedbacks']]
+
+    redis = Redis(host='redis', port=6379, db=1)
+    async with session_manager.session() as session:
+        user_usecase = get_user_usecase(session, redis_session=redis)
+        await user_usecase.update_user(user.id, UserUpdate(username='renamed'))
+    await redis.aclose()
+
+    response = await c.get('/offers/1')
+    feedbacks = response.json()['feedbacks']
+    assert [item['user'] for item in feedbacks if item['user_id'] == user.id] == ['renamed']
+
+
+async def test_get_offers_filters(c):
+    cheap = await OfferFactory(owner_id=2, city='Lviv', offer_type='apartment')
+    await PriceFactory(offer_id=cheap.id, per_day=500)
+    hourly = await OfferFactory(owner_id=2, city='Lviv', offer_type='apartment')
+    await PriceFactory(offer_id=hourly.id, per_day=0)
+
+    params = {'city': 'Lviv', 'offer_type': 'apartment', 'max_per_day': 800}
+    response = await c.get('/offers/', params=params)
+    assert response.status_code == 200, response.json()
+    assert [item['id'] for item in response.json()['items']] == [cheap.id]
+    assert response.json()['total'] == 1
+
+    response = await c.get('/offers/', params={'owner_id': 2, 'sort': 'price_asc'})
+    assert [item['id'] for item in response.json()['items']] == [cheap.id, hourly.id]
+
+
+async def test_get_offers_without_prices(c):
+    offer = await OfferFactory(owner_id=2, city='Odesa')
+
+    response = await c.get('/offers/', params={'owner_id': 2})
+    assert response.status_code == 200, response.json()
+    assert [item['id'] for item in response.json()['items']] == [offer.id]
+    assert response.json()['total'] == 1
+
+    # price filters and sorts only list offers that have prices
+    params = {'owner_id': 2, 'sort': 'price_asc'}
+    response = await c.get('/offers/', params=params)
+    assert response.json()['items'] == [] and response.json()['total'] == 0
+
+
+async def test_search_offers(c):
+    lake = await OfferFactory(
+        name='Lake house',
+        description='Quiet wooden house with a view of the lake',
+    )
+    await PriceFactory(offer_id=lake.id)
+    other = await OfferFactory(name='City loft', description='Loft near a lake')
+    await PriceFactory(offer_id=other.id)
+
+    response = await c.get('/offers/search', params={'q': 'lake house'})
+    assert response.status_code == 200, response.json()
+    items = [item for item in response.json()['items'] if item['id'] in (lake.id, other.id)]
+    assert [item['id'] for item in items] == [lake.id]
+    assert '<b>lake</b>' in items[0]['headline']
+
+    # * faker cities of the other offers may match too, e.g. 'Lake Jennifer'
+    response = await c.get('/offers/search', params={'q': 'lake'})
+    ids = [item['id'] for item in response.json()['items']]
+    assert [i for i in ids if i in (lake.id, other.id)] == [lake.id, other.id]
+
+
+async def test_search_headline_is_escaped(c):
+    offer = await OfferFactory(
+        name='Garden house',
+        description='Garden <script>alert(1)</script> & house',
+    )
+    await PriceFactory(offer_id=offer.id)
+
+    response = await c.get('/offers/search', params={'q': 'garden'})
+    assert response.status_code == 200, response.json()
+    item = next(item for item in response.json()['items'] if item['id'] == offer.id)
+    headline = item['headline']
+    assert '<script>' not in headline
+    assert '&lt;script&gt;' in headline and '&amp;' in headline
+    assert '<b>Garden</b>' in headline
+
+
+async def test_get_nearby_offers(c):
+    offers = []
+    for latitude, longitude in [(50.4547, 30.5238), (50.40, 30.60), (49.84, 24.03)]:
+        offer = await OfferFactory(
+            latitude=latitude,
+            longitude=longitude,
+            geohash=encode_geohash(latitude, longitude),
+        )
+        await PriceFactory(offer_id=offer.id)
+        offers.append(offer)
+
+    params = {'lat': 50.4501, 'lon': 30.5234, 'radius_km': 10}
+    response = await c.get('/offers/nearby', params=params)
+    assert response.status_code == 200, response.json()
+    items = response.json()['items']
+    assert [item['id'] for item in items] == [offers[0].id, offers[1].id]
+    assert items[0]['distance_km'] < 1 < items[1]['distance_km'] < 10
+    # * the SQL distance matches the reference, rounded to metres
+    for item, offer in zip(items, offers):
+        expected = haversine_km(50.4501, 30.5234, offer.latitude, offer.longitude)
+        assert item['distance_km'] == pytest.approx(expected, abs=1e-3)
+
+    params['radius_km'] = 1
+    response = await c.get('/offers/nearby', params=params)
+    assert response.json()['total'] == 1
+
+
+async def test_get_quotes(c):
+    hourly = await OfferFactory()
+    await PriceFactory(offer_id=hourly.id, per_hour=10, per_day=0, per_month=0, per_year=0)
+    monthly = await OfferFactory()
+    await PriceFactory(offer_id=monthly.id, per_hour=0, per_day=0, per_month=500, per_year=0)
+    unavailable = await OfferFactory()
+    await PriceFactory(offer_id=unavailable.id, per_hour=0, per_day=0, per_month=0, per_year=0)
+
+    data = {'start': '2030-05-10T12:00:00Z', 'end': '2030-05-13T14:00:00Z'}
+    response = await c.post('/offers/quotes', json=data)
+    assert response.status_code == 200, response.json()
+    quotes = response.json()['items']
+    assert [quote['offer_id'] for quote in quotes] == [monthly.id, hourly.id, 1]
+    assert [quote['total'] for quote in quotes] == [500, 740, 3200]
+    assert quotes[2]['days'] == 3 and quotes[2]['hours'] == 2
+
+    data['offer_ids'] = [1]
+    response = await c.post('/offers/quotes', json=data)
+    assert response.json()['total'] == 1
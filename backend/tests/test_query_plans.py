@@ -0,0 +1,324 @@
+import json
+import random
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, text
+
+from src.application.utils.geo import covering_cells, encode_geohash
+from src.infrastructure.repositories.bookings import BookingRepository
+from src.infrastructure.repositories.chats import ChatRepository
+from src.infrastructure.repositories.offers import OfferRepository
+from src.infrastructure.repositories.users import CompanyRepository, UserRepository
+from tests.conftest import session_manager
+
+
+USERS = 10_000
+OFFERS = 20_000
+CHATS = 10_000
+MESSAGES = 50_000
+
+# * tables that may never be read with a sequential scan
+LARGE_TABLES = {
+    'users', 'company', 'offer', 'price', 'image',
+    'feedback', 'chat', 'message', 'booking',
+}
+
+SEED = [
+    """
+    INSERT INTO users (username, email, password, is_active, is_company, provider)
+    SELECT 'user' || i, 'user' || i || '@example.com', 'x', true, i % 10 = 0, 'local'
+    FROM generate_series(1, :users) AS i
+    """,
+    """
+    INSERT INTO company (user_id, owner, email, name)
+    SELECT id, username, email, 'company' || id FROM users WHERE is_company
+    """,
+    """
+    INSERT INTO offer (
+        name, description, offer_type, phone, city, created_at, owner_id,
+        rating_count, rating_sum, latitude, longitude, geohash
+    )
+    SELECT
+        'offer ' || i,
+        concat_ws(' ', 'w' || i * 7 % 3001, 'w' || i * 13 % 2003, 'w' || i * 31 % 4001),
+        (ARRAY['hotel', 'apartment'])[1 + i % 2]::offertype,
+        '+12512630796',
+        'city' || i % 500,
+        TIMEZONE('utc', now()) - i * interval '1 minute',
+        3 + i % :users,
+        i % 7,
+        (i % 7) * (1 + i % 5),
+        latitude,
+        longitude,
+        geohash
+    FROM unnest(
+        CAST(:latitudes AS float8[]),
+        CAST(:longitudes AS float8[]),
+        CAST(:geohashes AS text[])
+    ) WITH ORDINALITY
+        AS t(latitude, longitude, geohash, i)
+    """,
+    """
+    INSERT INTO price (offer_id, per_hour, per_day, per_month, per_year)
+    SELECT
+        id,
+        CASE WHEN id % 3 = 0 THEN 0 ELSE 10 + id % 90 END,
+        CASE WHEN id % 5 = 0 THEN 0 ELSE 100 + id % 900 END,
+        2000 + id % 9000,
+        20000 + id % 90000
+    FROM offer
+    WHERE id NOT IN (SELECT offer_id FROM price)
+    """,
+    """
+    INSERT INTO image (offer_id, data)
+    SELECT id, 'media/offers/' || id || '/' || n || '.png'
+    FROM offer, generate_series(1, 2) AS n
+    """,
+    # ! aggregates are seeded on the offers directly
+    'ALTER TABLE feedback DISABLE TRIGGER USER',
+    """
+    INSERT INTO feedback (text, rating, user_id, offer_id)
+    SELECT 'feedback', 1 + (offer.id + n) % 5, 3 + (offer.id + n) % :users, offer.id
+    FROM offer, generate_series(1, 3) AS n
+    """,
+    'ALTER TABLE feedback ENABLE TRIGGER USER',
+    """
+    INSERT INTO chat (first_user_id, second_user_id)
+    SELECT 3 + i % :users, 3 + (i + 1 + i / :users) % :users
+    FROM generate_series(1, :chats) AS i
+    """,
+    """
+    INSERT INTO message (chat_id, sender_id, content, timestamp)
+    SELECT 2 + i % :chats, 3 + i % :users, 'hello',
+        TIMEZONE('utc', now()) - i * interval '1 second'
+    FROM generate_series(1, :messages) AS i
+    """,
+    """
+    INSERT INTO booking (offer_id, user_id, period)
+    SELECT id, 3 + id % :users, tstzrange(
+        '2030-01-01'::timestamptz + (id % 300) * interval '1 day',
+        '2030-01-01'::timestamptz + (id % 300 + 3) * interval '1 day'
+    )
+    FROM offer
+    """,
+    # ! done by autovacuum in production, the planner avoids GIN scans meanwhile
+    "SELECT gin_clean_pending_list('ix_offer_search_vector')",
+    'ANALYZE',
+]
+
+
+@pytest.fixture
+async def seed():
+    rng = random.Random(42)
+    latitudes = [rng.uniform(44, 52) for _ in range(OFFERS)]
+    longitudes = [rng.uniform(22, 40) for _ in range(OFFERS)]
+    params = {
+        'users': USERS,
+        'chats': CHATS,
+        'messages': MESSAGES,
+        'latitudes': latitudes,
+        'longitudes': longitudes,
+        'geohashes': [
+            encode_geohash(lat, lon) for lat, lon in zip(latitudes, longitudes)
+        ],
+    }
+    async with session_manager._engine.begin() as conn:
+        for statement in SEED:
+            query = text(statement)
+            await conn.execute(query, {
+                key: value for key, value in params.items()
+                if f':{key}' in statement
+            })
+
+
+def seq_scans(plan: dict):
+    if plan['Node Type'] == 'Seq Scan' and plan['Relation Name'] in LARGE_TABLES:
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+async def check_plans(cases: dict, full_scans: tuple = ()):
+    """
+    Run every case on a rolled back session, then EXPLAIN each statement it
+    executed with the same parameters. Returns the sequential scans found.
+    """
+
+    engine = session_manager._engine.sync_engine
+    failures = {}
+    for name, call in cases.items():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            async with session_manager.session() as session:
+                await call(session)
+                await session.rollback()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        assert statements, name
+        async with session_manager._engine.connect() as conn:
+            for statement, parameters in statements:
+                res = await conn.exec_driver_sql(
+                    f'EXPLAIN (FORMAT JSON) {statement}',
+                    parameters,
+                )
+                plan = res.scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                tables = set(seq_scans(plan[0]['Plan']))
+                if tables and name not in full_scans:
+                    failures.setdefault(name, []).append((sorted(tables), statement))
+    return failures
+
+
+async def test_offer_repository_plans(seed):
+    latitude, longitude, radius = 50.45, 30.52, 5
+    cells = covering_cells(latitude, longitude, radius)
+    created_after = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=2)
+    repo = OfferRepository
+
+    cases = {
+        'list': lambda s: repo(s).list(20, 40),
+        'list newest': lambda s: repo(s).list(20, 0, 'newest'),
+        'list rating': lambda s: repo(s).list(20, 0, 'rating'),
+        'list price_asc': lambda s: repo(s).list(20, 0, 'price_asc'),
+        'list price_desc': lambda s: repo(s).list(20, 0, 'price_desc'),
+        'list city': lambda s: repo(s).list(20, 0, 'newest', {'city': 'city7'}),
+        'list city type': lambda s: repo(s).list(
+            20, 0, 'id', {'city': 'city7', 'offer_type': 'hotel'},
+        ),
+        'list owner': lambda s: repo(s).list(20, 0, 'newest', {'owner_id': 100}),
+        'list created': lambda s: repo(s).list(
+            20, 0, 'newest', {'created_after': created_after},
+        ),
+        'list price range': lambda s: repo(s).list(
+            20, 0, 'price_asc', {'min_per_day': 120, 'max_per_day': 130},
+        ),
+        'count city': lambda s: repo(s).count({'city': 'city7'}),
+        'count': lambda s: repo(s).count(),
+        'search': lambda s: repo(s).search('w42', 20, 0),
+        'count_search': lambda s: repo(s).count_search('w42'),
+        'nearby': lambda s: repo(s).nearby(latitude, longitude, radius, cells, 20, 0),
+        'count_nearby': lambda s: repo(s).count_nearby(latitude, longitude, radius, cells),
+        'get_prices ids': lambda s: repo(s).get_prices([10, 20, 30]),
+        'get_prices city': lambda s: repo(s).get_prices(None, {'city': 'city7'}),
+        'get_feed': lambda s: repo(s).get_feed(None, 21),
+        'get_feed after': lambda s: repo(s).get_feed((created_after, 100), 21),
+        'retrieve': lambda s: repo(s).retrieve(id=100),
+        'get_feedbacks': lambda s: repo(s).get_feedbacks(100, 20, 0),
+        'count_feedbacks': lambda s: repo(s).count_feedbacks(100),
+        'update': lambda s: repo(s).update({'name': 'renamed'}, id=100),
+        'update_prices': lambda s: repo(s).update_prices({'per_day': 5}, offer_id=100),
+        'add_feedback': lambda s: repo(s).add_feedback(
+            {'text': 'ok', 'rating': 5, 'user_id': 1, 'offer_id': 100},
+        ),
+        'add_prices': lambda s: repo(s).add_prices({
+            'offer_id': 100, 'per_hour': 1, 'per_day': 2, 'per_month': 3, 'per_year': 4,
+        }),
+        'add_images': lambda s: repo(s).add_images([
+            {'offer_id': 100, 'data': 'media/offers/a.png'},
+            {'offer_id': 100, 'data': 'media/offers/b.png'},
+        ]),
+        'delete': lambda s: repo(s).delete(100),
+    }
+    failures = await check_plans(cases, full_scans=('count',))
+    assert not failures, failures
+
+
+async def test_user_repository_plans(seed):
+    cases = {
+        'UserRepository.list': lambda s: UserRepository(s).list(20, 1000),
+        'UserRepository.retrieve': lambda s: UserRepository(s).retrieve(id=100),
+        'UserRepository.retrieve username': (
+            lambda s: UserRepository(s).retrieve(username='user100')
+        ),
+        'UserRepository.retrieve email': (
+            lambda s: UserRepository(s).retrieve(email='user100@example.com')
+        ),
+        'UserRepository.update': (
+            lambda s: UserRepository(s).update({'is_active': False}, id=100)
+        ),
+        'UserRepository.delete': lambda s: UserRepository(s).delete(100),
+        'UserRepository.get_user_offers': (
+            lambda s: UserRepository(s).get_user_offers(100, 20, 0)
+        ),
+        'UserRepository.count_user_offers': (
+            lambda s: UserRepository(s).count_user_offers(100)
+        ),
+        'UserRepository.count': lambda s: UserRepository(s).count(),
+        'CompanyRepository.list': lambda s: CompanyRepository(s).list(20, 100),
+        'CompanyRepository.get_company_offers': (
+            lambda s: CompanyRepository(s).get_company_offers(102, 20, 0)
+        ),
+        'CompanyRepository.count_company_offers': (
+            lambda s: CompanyRepository(s).count_company_offers(102)
+        ),
+        'CompanyRepository.get_user_company': (
+            lambda s: CompanyRepository(s).get_user_company(102)
+        ),
+        'CompanyRepository.count': lambda s: CompanyRepository(s).count(),
+    }
+    failures = await check_plans(
+        cases,
+        full_scans=('UserRepository.count', 'CompanyRepository.count'),
+    )
+    assert not failures, failures
+
+
+async def test_chat_repository_plans(seed):
+    after = (datetime.now(timezone.utc).replace(tzinfo=None), 10**9)
+    repo = ChatRepository
+
+    cases = {
+        'retrieve': lambda s: repo(s).retrieve(chat_id=100, user_id=102),
+        'get_chats': lambda s: repo(s).get_chats(100, 20, 0),
+        'count_chats': lambda s: repo(s).count_chats(100),
+        'get_inbox': lambda s: repo(s).get_inbox(102, 20, 0),
+        'mark_read': lambda s: repo(s).mark_read(100, 102, None),
+        'mark_read id': lambda s: repo(s).mark_read(100, 102, 10**9),
+        'get_chat_id': lambda s: repo(s).get_chat_id(102, 103),
+        'get_chat_messages': lambda s: repo(s).get_chat_messages(100, 20, 0),
+        'count_chat_messages': lambda s: repo(s).count_chat_messages(100),
+        'get_chat_history': lambda s: repo(s).get_chat_history(100, None, 21),
+        'get_chat_history after': lambda s: repo(s).get_chat_history(100, after, 21),
+        'get_recent_messages': lambda s: repo(s).get_recent_messages(100, None, 50),
+        'get_recent_messages since': lambda s: repo(s).get_recent_messages(100, 10**6, 50),
+        'add_message': lambda s: repo(s).add_message(
+            {'chat_id': 100, 'sender_id': 100, 'content': 'hi'},
+        ),
+        'add_messages': lambda s: repo(s).add_messages([
+            {'chat_id': 100, 'sender_id': 100, 'content': 'hi'},
+            {'chat_id': 100, 'sender_id': 101, 'content': 'hello'},
+        ]),
+        'clear_chat': lambda s: repo(s).clear_chat(100),
+        'delete': lambda s: repo(s).delete(100),
+    }
+    failures = await check_plans(cases)
+    assert not failures, failures
+
+
+async def test_booking_repository_plans(seed):
+    start = datetime(2030, 3, 1, tzinfo=timezone.utc)
+    repo = BookingRepository
+
+    cases = {
+        'add': lambda s: repo(s).add({
+            'offer_id': 100,
+            'user_id': 100,
+            'start': datetime(2031, 1, 1, tzinfo=timezone.utc),
+            'end': datetime(2031, 1, 2, tzinfo=timezone.utc),
+        }),
+        'get_bookings': lambda s: repo(s).get_bookings(100, 20, 0),
+        'count': lambda s: repo(s).count(100),
+        'get_booked_periods': (
+            lambda s: repo(s).get_booked_periods(100, start, start + timedelta(days=31))
+        ),
+    }
+    failures = await check_plans(cases)
+    assert not failures, failures
@@ -1,8 +1,20 @@
+import asyncio
 import json
+import re
+import time
+import uuid
 
 from unittest.mock import patch
-
+from redis.asyncio import Redis
+from sqlalchemy import event, select, update
+
+from src.application.utils.users import PasswordService
+from src.presentation.api.dependencies.usecases import get_user_usecase
+from src.infrastructure.models.users import User
+from src.infrastructure.repositories.base import RedisRepository
+from src.infrastructure.services.revocation import TokenRevocationList
 from src.infrastructure.services.tokens import JWTService
+from tests.conftest import session_manager
 from tests.factories.users import UserFactory
 
 
@@ -76,6 +88,22 @@ async def test_delete_user(ac):
     assert response.status_code == 404
 
 
+async def test_delete_inactive_user(c):
+    user = await UserFactory()
+    response = await c.get(f'/users/{user.username}')
+    assert response.status_code == 200
+
+    # * the scheduler calls the use case outside of a request
+    redis = Redis(host='redis', port=6379, db=1)
+    async with session_manager.session() as session:
+        user_usecase = get_user_usecase(session, redis_session=redis)
+        await user_usecase.delete_inactive_user(user.id)
+    await redis.aclose()
+
+    response = await c.get(f'/users/{user.username}')
+    assert response.status_code == 404
+
+
 @patch('fastapi.background.BackgroundTasks.add_task', return_value=None)
 async def test_password_reset(mocked_task, c):
     user = await UserFactory(username='admin')
@@ -109,8 +137,135 @@ async def test_change_password(ac):
     assert response.status_code == 202, response.json()
 
 
+async def test_change_password_uses_stored_hash(ac):
+    response = await ac.get('/chats/')
+    assert response.status_code == 200
+
+    # * changed by another worker, the cached snapshot still has the old hash
+    new_hash = await PasswordService.agenerate('12345tkr')
+    async with session_manager.session() as session:
+        await session.execute(
+            update(User).where(User.username == 'admin').values(password=new_hash)
+        )
+        await session.commit()
+
+    password_data = {'old_password': 'ybdaa0tit', 'new_password': 'abcd1234x'}
+    response = await ac.put('/users/password', json=password_data)
+    assert response.status_code == 400, response.json()
+
+    password_data['old_password'] = '12345tkr'
+    response = await ac.put('/users/password', json=password_data)
+    assert response.status_code == 202, response.json()
+
+
 async def test_logout(ac):
     response = await ac.post('/users/auth')
 
     assert response.status_code == 200, response.json()
     assert response.json() == {'status': 'You logged out'}
+
+
+async def test_revoked_token(ac):
+    response = await ac.post('/auth/logout')
+    assert response.status_code == 200, response.json()
+
+    response = await ac.get('/chats/')
+    assert response.status_code == 400
+
+
+async def test_revocation_skips_own_echo():
+    redis = Redis(host='redis', port=6379, db=1)
+    revoked = TokenRevocationList(capacity=10)
+    await revoked.load(redis)
+    count = revoked.bloom.count
+
+    jti = uuid.uuid4().hex
+    claims = {'jti': jti, 'exp': time.time() + 60}
+    await revoked.revoke(claims, 'token', RedisRepository(redis))
+    revoked.receive(f'{revoked.id}:{jti}')
+    assert revoked.bloom.count == count + 1
+
+    # * revoked by another worker
+    revoked.receive(f'{uuid.uuid4().hex}:{uuid.uuid4().hex}')
+    assert revoked.bloom.count == count + 2
+    await redis.aclose()
+
+
+async def test_revocation_single_rebuild():
+    redis = Redis(host='redis', port=6379, db=1)
+    revoked = TokenRevocationList(capacity=2)
+    await revoked.load(redis)
+
+    loads = 0
+    load = revoked.load
+
+    async def counted_load(redis):
+        nonlocal loads
+        loads += 1
+        await load(redis)
+
+    revoked.load = counted_load
+    # ! the filter is over capacity from the third id on
+    for _ in range(revoked.bloom.capacity + 5):
+        revoked.add(uuid.uuid4().hex)
+    await asyncio.sleep(0.1)
+    assert loads == 1
+    await redis.aclose()
+
+
+async def test_current_user_snapshot(ac):
+    response = await ac.get('/chats/')
+    assert response.status_code == 200
+
+    statements = []
+    engine = session_manager._engine.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = await ac.post('/auth/logout')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+async def test_login_rehash(monkeypatch, c):
+    monkeypatch.setattr(PasswordService, 'rounds', 4)
+    input_data = {'username': 'admin', 'password': 'ybdaa0tit'}
+    response = await c.post('/auth/login', data=input_data)
+    assert response.status_code == 200, response.json()
+
+    async with session_manager.session() as session:
+        password = await session.scalar(
+            select(User.password).where(User.username == 'admin')
+        )
+    assert password.startswith('$2b$04$')
+
+
+async def test_update_avatar(ac):
+    files = {'avatar': ('a.png', open('tests/images/test.png', 'rb'), 'image/png')}
+    response = await ac.patch('/users/me', files=files)
+    assert response.status_code == 202, response.json()
+    avatar = response.json()['avatar']
+    assert re.fullmatch(r'media/users/\w{2}/\w{2}/\w{64}\.png', avatar)
+
+    # the same content is stored once
+    files = {'avatar': ('b.png', open('tests/images/test.png', 'rb'), 'image/png')}
+    response = await ac.patch('/users/me', files=files)
+    assert response.json()['avatar'] == avatar
+
+    files = {'avatar': ('c.png', b'not an image', 'image/png')}
+    response = await ac.patch('/users/me', files=files)
+    assert response.status_code == 422
+
+
+async def test_cached_user_invalidation(ac):
+    response = await ac.get('/users/admin')
+    assert response.json()['email'] != 'new@gmail.com'
+
+    response = await ac.patch('/users/me', data={'email': 'new@gmail.com'})
+    assert response.status_code == 202
+
+    response = await ac.get('/users/admin')
+    assert response.json()['email'] == 'new@gmail.com'
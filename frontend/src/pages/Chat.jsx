@@ -1,4 +1,4 @@
-import { useEffect, useState, useCallback, useMemo } from 'react';
+import { useState, useCallback, useMemo, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import { ACCESS_TOKEN } from '../data/constants';
 import { useCurrentUser } from '../hooks/useCurrentUser';
@@ -7,38 +7,84 @@ import { format, parseISO } from 'date-fns';
 import useWebSocket, { ReadyState } from 'react-use-websocket';
 import api from '../utils/api';
 
+const HISTORY_PAGE_SIZE = 50;
+
 
 export default function Chat() {
   const { chat_id } = useParams();
+  // a fresh room per chat, so no state or last seen id carries over
+  return <ChatRoom key={chat_id} chat_id={chat_id} />;
+}
+
+
+function ChatRoom({ chat_id }) {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const currUserId = useCurrentUser().id;
+  const lastIdRef = useRef(null);
+  const listRef = useRef(null);
+  const loadingOlderRef = useRef(false);
+  const [hasOlder, setHasOlder] = useState(true);
 
-  const socketUrl = useMemo(
-    () => `ws://localhost:8000/chats/${chat_id}?token=${getItem(ACCESS_TOKEN)}`,
-    [chat_id]
-  );
+  // on reconnect only the messages after the last one seen are sent
+  const socketUrl = useCallback(() => {
+    const url = `ws://localhost:8000/chats/${chat_id}?token=${getItem(ACCESS_TOKEN)}`;
+    return lastIdRef.current ? `${url}&since=${lastIdRef.current}` : url;
+  }, [chat_id]);
 
   const { readyState, sendMessage } = useWebSocket(socketUrl, {
     onOpen: () => console.log('WebSocket connected'),
     onMessage: (event) => {
-      const message = JSON.parse(event.data);
-      console.log(message)
-      setMessages((prev) => [...prev, message]);
+      // the backlog on connect and a lagging connection arrive as arrays,
+      // after a long disconnect the backlog replaces the messages
+      const data = JSON.parse(event.data);
+      const received = Array.isArray(data) ? data : data.reset ? data.messages : [data];
+      if (data.reset) setHasOlder(true);
+      setMessages((prev) => {
+        const kept = data.reset ? [] : prev;
+        const seen = new Set(kept.map((msg) => msg.id));
+        const merged = [...kept, ...received.filter((msg) => !seen.has(msg.id))];
+        if (merged.length) lastIdRef.current = Math.max(...merged.map((msg) => msg.id));
+        return merged;
+      });
     },
     onError: (error) => console.error('WebSocket error:', error),
     onClose: () => console.log('WebSocket disconnected'),
     shouldReconnect: () => true,
   });
 
-  useEffect(() => {
-    fetchMessages();
-  }, [chat_id]);
+  // only the recent messages come with the socket, older pages are read
+  // from the history when the list is scrolled to the top
+  const fetchOlder = useCallback(async () => {
+    if (!hasOlder || loadingOlderRef.current || !messages.length) return;
+    loadingOlderRef.current = true;
+    const oldest = messages[0];
+    const list = listRef.current;
+    const height = list.scrollHeight;
+    try {
+      const res = await api.get(`/chats/${chat_id}/history`, {
+        params: {
+          size: HISTORY_PAGE_SIZE,
+          cursor: JSON.stringify([oldest.timestamp, oldest.id]),
+        },
+      });
+      const older = [...res.data.items].reverse();
+      setMessages((prev) => {
+        const seen = new Set(prev.map((msg) => msg.id));
+        return [...older.filter((msg) => !seen.has(msg.id)), ...prev];
+      });
+      setHasOlder(Boolean(res.data.next_cursor));
+      // keep the messages on screen where they were
+      requestAnimationFrame(() => {
+        list.scrollTop = list.scrollHeight - height;
+      });
+    } finally {
+      loadingOlderRef.current = false;
+    }
+  }, [chat_id, messages, hasOlder]);
 
-  const fetchMessages = async () => {
-    await api
-      .get(`/chats/${chat_id}/messages`)
-      .then((res) => setMessages(res.data.items))
+  const handleScroll = (e) => {
+    if (e.currentTarget.scrollTop === 0) fetchOlder();
   };
 
   const parseMessages = useCallback(() => {
@@ -69,7 +115,8 @@ export default function Chat() {
 
   const clearChat = async () => {
     await api.delete(`/chats/${chat_id}/clear`);
-    fetchMessages();
+    setMessages([]);
+    setHasOlder(false);
   };
 
   const connectionStatus = useMemo(() => {
@@ -99,7 +146,11 @@ export default function Chat() {
             Clear
           </button>
         </div>
-        <div className="flex flex-col flex-grow h-0 p-4 overflow-auto">
+        <div
+          ref={listRef}
+          onScroll={handleScroll}
+          className="flex flex-col flex-grow h-0 p-4 overflow-auto"
+        >
           {parseMessages()}
         </div>
         <div className="bg-gray-300 p-4 flex space-x-2">